@@ -0,0 +1,422 @@
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from concurrency import is_busy
+from controller import Controller
+from models import Contact, Database, Project
+
+# --- Local HTTP/JSON API ---
+# Serves the Controller over HTTP so several workstations share one database
+# through this process instead of opening projects.db over a network share.
+# Requests are handled by a fixed pool of threads, each reading through its own
+# connection; every write goes through a single writer thread, so SQLite only
+# ever sees one writer. Responses carry an ETag; GET honours If-None-Match and
+# PUT/DELETE honour If-Match, which stops one seat overwriting another's edit.
+#
+#   GET    /projects?search=&active_only=1&limit=&offset=&order_by=location,-start_date
+#   POST   /projects
+#   GET    /projects/<id>            PUT /projects/<id>          DELETE /projects/<id>
+#   GET    /projects/<id>/roles      PUT /projects/<id>/roles
+#   GET    /projects/<id>/tasks?stage_id=
+#   PUT    /projects/<id>/tasks/<task_id>
+#   GET    /contacts?search=&limit=&offset=&order_by=
+#   POST   /contacts
+#   GET    /contacts/<id>            PUT /contacts/<id>          DELETE /contacts/<id>
+#   GET    /contacts/<id>/projects
+#   GET    /stages
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 8
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def etag_of(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+def encode(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+# --- Representations ---
+def project_json(schema):
+    return {
+        "id": schema.id,
+        "location": schema.location,
+        "start_date": schema.start_date,
+        "end_date": schema.end_date,
+        "active": bool(schema.active),
+        "stage_id": schema.stage_id,
+        "stage_name": schema.stage_name,
+        "document_path": schema.document_path,
+        "roles": schema.roles,
+    }
+
+def contact_json(contact):
+    return asdict(contact)
+
+class Api:
+    """The endpoints, independent of the HTTP plumbing.
+
+    Handlers return (status, data); `write` runs a callable on the shared writer.
+    """
+    def __init__(self, controller, write):
+        self.controller = controller
+        self.write = write
+        self.routes = [
+            ("GET", r"/projects", self.list_projects),
+            ("POST", r"/projects", self.create_project),
+            ("GET", r"/projects/(\d+)", self.get_project),
+            ("PUT", r"/projects/(\d+)", self.update_project),
+            ("DELETE", r"/projects/(\d+)", self.delete_project),
+            ("GET", r"/projects/(\d+)/roles", self.get_project_roles),
+            ("PUT", r"/projects/(\d+)/roles", self.set_project_roles),
+            ("GET", r"/projects/(\d+)/tasks", self.get_project_tasks),
+            ("PUT", r"/projects/(\d+)/tasks/(\d+)", self.set_project_task),
+            ("GET", r"/contacts", self.list_contacts),
+            ("POST", r"/contacts", self.create_contact),
+            ("GET", r"/contacts/(\d+)", self.get_contact),
+            ("PUT", r"/contacts/(\d+)", self.update_contact),
+            ("DELETE", r"/contacts/(\d+)", self.delete_contact),
+            ("GET", r"/contacts/(\d+)/projects", self.get_contact_projects),
+            ("GET", r"/stages", self.list_stages),
+        ]
+        self.routes = [(method, re.compile(pattern + r"/?"), fn) for method, pattern, fn in self.routes]
+
+    def dispatch(self, method, path, query, body, if_match=None):
+        allowed = False
+        for route_method, pattern, fn in self.routes:
+            match = pattern.fullmatch(path)
+            if match:
+                allowed = True
+                if route_method == method:
+                    args = [int(g) for g in match.groups()]
+                    if method in ("PUT", "DELETE"):
+                        return self.write(self._guarded, fn, args, query, body, if_match)
+                    return fn(*args, query=query, body=body)
+        if allowed:
+            raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not supported on {path}.")
+        raise ApiError(HTTPStatus.NOT_FOUND, f"No such resource: {path}.")
+
+    def _guarded(self, fn, args, query, body, if_match):
+        # Runs on the writer: compare the ETag of the current representation
+        # with If-Match and apply the change without another write in between
+        if if_match and if_match != "*":
+            getter = self._getters().get(fn)
+            if getter:
+                _, current = getter(*args, query={}, body=None)
+                if etag_of(encode(current)) not in [tag.strip() for tag in if_match.split(",")]:
+                    raise ApiError(HTTPStatus.PRECONDITION_FAILED, "The resource was changed by someone else.")
+        return fn(*args, query=query, body=body)
+
+    def _getters(self):
+        return {
+            self.update_project: self.get_project,
+            self.delete_project: self.get_project,
+            self.set_project_roles: self.get_project_roles,
+            self.update_contact: self.get_contact,
+            self.delete_contact: self.get_contact,
+        }
+
+    # Projects
+    def list_projects(self, query, body):
+        limit, offset = _page(query)
+        schemas = self.controller.list_project_schemas(
+            _param(query, "search", ""), _bool(_param(query, "active_only", "0")),
+            limit, offset, _order_by(_param(query, "order_by")))
+        return HTTPStatus.OK, _paged([project_json(s) for s in schemas], limit, offset)
+
+    def get_project(self, project_id, query, body):
+        schema = self.controller.get_project_schema(project_id)
+        if schema is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"Project {project_id} does not exist.")
+        return HTTPStatus.OK, project_json(schema)
+
+    def create_project(self, query, body):
+        fields = self._project_fields(_object(body))
+        roles = _roles(body.get("role_assignments", []))
+        project_id = self.write(self.controller.create_project, *fields, roles)
+        return HTTPStatus.CREATED, project_json(self.controller.get_project_schema(project_id))
+
+    def update_project(self, project_id, query, body):
+        self.get_project(project_id, query, None)
+        fields = self._project_fields(_object(body))
+        roles = _roles(body["role_assignments"]) if "role_assignments" in body else None
+        self.controller.update_project(Project(project_id, *fields), roles)
+        return self.get_project(project_id, query, None)
+
+    def delete_project(self, project_id, query, body):
+        self.get_project(project_id, query, None)
+        self.controller.delete_project(project_id)
+        return HTTPStatus.NO_CONTENT, None
+
+    def _project_fields(self, body):
+        # (location, start_date, end_date, active, stage_id, document_path); the stage may be given by name
+        stage_id = body.get("stage_id")
+        if stage_id is None and body.get("stage_name"):
+            stage = self.controller.stage_by_name(body["stage_name"])
+            stage_id = stage.id if stage else None
+        if stage_id is None or self.controller.get_stage(stage_id) is None:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "A valid stage_id or stage_name is required.")
+        if not body.get("location") or not body.get("start_date"):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "location and start_date are required.")
+        active = bool(body.get("active", True))
+        return (body["location"], body["start_date"], None if active else body.get("end_date"), active,
+                stage_id, body.get("document_path", ""))
+
+    # Roles
+    def get_project_roles(self, project_id, query, body):
+        self.get_project(project_id, query, None)
+        return HTTPStatus.OK, [asdict(r) for r in self.controller.list_project_roles(project_id)]
+
+    def set_project_roles(self, project_id, query, body):
+        self.get_project(project_id, query, None)
+        if not isinstance(body, list):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Expected a list of {contact_id, role} objects.")
+        self.controller.set_project_roles(project_id, _roles(body))
+        return self.get_project_roles(project_id, query, None)
+
+    # Stage tasks
+    def get_project_tasks(self, project_id, query, body):
+        project = self.controller.get_project(project_id)
+        if project is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"Project {project_id} does not exist.")
+        stage_id = int(_param(query, "stage_id", project.stage_id))
+        tasks = self.controller.get_task_schemas_for_project_stage(project_id, stage_id)
+        return HTTPStatus.OK, [{"id": t.id, "description": t.description, "is_done": bool(t.is_done)} for t in tasks]
+
+    def set_project_task(self, project_id, task_id, query, body):
+        if self.controller.get_project(project_id) is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"Project {project_id} does not exist.")
+        if self.controller.get_task(task_id) is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"Task {task_id} does not exist.")
+        self.controller.set_project_task_done(project_id, task_id, bool(_object(body).get("is_done")))
+        return HTTPStatus.NO_CONTENT, None
+
+    # Contacts
+    def list_contacts(self, query, body):
+        limit, offset = _page(query)
+        contacts = self.controller.list_contacts(_param(query, "search", ""), limit, offset,
+                                                 _order_by(_param(query, "order_by")))
+        return HTTPStatus.OK, _paged([contact_json(c) for c in contacts], limit, offset)
+
+    def get_contact(self, contact_id, query, body):
+        contact = self.controller.get_contact(contact_id)
+        if contact is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"Contact {contact_id} does not exist.")
+        return HTTPStatus.OK, contact_json(contact)
+
+    def create_contact(self, query, body):
+        contact_id = self.write(self.controller.create_contact, *_contact_fields(_object(body)))
+        return HTTPStatus.CREATED, contact_json(self.controller.get_contact(contact_id))
+
+    def update_contact(self, contact_id, query, body):
+        self.get_contact(contact_id, query, None)
+        self.controller.update_contact(Contact(contact_id, *_contact_fields(_object(body))))
+        return self.get_contact(contact_id, query, None)
+
+    def delete_contact(self, contact_id, query, body):
+        self.get_contact(contact_id, query, None)
+        self.controller.delete_contact(contact_id)
+        return HTTPStatus.NO_CONTENT, None
+
+    def get_contact_projects(self, contact_id, query, body):
+        self.get_contact(contact_id, query, None)
+        return HTTPStatus.OK, [dict(asdict(p), active=bool(p.active), role=role) for p, role in self.controller.list_projects_for_contact(contact_id)]
+
+    # Reference data
+    def list_stages(self, query, body):
+        return HTTPStatus.OK, [
+            {"id": s.id, "name": s.name,
+             "tasks": [{"id": t.id, "description": t.description} for t in self.controller.list_tasks_by_stage(s.id)]}
+            for s in self.controller.list_stages()
+        ]
+
+# --- Request parsing helpers ---
+def _param(query, name, default=None):
+    values = query.get(name)
+    return values[-1] if values else default
+
+def _bool(value):
+    return str(value).lower() in ("1", "true", "yes")
+
+def _page(query):
+    try:
+        limit = min(int(_param(query, "limit", DEFAULT_LIMIT)), MAX_LIMIT)
+        offset = int(_param(query, "offset", 0))
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "limit and offset must be integers.")
+    if limit < 1 or offset < 0:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "limit must be positive and offset not negative.")
+    return limit, offset
+
+def _paged(items, limit, offset):
+    return {"items": items, "limit": limit, "offset": offset,
+            "next_offset": offset + limit if len(items) == limit else None}
+
+def _order_by(value):
+    # "location,-start_date" -> [("location", False), ("start_date", True)]
+    if not value:
+        return None
+    return [(key.lstrip("-"), key.startswith("-")) for key in value.split(",") if key]
+
+def _object(body):
+    if not isinstance(body, dict):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Expected a JSON object.")
+    return body
+
+def _roles(items):
+    try:
+        return [(int(item["contact_id"]), item["role"]) for item in items]
+    except (KeyError, TypeError, ValueError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Roles must be {contact_id, role} objects.")
+
+def _contact_fields(body):
+    if not body.get("first_name") or not body.get("last_name"):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "first_name and last_name are required.")
+    return (body["first_name"], body["last_name"], body.get("phone", ""), body.get("email", ""), body.get("address", ""))
+
+# --- HTTP plumbing ---
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    server_version = "ArchitectureProjectManager/1.0"
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def _handle(self, method):
+        url = urlsplit(self.path)
+        try:
+            body = self._read_body()
+            status, data = self.server.api.dispatch(method, url.path, parse_qs(url.query), body,
+                                                    self.headers.get("If-Match"))
+        except ApiError as e:
+            status, data = e.status, {"error": str(e)}
+        except ValueError as e:
+            status, data = HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except sqlite3.IntegrityError as e:
+            status, data = HTTPStatus.CONFLICT, {"error": str(e)}
+        except sqlite3.OperationalError as e:
+            if is_busy(e):
+                status, data = HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Database is busy, try again."}
+            else:
+                status, data = self._internal_error(method, e)
+        except Exception as e:
+            status, data = self._internal_error(method, e)
+        self._respond(method, status, data)
+
+    def _internal_error(self, method, error):
+        # Logged here, since the client only learns that the request failed
+        self.log_error("%s %s failed: %r", method, self.path, error)
+        return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error."}
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length).decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Invalid JSON: {e}")
+
+    def _respond(self, method, status, data):
+        body = b"" if data is None else encode(data)
+        etag = etag_of(body) if data is not None and status in (HTTPStatus.OK, HTTPStatus.CREATED) else None
+        if method == "GET" and etag and etag in self.headers.get("If-None-Match", ""):
+            status, body = HTTPStatus.NOT_MODIFIED, b""
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        if body:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+class ApiServer(HTTPServer):
+    """HTTPServer handling requests on a fixed thread pool, with one shared DB writer.
+
+    A fixed pool (rather than a thread per request) keeps the number of SQLite
+    connections bounded, since Database opens one per thread.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, controller, workers=DEFAULT_WORKERS, verbose=False):
+        super().__init__(address, ApiRequestHandler)
+        self.verbose = verbose
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="api")
+        self._writer_ident = None
+        self.writer = ThreadPoolExecutor(1, thread_name_prefix="db-writer", initializer=self._init_writer)
+        self.api = Api(controller, self.write)
+
+    def _init_writer(self):
+        self._writer_ident = threading.get_ident()
+
+    def write(self, fn, *args):
+        # Run fn on the writer thread and wait for it; on the writer already, just run it
+        if threading.get_ident() == self._writer_ident:
+            return fn(*args)
+        return self.writer.submit(fn, *args).result()
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+        self.writer.shutdown(wait=True)
+
+def serve(db_name="projects.db", host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS, verbose=True):
+    with Database(db_name) as db:
+        server = ApiServer((host, port), Controller(db), workers, verbose)
+        print(f"Serving {db_name} on http://{host}:{server.server_port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the project database as a local JSON API.")
+    parser.add_argument("--db", default="projects.db")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="use 0.0.0.0 to accept other machines on the office network")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+    serve(args.db, args.host, args.port, args.workers, not args.quiet)
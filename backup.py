@@ -0,0 +1,320 @@
+import argparse
+import glob
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+from changes import mark_all
+
+# --- Online Backup ---
+# Snapshots are taken with SQLite's backup API while the application keeps
+# working: the copy runs on the calling thread (the GUI calls it from a worker)
+# on its own connection, a few thousand pages per step, and SQLite releases the
+# GIL while a step runs. In WAL mode the copy holds one read snapshot from the
+# first step to the last, so commits by other connections neither block it nor
+# force it to start over. Each copy is written under a temporary name, checked
+# with PRAGMA integrity_check and only then renamed into place, so every file
+# named like a snapshot is complete. The oldest snapshots beyond `keep` are
+# deleted after each new one.
+
+DEFAULT_PAGES = 1024  # pages copied per step: 4 MiB at the default page size
+DEFAULT_KEEP = 14
+DEFAULT_INTERVAL_HOURS = 24.0
+# How often the scheduler checks whether a snapshot is due
+CHECK_SECONDS = 300
+TIME_FORMAT = "%Y%m%d-%H%M%S"
+
+@dataclass
+class Snapshot:
+    path: str
+    created: datetime
+    size: int
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+def _open_readonly(path):
+    # A URI, so that opening a missing file fails instead of creating an empty database
+    return sqlite3.connect(pathlib.Path(os.path.abspath(path)).as_uri() + "?mode=ro", uri=True, isolation_level=None)
+
+def copy_database(source, target_path, pages=DEFAULT_PAGES, progress=None):
+    """Copy the database open on source into a new file at target_path, `pages` pages per step.
+
+    progress, if given, is called after each step with (pages copied, total pages).
+    """
+    # In rollback journal mode a held read lock would keep every writer out until
+    # the copy ends, so there each step locks on its own and a write between
+    # steps restarts the copy
+    hold = source.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    target = sqlite3.connect(target_path, isolation_level=None)
+    try:
+        if hold:
+            source.execute("BEGIN")
+            source.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone()
+        try:
+            source.backup(target, pages=pages,
+                          progress=progress and (lambda status, remaining, total: progress(total - remaining, total)))
+        finally:
+            if hold:
+                source.execute("COMMIT")
+        # The copy of a WAL database is in WAL mode as well; a snapshot is better as one self-contained file
+        target.execute("PRAGMA journal_mode = delete")
+    finally:
+        target.close()
+
+def check_integrity(path, quick=False) -> List[str]:
+    """Problems PRAGMA integrity_check (or the faster quick_check) finds in the database at path; [] when it is sound."""
+    connection = _open_readonly(path)
+    try:
+        rows = connection.execute("PRAGMA quick_check" if quick else "PRAGMA integrity_check").fetchall()
+    except sqlite3.DatabaseError as e:
+        # Not a database at all, e.g. a truncated or overwritten file
+        return [str(e)]
+    finally:
+        connection.close()
+    return [] if rows == [("ok",)] else [row[0] for row in rows]
+
+# Tables restored by the triggers and the change counter rather than copied
+_DERIVED_TABLES = {"data_version", "row_versions"}
+
+def _copy_order(connection, tables):
+    # Parents before the tables referring to them, so no foreign key is ever broken
+    parents = {t: {row[2] for row in connection.execute(f"PRAGMA main.foreign_key_list({t})")} & set(tables)
+               for t in tables}
+    order = []
+    def visit(table):
+        if table not in order:
+            for parent in sorted(parents[table] - {table}):
+                visit(parent)
+            order.append(table)
+    for table in tables:
+        visit(table)
+    return order
+
+def _replace_content(connection, prepared, concurrency):
+    # Replace every table's rows with those of the prepared database (same schema),
+    # in one transaction. The triggers are dropped meanwhile: they would bump the
+    # change counter once per row, and the copied search and progress tables are
+    # already consistent. The counter instead moves past its old value once, with
+    # every project and contact marked changed or deleted at the new value.
+    connection.execute("ATTACH DATABASE ? AS restored", (prepared,))
+    try:
+        concurrency.retry(connection.execute, "BEGIN IMMEDIATE")
+        try:
+            rows = connection.execute("SELECT type, name, sql FROM main.sqlite_master").fetchall()
+            triggers = [(name, sql) for kind, name, sql in rows if kind == "trigger"]
+            virtual = [name for kind, name, sql in rows if kind == "table" and sql.upper().startswith("CREATE VIRTUAL")]
+            restored = {name for (name,) in connection.execute("SELECT name FROM restored.sqlite_master WHERE type='table'")}
+            tables = [name for kind, name, sql in rows
+                      if kind == "table" and name in restored and not name.startswith("sqlite_")
+                      and name not in _DERIVED_TABLES
+                      # FTS5 keeps its index in shadow tables named after it, filled through the virtual table
+                      and not any(name.startswith(v + "_") for v in virtual)]
+            version = connection.execute("SELECT version FROM data_version").fetchone()[0] + 1
+            for name, _ in triggers:
+                connection.execute(f'DROP TRIGGER "{name}"')
+            mark_all(connection, version, deleted=1)
+            order = _copy_order(connection, tables)
+            for table in reversed(order):
+                connection.execute(f'DELETE FROM main."{table}"')
+            for table in order:
+                # Virtual tables keep their rowids (the ids of the rows they index) only when asked
+                rowid = "rowid, " if table in virtual else ""
+                connection.execute(f'INSERT INTO main."{table}" ({rowid}{_columns(connection, table)}) '
+                                   f'SELECT {rowid}{_columns(connection, table)} FROM restored."{table}"')
+            mark_all(connection, version)
+            connection.execute("UPDATE data_version SET version = ?", (version,))
+            for _, sql in triggers:
+                connection.execute(sql)
+        except BaseException:
+            connection.rollback()
+            raise
+        connection.commit()
+    finally:
+        connection.execute("DETACH DATABASE restored")
+
+def _columns(connection, table):
+    return ", ".join(f'"{row[1]}"' for row in connection.execute(f'PRAGMA main.table_info("{table}")'))
+
+class BackupService:
+    """Takes, verifies, rotates and restores snapshots of a Database's file.
+
+    directory: where snapshots are kept (default: "backups" next to the database).
+    keep: how many snapshots to keep; None keeps them all.
+    pages: pages copied per backup step.
+    """
+    def __init__(self, db, directory=None, keep=DEFAULT_KEEP, pages=DEFAULT_PAGES):
+        self.db = db
+        self.directory = directory or os.path.join(os.path.dirname(os.path.abspath(db.db_name)), "backups")
+        self.keep = keep
+        self.pages = pages
+        self.prefix = os.path.splitext(os.path.basename(db.db_name))[0] + "-"
+        # One snapshot or restore at a time, whether scheduled or asked for
+        self._lock = threading.Lock()
+        self._stop = None
+        self._thread = None
+        self.last_error = None  # the last scheduled snapshot's exception, if it failed
+
+    def snapshots(self) -> List[Snapshot]:
+        """The snapshots in the directory, newest first."""
+        result = []
+        for path in glob.glob(os.path.join(glob.escape(self.directory), glob.escape(self.prefix) + "*.db")):
+            stamp = os.path.basename(path)[len(self.prefix):-len(".db")]
+            try:
+                created = datetime.strptime(stamp, TIME_FORMAT)
+            except ValueError:
+                continue  # some other file that happens to share the prefix
+            result.append(Snapshot(path, created, os.path.getsize(path)))
+        result.sort(key=lambda s: s.created, reverse=True)
+        return result
+
+    def create(self, progress=None) -> Snapshot:
+        """Take, verify and keep a snapshot of the database, then delete the ones beyond `keep`."""
+        with self._lock:
+            snapshot = self._create(progress)
+            self.rotate()
+        return snapshot
+
+    def _create(self, progress=None):
+        os.makedirs(self.directory, exist_ok=True)
+        created = datetime.now().replace(microsecond=0)
+        while os.path.exists(self._path(created)):
+            # Snapshots are named by the second; one was finished within this one already
+            time.sleep(0.1)
+            created = datetime.now().replace(microsecond=0)
+        path = self._path(created)
+        partial = path + ".partial"
+        source = self.db.connect()
+        try:
+            copy_database(source, partial, self.pages, progress)
+            problems = check_integrity(partial)
+            if problems:
+                raise sqlite3.DatabaseError(f"The snapshot failed its integrity check: {problems[0]}")
+            os.replace(partial, path)
+        finally:
+            source.close()
+            if os.path.exists(partial):
+                os.remove(partial)
+        return Snapshot(path, created, os.path.getsize(path))
+
+    def _path(self, when):
+        return os.path.join(self.directory, f"{self.prefix}{when.strftime(TIME_FORMAT)}.db")
+
+    def rotate(self):
+        """Delete the oldest snapshots beyond `keep`; returns the deleted ones."""
+        if self.keep is None:
+            return []
+        stale = self.snapshots()[self.keep:]
+        for snapshot in stale:
+            os.remove(snapshot.path)
+        return stale
+
+    def verify(self, path, quick=False) -> List[str]:
+        return check_integrity(path, quick)
+
+    def restore(self, path, keep_current=True) -> Optional[Snapshot]:
+        """Replace the database's content with the snapshot at path.
+
+        The snapshot is checked first, and with keep_current the data being
+        replaced is saved as a snapshot of its own, which is returned. An older
+        snapshot is upgraded to the current schema on a copy. The replacement
+        is one write transaction, so other connections see either the old or
+        the restored data, never a mix; it moves the change counter past its
+        old value, so they notice.
+        """
+        problems = check_integrity(path)
+        if problems:
+            raise sqlite3.DatabaseError(f"{os.path.basename(path)} cannot be restored: {problems[0]}")
+        with self._lock:
+            current = self._create() if keep_current else None
+            prepared = os.path.join(self.directory, f".restore-{os.getpid()}.partial")
+            source = _open_readonly(path)
+            try:
+                copy_database(source, prepared, self.pages)
+                connection = sqlite3.connect(prepared, isolation_level=None)
+                try:
+                    self.db.upgrade(connection)
+                finally:
+                    connection.close()
+                connection = self.db.connect()
+                try:
+                    _replace_content(connection, prepared, self.db.concurrency)
+                finally:
+                    connection.close()
+            finally:
+                source.close()
+                if os.path.exists(prepared):
+                    os.remove(prepared)
+        # Not rotated here: that could delete the snapshot just restored
+        return current
+
+    # --- Scheduling ---
+    def due(self, interval_hours):
+        snapshots = self.snapshots()
+        return not snapshots or (datetime.now() - snapshots[0].created).total_seconds() >= interval_hours * 3600
+
+    def start(self, interval_hours=DEFAULT_INTERVAL_HOURS):
+        """Take a snapshot whenever the newest one is older than interval_hours, on a background thread."""
+        if self._thread is not None:
+            return
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(interval_hours,), name="backup", daemon=True)
+        self._thread.start()
+
+    def _run(self, interval_hours):
+        # Checking the newest snapshot's age, rather than sleeping a whole
+        # interval, still backs up an application that is never open that long
+        while True:
+            try:
+                if self.due(interval_hours):
+                    self.create()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+            if self._stop.wait(min(interval_hours * 3600, CHECK_SECONDS)):
+                return
+
+    def stop(self):
+        """Stop the schedule, waiting for a snapshot in progress to finish."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+def _format_progress(copied, total):
+    print(f"\r{copied}/{total} pages", end="", flush=True)
+
+if __name__ == "__main__":
+    from models import Database
+
+    parser = argparse.ArgumentParser(description="Take, list, verify and restore snapshots of the project database.")
+    parser.add_argument("action", choices=["create", "list", "verify", "restore"])
+    parser.add_argument("snapshot", nargs="?", help="snapshot file to verify or restore")
+    parser.add_argument("--db", default="projects.db")
+    parser.add_argument("--dir", help="snapshot folder (default: backups next to the database)")
+    parser.add_argument("--keep", type=int, default=DEFAULT_KEEP, help="snapshots to keep; 0 keeps them all")
+    args = parser.parse_args()
+    if args.action in ("verify", "restore") and not args.snapshot:
+        parser.error(f"{args.action} needs a snapshot file")
+    if args.action == "verify":
+        # Verifying a snapshot does not need the live database open
+        problems = check_integrity(args.snapshot)
+        print("\n".join(problems) or "ok")
+        raise SystemExit(1 if problems else 0)
+    with Database(args.db) as db:
+        service = BackupService(db, args.dir, args.keep or None)
+        if args.action == "create":
+            snapshot = service.create(_format_progress)
+            print(f"\n{snapshot.path} ({snapshot.size} bytes)")
+        elif args.action == "list":
+            for snapshot in service.snapshots():
+                print(f"{snapshot.created:%Y-%m-%d %H:%M:%S}  {snapshot.size:>12}  {snapshot.path}")
+        else:
+            current = service.restore(args.snapshot)
+            print(f"Restored {args.snapshot}; the replaced data is in {current.path}.")
@@ -0,0 +1,364 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from concurrency import Concurrency, is_busy
+from controller import Controller
+from models import Contact, Database, Project, ProjectRole
+
+# --- Benchmarks ---
+# Builds synthetic databases with the application's own schema (Database runs
+# initialize_database and the migrations) and times the controller operations the
+# views rely on, without Tk. Results are JSON so two runs can be compared:
+#
+#   python benchmark.py run --scales 1k 10k --output before.json
+#   python benchmark.py run --scales 1k 10k --output after.json
+#   python benchmark.py compare before.json after.json
+#
+# `stress` runs readers and writers in separate processes against one file:
+#
+#   python benchmark.py stress --journal-mode wal --readers 4 --writers 1
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+DEFAULT_SEED = 1234
+DEFAULT_REPEAT = 5
+PAGE_SIZE = 200  # matches PagedTreeview.PAGE_SIZE
+
+CITIES = ["תל אביב", "חיפה", "ירושלים", "באר שבע", "רעננה", "הרצליה", "מודיעין", "נתניה", "Haifa", "Eilat"]
+STREETS = ["הרצל", "ויצמן", "בן גוריון", "הזית", "האלון", "Rothschild", "Allenby", "הגפן"]
+FIRST_NAMES = ["דוד", "שרה", "משה", "רחל", "יוסי", "מיכל", "Noam", "Dana", "Avi", "Tamar", "Eitan", "Yael"]
+LAST_NAMES = ["כהן", "לוי", "מזרחי", "פרץ", "ביטון", "Friedman", "Katz", "Shapiro", "Levi", "Peretz"]
+
+# --- Synthetic data ---
+def generate(path, projects, seed=DEFAULT_SEED):
+    """Create (or replace) a database at path holding `projects` projects.
+
+    Every project gets a customer and possibly further roles, and task rows for
+    the stages up to its current one. A contact exists for every two projects.
+    """
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    rng = random.Random(seed)
+    contacts = max(projects // 2, 10)
+    with Database(path) as db:
+        controller = Controller(db)
+        stages = controller.list_stages()
+        tasks_by_stage = {s.id: [t.id for t in controller.list_tasks_by_stage(s.id)] for s in stages}
+        with db.transaction():
+            controller.contact_model.create_many(
+                Contact(i, rng.choice(FIRST_NAMES), f"{rng.choice(LAST_NAMES)} {i}",
+                        f"05{rng.randrange(10**8):08d}", f"user{i}@example.com",
+                        f"{rng.choice(STREETS)} {rng.randrange(1, 200)}, {rng.choice(CITIES)}")
+                for i in range(1, contacts + 1))
+            project_rows = []
+            for i in range(1, projects + 1):
+                year = rng.randrange(2010, 2026)
+                active = rng.random() < 0.3
+                start = f"{year}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}"
+                end = None if active else f"{year + 1}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}"
+                stage_id = rng.choice(stages).id
+                project_rows.append(Project(i, f"{rng.choice(STREETS)} {rng.randrange(1, 200)} {rng.choice(CITIES)}",
+                                            start, end, active, stage_id, f"/projects/{year}/{i}"))
+            controller.project_model.create_many(project_rows)
+            roles = []
+            for p in project_rows:
+                roles.append(ProjectRole(None, p.id, rng.randrange(1, contacts + 1), "Customer"))
+                for role in ("Customer", "Inspector", "Constructor", "Consultant"):
+                    if rng.random() < 0.3:
+                        roles.append(ProjectRole(None, p.id, rng.randrange(1, contacts + 1), role))
+            controller.project_role_model.add_many(roles)
+            db.execute_many(
+                "INSERT INTO project_stage_tasks (project_id, task_id, is_done) VALUES (?, ?, ?)",
+                ((p.id, task_id, int(stage_id < p.stage_id or rng.random() < 0.5))
+                 for p in project_rows for stage_id in sorted(tasks_by_stage) if stage_id <= p.stage_id
+                 for task_id in tasks_by_stage[stage_id]))
+    return path
+
+def counts(db):
+    return {table: db.execute_query(f"SELECT COUNT(*) FROM {table}", fetchone=True)[0]
+            for table in ("projects", "contacts", "project_roles", "project_stage_tasks")}
+
+# --- Timing ---
+def time_call(fn, repeat=DEFAULT_REPEAT, setup=None):
+    """Run fn once to warm up, then `repeat` timed times; returns stats in seconds."""
+    if setup:
+        setup()
+    fn()
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return {"min": min(timings), "median": statistics.median(timings), "mean": statistics.fmean(timings), "repeat": repeat}
+
+def benchmarks(controller, projects, seed=DEFAULT_SEED):
+    """The operations to time: name -> (fn, setup or None)."""
+    rng = random.Random(seed)
+    contacts = max(projects // 2, 10)
+    project_ids = [rng.randrange(1, projects + 1) for _ in range(100)]
+    contact_ids = [rng.randrange(1, contacts + 1) for _ in range(100)]
+    term = CITIES[0].split()[0]
+    db = controller.db
+
+    def each(ids, fn):
+        return lambda: [fn(i) for i in ids]
+
+    return {
+        # 100 single-row lookups each
+        "execute_query.get_by_id_x100": (each(project_ids, lambda i: db.execute_query(
+            "SELECT * FROM projects WHERE id=?", (i,), fetchone=True)), None),
+        "get_project_schema_x100": (each(project_ids, controller.get_project_schema), None),
+        "get_task_schemas_for_project_stage_x100": (each(project_ids, lambda i: controller.get_task_schemas_for_project_stage(
+            i, controller.get_project(i).stage_id)), None),
+        "list_projects_for_contact_x100": (each(contact_ids, controller.list_projects_for_contact), None),
+        # What the list views fetch
+        "list_projects.all": (lambda: controller.list_projects(), None),
+        "list_projects.page": (lambda: controller.list_projects(limit=PAGE_SIZE), None),
+        "list_projects.search": (lambda: controller.list_projects(term, limit=PAGE_SIZE), None),
+        "list_project_schemas.page": (lambda: controller.list_project_schemas(limit=PAGE_SIZE), None),
+        "list_project_schemas.page_sorted": (lambda: controller.list_project_schemas(
+            limit=PAGE_SIZE, order_by=[("location", False)]), None),
+        "list_project_schemas.search": (lambda: controller.list_project_schemas(term, limit=PAGE_SIZE), None),
+        "list_project_schemas.active_all": (lambda: controller.list_project_schemas(active_only=True), None),
+        "iter_project_schemas.active_all": (lambda: sum(1 for _ in controller.iter_project_schemas(active_only=True)), None),
+        "list_project_progress.active_all": (lambda: controller.list_project_progress(), None),
+        "list_contacts.page": (lambda: controller.list_contacts(limit=PAGE_SIZE), None),
+        "list_contacts.search": (lambda: controller.list_contacts(LAST_NAMES[0], limit=PAGE_SIZE), None),
+        "contact_display_names.cold": (controller.contact_display_names, controller.contact_directory.invalidate),
+    }
+
+def run(scales, repeat=DEFAULT_REPEAT, seed=DEFAULT_SEED, data_dir=None, only=None):
+    data_dir = data_dir or tempfile.mkdtemp(prefix="apm-bench-")
+    os.makedirs(data_dir, exist_ok=True)
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "scales": {},
+    }
+    for scale in scales:
+        projects = SCALES[scale]
+        path = os.path.join(data_dir, f"bench-{scale}-{seed}.db")
+        start = time.perf_counter()
+        if not os.path.exists(path):
+            generate(path, projects, seed)
+        generated = time.perf_counter() - start
+        with Database(path) as db:
+            controller = Controller(db)
+            scale_results = {"rows": counts(db), "generate_seconds": generated, "benchmarks": {}}
+            for name, (fn, setup) in benchmarks(controller, projects, seed).items():
+                if only and not any(o in name for o in only):
+                    continue
+                scale_results["benchmarks"][name] = time_call(fn, repeat, setup)
+                print(f"{scale:>5} {name:<45} {scale_results['benchmarks'][name]['median'] * 1000:10.2f} ms", file=sys.stderr)
+        results["scales"][scale] = scale_results
+    return results
+
+def compare(before, after):
+    """Print median timings of two result files side by side."""
+    for scale, after_scale in after["scales"].items():
+        before_scale = before["scales"].get(scale, {}).get("benchmarks", {})
+        for name, stats in after_scale["benchmarks"].items():
+            new = stats["median"] * 1000
+            if name in before_scale:
+                old = before_scale[name]["median"] * 1000
+                print(f"{scale:>5} {name:<45} {old:10.2f} ms -> {new:10.2f} ms  x{old / new if new else float('inf'):.2f}")
+            else:
+                print(f"{scale:>5} {name:<45} {'':>13}    {new:10.2f} ms  (new)")
+
+# --- Multi-process stress test ---
+def _stress_concurrency(journal_mode, wait=True):
+    # wait=False: no busy timeout and no retries, so any wait for a lock fails at once
+    timeout, retries = (5000, 5) if wait else (0, 0)
+    if journal_mode == "wal":
+        return Concurrency("wal", busy_timeout_ms=timeout, retries=retries, checkpoint_interval=None if not wait else 30.0)
+    return Concurrency(journal_mode, "full", busy_timeout_ms=timeout, retries=retries, checkpoint_interval=None)
+
+def _stress_reader(path, journal_mode, seconds, ready, start, results):
+    # Pages through the project list, as the list view does, until time is up.
+    # Readers do not wait for locks, so every time one would have blocked on a
+    # writer is counted as a busy error.
+    with Database(path, concurrency=_stress_concurrency(journal_mode)) as db:
+        controller = Controller(db)
+        controller.contact_display_names()
+        ready.wait()
+        # Every process has opened the database (which may write the schema); stop waiting from here on
+        db.concurrency = _stress_concurrency(journal_mode, wait=False)
+        db.concurrency.configure(db.get_connection())
+        start.wait()
+        latencies, busy = [], 0
+        offset = 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            began = time.perf_counter()
+            try:
+                rows = controller.list_project_schemas(limit=PAGE_SIZE, offset=offset)
+                offset = offset + PAGE_SIZE if len(rows) == PAGE_SIZE else 0
+            except sqlite3.OperationalError as e:
+                if not is_busy(e):
+                    raise
+                busy += 1
+                continue
+            latencies.append(time.perf_counter() - began)
+    results.put(("reader", latencies, busy))
+
+def _stress_writer(path, journal_mode, seconds, hold_ms, batch, seed, ready, start, results):
+    # Rewrites batches of projects in transactions held open for hold_ms, like an import
+    rng = random.Random(seed)
+    with Database(path, concurrency=_stress_concurrency(journal_mode)) as db:
+        projects = db.execute_query("SELECT MAX(id) FROM projects", fetchone=True)[0]
+        ready.wait()
+        start.wait()
+        latencies, busy = [], 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            began = time.perf_counter()
+            try:
+                with db.transaction():
+                    db.execute_many("UPDATE projects SET active = NOT active WHERE id = ?",
+                                    [(i,) for i in rng.sample(range(1, projects + 1), batch)])
+                    time.sleep(hold_ms / 1000)
+            except sqlite3.OperationalError as e:
+                if not is_busy(e):
+                    raise
+                busy += 1
+                continue
+            latencies.append(time.perf_counter() - began)
+    results.put(("writer", latencies, busy))
+
+def _summary(latencies, busy, seconds):
+    ordered = sorted(latencies) or [0.0]
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+    return {"ops": len(latencies), "ops_per_second": len(latencies) / seconds, "busy_errors": busy,
+            "p50_ms": percentile(0.5), "p99_ms": percentile(0.99), "max_ms": ordered[-1] * 1000}
+
+def stress(path, journal_mode="wal", readers=4, writers=1, seconds=10.0, hold_ms=200, batch=20, seed=DEFAULT_SEED):
+    """Run reader and writer processes against path at once; returns latency stats per role.
+
+    With WAL no reader ever waits for a writer, so readers see no busy errors.
+    With a rollback journal a reader is locked out while a writer commits.
+    """
+    # Switch the file to the journal mode under test before any worker opens it
+    Database(path, concurrency=_stress_concurrency(journal_mode)).close()
+    context = multiprocessing.get_context("spawn")
+    ready = context.Barrier(readers + writers + 1)
+    start = context.Event()
+    results = context.Queue()
+    processes = [context.Process(target=_stress_reader, args=(path, journal_mode, seconds, ready, start, results))
+                 for _ in range(readers)]
+    processes += [context.Process(target=_stress_writer, args=(path, journal_mode, seconds, hold_ms, batch, seed + i, ready, start, results))
+                  for i in range(writers)]
+    for process in processes:
+        process.start()
+    ready.wait()
+    start.set()
+    collected = {"reader": ([], 0), "writer": ([], 0)}
+    for _ in processes:
+        while True:
+            try:
+                role, latencies, busy = results.get(timeout=1)
+                break
+            except queue.Empty:
+                if any(p.exitcode for p in processes):
+                    for process in processes:
+                        process.terminate()
+                    raise RuntimeError("A stress test process failed.")
+        all_latencies, all_busy = collected[role]
+        collected[role] = (all_latencies + latencies, all_busy + busy)
+    for process in processes:
+        process.join()
+    report = {
+        "meta": {"sqlite": sqlite3.sqlite_version, "journal_mode": journal_mode, "readers": readers,
+                 "writers": writers, "seconds": seconds, "hold_ms": hold_ms, "batch": batch},
+        "reader": _summary(*collected["reader"], seconds),
+        "writer": _summary(*collected["writer"], seconds),
+    }
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the model/controller layer on synthetic data.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="time controller operations and write JSON results")
+    run_parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=["1k", "10k"])
+    run_parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    run_parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    run_parser.add_argument("--data-dir", help="where generated databases are kept and reused (default: a new temp dir)")
+    run_parser.add_argument("--only", nargs="+", help="run only benchmarks whose name contains one of these")
+    run_parser.add_argument("--output", help="JSON file to write (default: stdout)")
+
+    generate_parser = commands.add_parser("generate", help="write one synthetic database")
+    generate_parser.add_argument("path")
+    generate_parser.add_argument("--projects", type=int, default=SCALES["10k"])
+    generate_parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+
+    compare_parser = commands.add_parser("compare", help="compare two JSON result files")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+
+    stress_parser = commands.add_parser("stress", help="run concurrent reader and writer processes on one database")
+    stress_parser.add_argument("--journal-mode", choices=["wal", "delete"], default="wal")
+    stress_parser.add_argument("--readers", type=int, default=4)
+    stress_parser.add_argument("--writers", type=int, default=1)
+    stress_parser.add_argument("--seconds", type=float, default=10.0)
+    stress_parser.add_argument("--hold-ms", type=int, default=200, help="how long each write transaction stays open")
+    stress_parser.add_argument("--batch", type=int, default=20, help="projects updated per write transaction")
+    stress_parser.add_argument("--scale", choices=list(SCALES), default="10k")
+    stress_parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    stress_parser.add_argument("--data-dir", help="where the stress database is kept and reused (default: a new temp dir)")
+    stress_parser.add_argument("--output", help="JSON file to write (default: stdout)")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        results = run(args.scales, args.repeat, args.seed, args.data_dir, args.only)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+        else:
+            json.dump(results, sys.stdout, indent=2)
+            print()
+    elif args.command == "generate":
+        generate(args.path, args.projects, args.seed)
+    elif args.command == "stress":
+        data_dir = args.data_dir or tempfile.mkdtemp(prefix="apm-stress-")
+        os.makedirs(data_dir, exist_ok=True)
+        path = os.path.join(data_dir, f"stress-{args.scale}-{args.seed}.db")
+        if not os.path.exists(path):
+            generate(path, SCALES[args.scale], args.seed)
+        results = stress(path, args.journal_mode, args.readers, args.writers, args.seconds, args.hold_ms, args.batch, args.seed)
+        for role in ("reader", "writer"):
+            r = results[role]
+            print(f"{role:>6}: {r['ops']:6d} ops  p50 {r['p50_ms']:8.2f} ms  p99 {r['p99_ms']:8.2f} ms  "
+                  f"max {r['max_ms']:8.2f} ms  busy errors {r['busy_errors']}", file=sys.stderr)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+        else:
+            json.dump(results, sys.stdout, indent=2)
+            print()
+    elif args.command == "compare":
+        with open(args.before) as f:
+            before = json.load(f)
+        with open(args.after) as f:
+            after = json.load(f)
+        compare(before, after)
+
+if __name__ == "__main__":
+    main()
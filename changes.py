@@ -0,0 +1,93 @@
+# --- Change Tracking ---
+# data_version holds one counter that every insert, update and delete of a
+# project, contact or project role advances. row_versions records, per entity
+# row, the counter value of its last change and whether that change deleted it,
+# so "what changed since version N" is a range scan instead of a reload.
+# A project's row also changes when its roles change or when a contact holding
+# one of its roles is renamed, since project lists show those names.
+
+PROJECT = "project"
+CONTACT = "contact"
+
+def _bump():
+    return "UPDATE data_version SET version = version + 1;"
+
+# An upsert rather than INSERT OR REPLACE: a conflict policy given by the
+# statement firing a trigger (e.g. INSERT OR ABORT) overrides OR REPLACE inside it
+_UPSERT = "ON CONFLICT(entity, entity_id) DO UPDATE SET version = excluded.version, deleted = excluded.deleted"
+
+def _mark(entity, entity_id, deleted=0):
+    return f"""INSERT INTO row_versions (entity, entity_id, version, deleted)
+        VALUES ('{entity}', {entity_id}, (SELECT version FROM data_version), {deleted}) {_UPSERT};"""
+
+def _mark_contact_projects(contact_id):
+    return f"""INSERT INTO row_versions (entity, entity_id, version, deleted)
+        SELECT DISTINCT '{PROJECT}', project_id, (SELECT version FROM data_version), 0
+        FROM project_roles WHERE contact_id = {contact_id} {_UPSERT};"""
+
+CHANGE_TRACKING_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS data_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)",
+    """CREATE TABLE IF NOT EXISTS row_versions (
+        entity TEXT NOT NULL,
+        entity_id INTEGER NOT NULL,
+        version INTEGER NOT NULL,
+        deleted BOOLEAN NOT NULL DEFAULT 0,
+        PRIMARY KEY (entity, entity_id)
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS idx_row_versions_version ON row_versions(entity, version)",
+    # projects
+    f"""CREATE TRIGGER IF NOT EXISTS projects_version_ai AFTER INSERT ON projects BEGIN
+        {_bump()} {_mark(PROJECT, 'new.id')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS projects_version_au AFTER UPDATE ON projects BEGIN
+        {_bump()} {_mark(PROJECT, 'new.id')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS projects_version_ad AFTER DELETE ON projects BEGIN
+        {_bump()} {_mark(PROJECT, 'old.id', 1)}
+    END""",
+    # project roles
+    f"""CREATE TRIGGER IF NOT EXISTS project_roles_version_ai AFTER INSERT ON project_roles BEGIN
+        {_bump()} {_mark(PROJECT, 'new.project_id')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS project_roles_version_au AFTER UPDATE ON project_roles BEGIN
+        {_bump()} {_mark(PROJECT, 'old.project_id')} {_mark(PROJECT, 'new.project_id')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS project_roles_version_ad AFTER DELETE ON project_roles BEGIN
+        {_bump()} {_mark(PROJECT, 'old.project_id')}
+    END""",
+    # contacts
+    f"""CREATE TRIGGER IF NOT EXISTS contacts_version_ai AFTER INSERT ON contacts BEGIN
+        {_bump()} {_mark(CONTACT, 'new.id')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS contacts_version_au AFTER UPDATE ON contacts BEGIN
+        {_bump()} {_mark(CONTACT, 'new.id')} {_mark_contact_projects('new.id')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS contacts_version_ad AFTER DELETE ON contacts BEGIN
+        {_bump()} {_mark(CONTACT, 'old.id', 1)}
+    END""",
+]
+
+# Task statuses are shown as project progress, so they count as project changes
+TASK_STATUS_TRACKING = [
+    f"""CREATE TRIGGER IF NOT EXISTS project_stage_tasks_version_ai AFTER INSERT ON project_stage_tasks BEGIN
+        {_bump()} {_mark(PROJECT, 'new.project_id')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS project_stage_tasks_version_au AFTER UPDATE ON project_stage_tasks BEGIN
+        {_bump()} {_mark(PROJECT, 'old.project_id')} {_mark(PROJECT, 'new.project_id')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS project_stage_tasks_version_ad AFTER DELETE ON project_stage_tasks BEGIN
+        {_bump()} {_mark(PROJECT, 'old.project_id')}
+    END""",
+]
+
+def mark_all(connection, version, deleted=0):
+    """Record every project and contact row as changed (or deleted) at version.
+
+    For replacing the data wholesale, e.g. restoring a snapshot: processes
+    syncing from an earlier version then reload every row.
+    """
+    for entity, table in ((PROJECT, "projects"), (CONTACT, "contacts")):
+        # WHERE true: without it the upsert clause would be parsed as a join constraint
+        connection.execute(f"""INSERT INTO row_versions (entity, entity_id, version, deleted)
+            SELECT '{entity}', id, {int(version)}, {int(deleted)} FROM {table} WHERE true {_UPSERT}""")
@@ -0,0 +1,176 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+
+# --- Concurrent Access ---
+# Several processes may open the same database file: the app on two
+# workstations, the API server, a backup job. Concurrency says how a Database
+# shares the file with them. In WAL mode readers work from a snapshot and never
+# wait for the writer; writers still take turns. A writer that finds the file
+# locked waits up to busy_timeout_ms inside SQLite, and statements that still
+# fail with "database is locked" are retried with exponential backoff.
+#
+# WAL needs shared memory between the processes, so every process must run on
+# the machine holding the file; on a network share it corrupts the database.
+# The journal mode is stored in the file and shared by everyone who opens it,
+# so by default a Database keeps the mode the file already has (the rollback
+# journal for a new file) and only an explicit journal_mode switches it.
+
+JOURNAL_MODES = ("wal", "delete", "truncate", "persist")
+SYNCHRONOUS = ("off", "normal", "full", "extra")
+# File systems reported by /proc/mounts for network shares
+NETWORK_FILESYSTEMS = {"nfs", "nfs4", "cifs", "smbfs", "smb3", "afs", "ncpfs", "9p", "fuse.sshfs", "davfs"}
+
+class JournalModeError(sqlite3.OperationalError):
+    """The database file cannot be opened in the journal mode asked for."""
+
+class Concurrency:
+    """Journal mode, locking and retry settings for a Database.
+
+    journal_mode: "wal", one of the rollback journal modes, or None to keep the
+    file's mode.
+    synchronous: "normal" is durable across application crashes and, in WAL
+    mode, only loses the last commits on power loss; "full" also survives that.
+    None picks "normal" in WAL mode and "full" otherwise.
+    busy_timeout_ms: how long SQLite waits for a lock before failing.
+    retries, backoff_ms, max_backoff_ms: how often and how long to back off
+    (doubling, with jitter) when a statement fails with a busy database anyway.
+    autocheckpoint: WAL pages after which a committing connection copies the
+    WAL back into the database; 0 leaves checkpoints to checkpoint_interval.
+    checkpoint_interval: seconds between background PASSIVE checkpoints, None for none.
+    """
+    def __init__(self, journal_mode=None, synchronous=None, busy_timeout_ms=5000,
+                 retries=5, backoff_ms=20, max_backoff_ms=1000, autocheckpoint=1000, checkpoint_interval=30.0):
+        if journal_mode is not None and journal_mode not in JOURNAL_MODES:
+            raise ValueError(f"Unknown journal mode {journal_mode!r}.")
+        if synchronous is not None and synchronous not in SYNCHRONOUS:
+            raise ValueError(f"Unknown synchronous setting {synchronous!r}.")
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.busy_timeout_ms = busy_timeout_ms
+        self.retries = retries
+        self.backoff_ms = backoff_ms
+        self.max_backoff_ms = max_backoff_ms
+        self.autocheckpoint = autocheckpoint
+        self.checkpoint_interval = checkpoint_interval
+
+    def configure(self, connection):
+        """Apply the per-connection settings to a new connection."""
+        connection.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        wal = connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        connection.execute(f"PRAGMA synchronous = {self.synchronous or ('normal' if wal else 'full')}")
+        if wal:
+            connection.execute(f"PRAGMA wal_autocheckpoint = {int(self.autocheckpoint)}")
+
+    def set_journal_mode(self, connection, path=None):
+        """Give the database file journal_mode, or keep its mode when that is None; returns the mode in use.
+
+        The mode persists in the file. Raises JournalModeError for WAL on a
+        network share, or when other programs keep the file open in another mode.
+        """
+        current = connection.execute("PRAGMA journal_mode").fetchone()[0]
+        mode = self.journal_mode or current
+        if mode == "wal" and path is not None and on_network_share(path):
+            raise JournalModeError(
+                f"{path} is on a network share, where WAL journal mode would corrupt it. "
+                "Open it in the rollback journal mode (delete) instead.")
+        if mode != current:
+            try:
+                current = self.retry(lambda: connection.execute(f"PRAGMA journal_mode = {mode}").fetchone()[0])
+            except sqlite3.OperationalError as e:
+                if not is_busy(e):
+                    raise
+            if current != mode:
+                # Leaving WAL needs every other connection to the file closed
+                raise JournalModeError(
+                    f"The database is in {current!r} journal mode and other programs have it open, "
+                    f"so it cannot be switched to {mode!r}. Open it in {current!r} mode, or close the others first.")
+        return mode
+
+    def delays(self):
+        """Seconds to sleep before each retry."""
+        delay = self.backoff_ms
+        for _ in range(self.retries):
+            yield min(delay, self.max_backoff_ms) * random.uniform(0.5, 1.0) / 1000
+            delay *= 2
+
+    def retry(self, fn, *args):
+        """Call fn(*args), retrying with backoff while it fails with a busy database."""
+        for delay in self.delays():
+            try:
+                return fn(*args)
+            except sqlite3.OperationalError as e:
+                if not is_busy(e):
+                    raise
+            time.sleep(delay)
+        return fn(*args)
+
+# The settings of the original code: rollback journal, Python's 5 s timeout, no retries
+Concurrency.ROLLBACK = Concurrency("delete", "full", busy_timeout_ms=5000, retries=0, checkpoint_interval=None)
+# Switches the file to WAL: only when every program using it runs on the machine holding it
+Concurrency.WAL = Concurrency("wal")
+Concurrency.DEFAULT = Concurrency()
+
+_BUSY_CODES = {sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED}
+
+def on_network_share(path):
+    """Whether path lies on a network file system, as far as the operating system tells."""
+    path = os.path.realpath(path)
+    if os.name == "nt":
+        if path.startswith("\\\\"):
+            return True  # UNC path, \\server\share
+        import ctypes
+        DRIVE_REMOTE = 4
+        return ctypes.windll.kernel32.GetDriveTypeW(os.path.splitdrive(path)[0] + "\\") == DRIVE_REMOTE
+    try:
+        with open("/proc/mounts") as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return False  # no way to tell here, e.g. on macOS
+    # The file system of the longest mount point holding path; spaces are escaped as \040
+    fstype = None
+    longest = -1
+    for point, kind in mounts:
+        point = point.replace("\\040", " ")
+        if (path == point or path.startswith(point.rstrip("/") + "/")) and len(point) > longest:
+            fstype, longest = kind, len(point)
+    return fstype in NETWORK_FILESYSTEMS
+
+def is_busy(error):
+    """Whether error means another connection holds a lock on the database."""
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        # Extended codes (e.g. SQLITE_BUSY_SNAPSHOT) keep the primary code in the low byte
+        return code & 0xFF in _BUSY_CODES
+    return isinstance(error, sqlite3.OperationalError) and "locked" in str(error)
+
+class Checkpointer:
+    """Runs a PASSIVE checkpoint every `interval` seconds on its own connection.
+
+    A passive checkpoint copies what it can without waiting for readers or the
+    writer. It keeps the WAL short after bursts of writes too small to trigger
+    an autocheckpoint, and takes the work off commits when autocheckpoint is 0.
+    """
+    def __init__(self, connect, interval):
+        self._connect = connect
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="wal-checkpoint", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        connection = self._connect()
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    connection.execute("PRAGMA wal_checkpoint(PASSIVE)")
+                except sqlite3.OperationalError:
+                    pass  # retried on the next tick
+        finally:
+            connection.close()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
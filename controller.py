@@ -1,31 +1,86 @@
+import os
+from dataclasses import replace
+from itertools import groupby
+from changes import CONTACT, PROJECT
+from documents import DocumentScanner
+from search import matches
 from models import (
-    ProjectModel, ContactModel, StageModel, TaskModel, ProjectRoleModel, ProjectStageTaskModel,
+    ProjectModel, ContactModel, StageModel, TaskModel, ProjectRoleModel, ProjectStageTaskModel, ReferenceData,
+    ContactDirectory, ChangeModel, StageProgressModel, DocumentModel,
     Project, Contact, ProjectSchema, ContactSchema, TaskSchema
 )
 
 class Controller:
-    def __init__(self, db):
+    def __init__(self, db, backup_options=None):
+        self.db = db
+        # Keyword arguments for backup.BackupService, which is built on first use;
+        # by default snapshots go to "backups" next to the database
+        self.backup_options = backup_options or {}
+        self._backups = None
         self.project_model = ProjectModel(db)
         self.contact_model = ContactModel(db)
         self.stage_model = StageModel(db)
         self.task_model = TaskModel(db)
         self.project_role_model = ProjectRoleModel(db)
         self.project_stage_task_model = ProjectStageTaskModel(db)
+        self.reference_data = ReferenceData(self.stage_model, self.task_model)
+        self.change_model = ChangeModel(db)
+        self.contact_directory = ContactDirectory(self.contact_model, self.change_model)
+        self.stage_progress_model = StageProgressModel(db)
+        self.document_model = DocumentModel(db)
+
+    def transaction(self):
+        return self.db.transaction()
+
+    def snapshot(self):
+        # Consistent reads across several calls, without taking the write lock
+        return self.db.snapshot()
+
+    @property
+    def query_log(self):
+        # The Database's QueryLog, or None when queries are not being recorded
+        return self.db.query_log
+
+    # Change tracking
+    def data_version(self):
+        return self.change_model.version()
+
+    def project_changes_since(self, version):
+        # (current version, changed project ids, deleted project ids); version None only reads the current one
+        if version is None:
+            return self.data_version(), [], []
+        return self.change_model.changed_since(PROJECT, version)
+
+    def contact_changes_since(self, version):
+        if version is None:
+            return self.data_version(), [], []
+        return self.change_model.changed_since(CONTACT, version)
 
     # Project
-    def create_project(self, location, start_date, end_date, active, stage_id, document_path):
+    @staticmethod
+    def validate_project(project: Project):
         # Validation: End Date must not precede Start Date, but only if not active and end_date is set
-        if not active and end_date:
-            if end_date < start_date:
-                raise ValueError("End Date must not precede Start Date.")
-        project = Project(None, location, start_date, end_date, active, stage_id, document_path)
-        return self.project_model.create(project)
-
-    def update_project(self, project: Project):
         if not project.active and project.end_date:
             if project.end_date < project.start_date:
                 raise ValueError("End Date must not precede Start Date.")
-        self.project_model.update(project)
+
+    def create_project(self, location, start_date, end_date, active, stage_id, document_path, roles=()):
+        project = Project(None, location, start_date, end_date, active, stage_id, document_path)
+        self.validate_project(project)
+        # roles: iterable of (contact_id, role), written in the same transaction as the project
+        with self.db.transaction():
+            project_id = self.project_model.create(project)
+            for contact_id, role in roles:
+                self.project_role_model.add(project_id, contact_id, role)
+        return project_id
+
+    def update_project(self, project: Project, roles=None):
+        self.validate_project(project)
+        # roles: optional iterable of (contact_id, role) replacing all of the project's roles
+        with self.db.transaction():
+            self.project_model.update(project)
+            if roles is not None:
+                self.set_project_roles(project.id, roles)
 
     def delete_project(self, project_id):
         self.project_model.delete(project_id)
@@ -33,39 +88,75 @@ class Controller:
     def get_project(self, project_id):
         return self.project_model.get(project_id)
 
-    def list_projects(self, search="", active_only=False):
-        return self.project_model.list(search, active_only)
+    def list_projects(self, search="", active_only=False, limit=None, offset=0, order_by=None):
+        return self.project_model.list(search, active_only, limit, offset, order_by)
+
+    def iter_projects(self, search="", active_only=False, order_by=None, arraysize=500):
+        # Like list_projects without paging, streamed from the cursor arraysize rows at a time
+        return self.project_model.iter(search, active_only, order_by, arraysize=arraysize)
+
+    def list_projects_for_contact(self, contact_id):
+        # (Project, role) pairs for every role the contact holds
+        return self.project_model.list_for_contact(contact_id)
 
     # Contact
     def create_contact(self, first_name, last_name, phone, email, address):
         contact = Contact(None, first_name, last_name, phone, email, address)
-        return self.contact_model.create(contact)
+        contact = replace(contact, id=self.contact_model.create(contact))
+        self.contact_directory.put(contact)
+        return contact.id
 
     def update_contact(self, contact: Contact):
         self.contact_model.update(contact)
+        self.contact_directory.put(contact)
 
     def delete_contact(self, contact_id):
         self.contact_model.delete(contact_id)
+        self.contact_directory.remove(contact_id)
 
     def get_contact(self, contact_id):
         return self.contact_model.get(contact_id)
 
-    def list_contacts(self, search=""):
-        return self.contact_model.list(search)
+    def list_contacts(self, search="", limit=None, offset=0, order_by=None, ids=None):
+        # order_by: (sort key, descending) pairs, see models.CONTACT_SORT_KEYS
+        # ids: only consider these contacts
+        return self.contact_model.list(search, limit, offset, order_by, ids)
+
+    def iter_contacts(self, search="", order_by=None, ids=None, arraysize=500):
+        return self.contact_model.iter(search, order_by, ids, arraysize)
+
+    def contact_display_names(self):
+        # Unique labels for contact pickers; duplicate full names carry the contact id
+        self.contact_directory.sync()
+        return self.contact_directory.display_names()
+
+    def contact_by_display_name(self, name):
+        self.contact_directory.sync()
+        return self.contact_directory.by_display_name(name)
 
-    # Stage
+    def contact_display_name(self, contact_id):
+        contact = self.contact_directory.get(contact_id)
+        return self.contact_directory.display_name(contact) if contact else None
+
+    # Stage (served from the reference data cache)
     def list_stages(self):
-        return self.stage_model.list()
+        return self.reference_data.stages()
 
     def get_stage(self, stage_id):
-        return self.stage_model.get(stage_id)
+        return self.reference_data.stage_by_id(stage_id)
+
+    def stage_by_name(self, name):
+        return self.reference_data.stage_by_name(name)
 
-    # Task
+    # Task (served from the reference data cache)
     def list_tasks_by_stage(self, stage_id):
-        return self.task_model.list_by_stage(stage_id)
+        return self.reference_data.tasks_by_stage(stage_id)
 
     def get_task(self, task_id):
-        return self.task_model.get(task_id)
+        return self.reference_data.task_by_id(task_id)
+
+    def invalidate_reference_data(self):
+        self.reference_data.invalidate()
 
     # Project Roles
     def list_project_roles(self, project_id):
@@ -77,6 +168,12 @@ class Controller:
     def remove_project_role(self, project_role_id):
         self.project_role_model.remove(project_role_id)
 
+    def set_project_roles(self, project_id, roles):
+        with self.db.transaction():
+            self.project_role_model.remove_by_project(project_id)
+            for contact_id, role in roles:
+                self.project_role_model.add(project_id, contact_id, role)
+
     # Project Stage Tasks
     def list_project_stage_tasks(self, project_id):
         return self.project_stage_task_model.list_by_project(project_id)
@@ -84,6 +181,87 @@ class Controller:
     def set_project_stage_task_done(self, project_stage_task_id, is_done):
         self.project_stage_task_model.set_done(project_stage_task_id, is_done)
 
+    def set_project_task_done(self, project_id, task_id, is_done):
+        self.project_stage_task_model.set_many(project_id, {task_id: is_done})
+
+    def set_tasks_done(self, statuses_by_project):
+        # {project_id: {task_id: is_done}}, written in one transaction
+        with self.db.transaction():
+            for project_id, statuses in statuses_by_project.items():
+                self.project_stage_task_model.set_many(project_id, statuses)
+
+    # Progress
+    def list_project_progress(self, active_only=True, limit=None, offset=0, ids=None):
+        # ProjectProgress for every (active) project, from one query
+        return self.stage_progress_model.list(active_only, limit, offset, ids)
+
+    def iter_project_progress(self, active_only=True, ids=None, arraysize=500):
+        return self.stage_progress_model.iter(active_only, ids, arraysize)
+
+    def stage_task_totals(self):
+        # stage_id -> number of tasks in the stage, from the reference data cache
+        return {stage.id: len(self.list_tasks_by_stage(stage.id)) for stage in self.list_stages()}
+
+    # Documents
+    def scan_documents(self, project_ids=None):
+        # Catalog the files in the projects' document folders; returns a documents.ScanResult
+        return DocumentScanner(self).scan(project_ids)
+
+    def search_documents(self, search="", project_id=None, limit=None, offset=0):
+        # (Document, project location) pairs from the catalog, without touching the file server
+        return self.document_model.search(search, project_id, limit, offset)
+
+    def document_file_path(self, project_id, path):
+        # Where a catalogued document (path relative to its project's folder) lives on disk
+        project = self.get_project(project_id)
+        return os.path.join(project.document_path, path) if project else None
+
+    # Backups
+    @property
+    def backups(self):
+        if self._backups is None:
+            from backup import BackupService  # not needed to open the database or show the window
+            self._backups = BackupService(self.db, **self.backup_options)
+        return self._backups
+
+    def stop_backups(self):
+        # Stop scheduled snapshots, waiting for one in progress; nothing to do if none were ever used
+        if self._backups is not None:
+            self._backups.stop()
+
+    def list_backups(self):
+        return self.backups.snapshots()
+
+    def create_backup(self, progress=None):
+        # A verified snapshot of the database, taken while others keep reading and writing
+        return self.backups.create(progress)
+
+    def verify_backup(self, path):
+        # Problems found by PRAGMA integrity_check; [] when the snapshot is sound
+        return self.backups.verify(path)
+
+    def restore_backup(self, path):
+        # Replace all data with the snapshot's; returns the snapshot holding the replaced data
+        current = self.backups.restore(path)
+        self.reference_data.invalidate()
+        self.contact_directory.invalidate()
+        return current
+
+    # Search
+    def project_search_fields(self, project_schema):
+        # The fields list_projects(search) looks at, for refining loaded results in memory
+        if self.db.full_text_search:
+            return [project_schema.location, project_schema.document_path] + [n for n in project_schema.roles.values() if n]
+        return [project_schema.location]
+
+    def contact_search_fields(self, contact):
+        if self.db.full_text_search:
+            return [contact.first_name, contact.last_name, contact.phone, contact.email, contact.address]
+        return [contact.first_name, contact.last_name]
+
+    def matches_search(self, fields, search):
+        return matches(fields, search, self.db.full_text_search)
+
     # --- Schema Abstraction Methods ---
     def get_project_schema(self, project_id):
         project = self.get_project(project_id)
@@ -91,27 +269,57 @@ class Controller:
             return None
         stage = self.get_stage(project.stage_id)
         stage_name = stage.name if stage else ""
-        # Build roles dict: label -> contact name
+        self.contact_directory.sync()
+        role_names = self._role_names((r.role, r.contact_id) for r in self.list_project_roles(project.id))
+        return ProjectSchema(project, stage_name, self._build_roles(role_names))
+
+    def list_project_schemas(self, search="", active_only=False, limit=None, offset=0, order_by=None, ids=None):
+        # Builds every ProjectSchema from a single joined query instead of one
+        # get_project_schema call (and its four queries) per project.
+        # order_by: (sort key, descending) pairs, see models.PROJECT_SORT_KEYS
+        # ids: only consider these projects
+        return list(self._project_schemas(self.project_model.list_with_roles(search, active_only, limit, offset, order_by, ids)))
+
+    def iter_project_schemas(self, search="", active_only=False, order_by=None, ids=None, arraysize=500):
+        # Like list_project_schemas without paging; only the current project's rows are held at a time
+        return self._project_schemas(self.project_model.list_with_roles(
+            search, active_only, None, 0, order_by, ids, arraysize))
+
+    def _project_schemas(self, rows):
+        # One ProjectSchema per run of list_with_roles rows sharing a project id
+        for _, group in groupby(rows, key=lambda row: row[0]):
+            group = list(group)
+            project = Project(*group[0][:7])
+            stage_name = group[0][7] or ""
+            role_names = [(role, name) for *_, role, name in group if name is not None]
+            yield ProjectSchema(project, stage_name, self._build_roles(role_names))
+
+    def _role_names(self, role_contacts):
+        # (role, contact_id) -> (role, contact display name); contacts not cached yet are
+        # read from the database, so only roles of contacts that no longer exist are skipped
+        role_names = []
+        for role, contact_id in role_contacts:
+            name = self.contact_display_name(contact_id)
+            if name is not None:
+                role_names.append((role, name))
+        return role_names
+
+    def _build_roles(self, role_names):
+        # Build roles dict: label -> contact name, from (role, contact name) pairs
         roles = {label: "" for label in ProjectSchema.ROLE_LABELS}
-        project_roles = self.list_project_roles(project.id)
-        contacts = self.list_contacts()
         # Map roles to labels
         role_label_map = {"Customer": ["Customer 1", "Customer 2"], "Constructor": "Constructor", "Inspector": "Inspector", "Consultant": "Consultant"}
         customer_count = 0
-        for r in project_roles:
-            contact = next((c for c in contacts if c.id == r.contact_id), None)
-            if not contact:
-                continue
-            name = f"{contact.first_name} {contact.last_name}"
-            if r.role == "Customer":
+        for role, name in role_names:
+            if role == "Customer":
                 label = role_label_map["Customer"][customer_count] if customer_count < 2 else None
                 if label:
                     roles[label] = name
                 customer_count += 1
             else:
-                label = role_label_map[r.role]
+                label = role_label_map[role]
                 roles[label] = name
-        return ProjectSchema(project, stage_name, roles)
+        return roles
 
     def get_contact_schema(self, contact_id):
         contact = self.get_contact(contact_id)
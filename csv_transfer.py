@@ -0,0 +1,241 @@
+import argparse
+import csv
+import os
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+from models import Contact, Project, ProjectRole
+
+# --- Bulk CSV Import/Export ---
+# A data set is a folder holding projects.csv, contacts.csv and project_roles.csv.
+# Exports stream rows from a cursor, so memory stays flat however large the tables
+# are. Imports validate each row, skip (and report) invalid ones, and insert the rest
+# with executemany in chunked transactions. Files are UTF-8 with a byte order mark
+# so that Excel opens the Hebrew text correctly.
+
+PROJECT_COLUMNS = ["id", "location", "start_date", "end_date", "active", "stage", "document_path"]
+CONTACT_COLUMNS = ["id", "first_name", "last_name", "phone", "email", "address"]
+ROLE_COLUMNS = ["project_id", "contact_id", "role"]
+ROLES = ("Customer", "Inspector", "Constructor", "Consultant")
+
+FILES = {
+    "contacts": "contacts.csv",
+    "projects": "projects.csv",
+    "project_roles": "project_roles.csv",
+}
+
+CHUNK_SIZE = 5000
+ENCODING = "utf-8-sig"
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)  # (line number, message)
+
+class CsvTransfer:
+    def __init__(self, controller, chunk_size=CHUNK_SIZE):
+        self.controller = controller
+        self.chunk_size = chunk_size
+
+    # Export
+    def export_projects(self, path):
+        with open(path, "w", newline="", encoding=ENCODING) as f:
+            writer = csv.writer(f)
+            writer.writerow(PROJECT_COLUMNS)
+            for p in self.controller.project_model.iter_all():
+                stage = self.controller.get_stage(p.stage_id)
+                writer.writerow([p.id, p.location, p.start_date, p.end_date or "", int(bool(p.active)),
+                                 stage.name if stage else "", p.document_path])
+
+    def export_contacts(self, path):
+        with open(path, "w", newline="", encoding=ENCODING) as f:
+            writer = csv.writer(f)
+            writer.writerow(CONTACT_COLUMNS)
+            for c in self.controller.contact_model.iter_all():
+                writer.writerow([c.id, c.first_name, c.last_name, c.phone, c.email, c.address])
+
+    def export_project_roles(self, path):
+        with open(path, "w", newline="", encoding=ENCODING) as f:
+            writer = csv.writer(f)
+            writer.writerow(ROLE_COLUMNS)
+            for r in self.controller.project_role_model.iter_all():
+                writer.writerow([r.project_id, r.contact_id, r.role])
+
+    def export_all(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        # One snapshot for all three files, so every exported role refers to exported rows
+        with self.controller.snapshot():
+            self.export_contacts(os.path.join(directory, FILES["contacts"]))
+            self.export_projects(os.path.join(directory, FILES["projects"]))
+            self.export_project_roles(os.path.join(directory, FILES["project_roles"]))
+
+    # Import
+    def import_projects(self, path) -> ImportResult:
+        return self._import(path, self._parse_project, self.controller.project_model.create_many,
+                            self._check_ids("projects"))
+
+    def import_contacts(self, path) -> ImportResult:
+        try:
+            return self._import(path, self._parse_contact, self.controller.contact_model.create_many,
+                                self._check_ids("contacts"))
+        finally:
+            # Even after a failure: the chunks committed before it added contacts
+            self.controller.contact_directory.invalidate()
+
+    def import_project_roles(self, path) -> ImportResult:
+        return self._import(path, self._parse_role, self.controller.project_role_model.add_many, self._check_roles)
+
+    def import_all(self, directory):
+        """Import a folder written by export_all; returns {table: ImportResult} for the files present."""
+        results = {}
+        # Contacts and projects first, so roles can refer to them
+        for table, load in (("contacts", self.import_contacts), ("projects", self.import_projects),
+                            ("project_roles", self.import_project_roles)):
+            path = os.path.join(directory, FILES[table])
+            if os.path.exists(path):
+                results[table] = load(path)
+        return results
+
+    def _import(self, path, parse, insert_many, check=None) -> ImportResult:
+        # check(chunk, errors), if given, validates a whole chunk of (line, item) pairs
+        # at once and returns the items to insert
+        result = ImportResult()
+        chunk = []
+        with open(path, newline="", encoding=ENCODING) as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                try:
+                    chunk.append((reader.line_num, parse(row)))
+                except (ValueError, TypeError, KeyError) as e:
+                    result.errors.append((reader.line_num, str(e)))
+                    continue
+                if len(chunk) >= self.chunk_size:
+                    result.imported += self._insert_chunk(insert_many, chunk, check, result.errors)
+                    chunk = []
+        if chunk:
+            result.imported += self._insert_chunk(insert_many, chunk, check, result.errors)
+        return result
+
+    def _insert_chunk(self, insert_many, chunk, check, errors):
+        with self.controller.transaction():
+            items = check(chunk, errors) if check else [item for _, item in chunk]
+            insert_many(items)
+        return len(items)
+
+    def _existing(self, table, ids):
+        # The ones of ids present in table, in one lookup
+        ids = list(ids)
+        placeholders = ", ".join("?" * len(ids))
+        rows = self.controller.db.execute_query(f"SELECT id FROM {table} WHERE id IN ({placeholders})", ids, fetchall=True)
+        return {row[0] for row in rows}
+
+    def _check_ids(self, table):
+        # A check for _import: rows whose id is already taken, in the table or by an
+        # earlier row of the chunk, are reported instead of failing the whole chunk
+        def check(chunk, errors):
+            taken = self._existing(table, {item.id for _, item in chunk if item.id is not None})
+            valid = []
+            for line, item in chunk:
+                if item.id is not None:
+                    if item.id in taken:
+                        errors.append((line, f"Id {item.id} is already in use."))
+                        continue
+                    taken.add(item.id)
+                valid.append(item)
+            return valid
+        return check
+
+    def _check_roles(self, chunk, errors):
+        # One lookup per chunk for the referenced projects and contacts
+        projects = self._existing("projects", {r.project_id for _, r in chunk})
+        contacts = self._existing("contacts", {r.contact_id for _, r in chunk})
+        # Roles have no id of their own in the file, so a role already held (in the
+        # table or earlier in the chunk) is a duplicate, e.g. from re-importing an export
+        held = self._existing_roles(projects)
+        valid = []
+        for line, r in chunk:
+            if r.project_id not in projects:
+                errors.append((line, f"Unknown project {r.project_id}."))
+            elif r.contact_id not in contacts:
+                errors.append((line, f"Unknown contact {r.contact_id}."))
+            elif (r.project_id, r.contact_id, r.role) in held:
+                errors.append((line, f"Contact {r.contact_id} is already {r.role} of project {r.project_id}."))
+            else:
+                held.add((r.project_id, r.contact_id, r.role))
+                valid.append(r)
+        return valid
+
+    def _existing_roles(self, project_ids):
+        # The (project_id, contact_id, role) triples held on these projects
+        project_ids = list(project_ids)
+        placeholders = ", ".join("?" * len(project_ids))
+        rows = self.controller.db.execute_query(
+            f"SELECT project_id, contact_id, role FROM project_roles WHERE project_id IN ({placeholders})",
+            project_ids, fetchall=True)
+        return {tuple(row) for row in rows}
+
+    # Row parsing and validation
+    def _parse_project(self, row) -> Project:
+        active = _parse_bool(row.get("active", "1"))
+        end_date = (row.get("end_date") or "").strip() or None
+        project = Project(_parse_id(row.get("id")), row.get("location") or "", (row.get("start_date") or "").strip(),
+                          None if active else end_date, active, self._parse_stage(row.get("stage")),
+                          row.get("document_path") or "")
+        self.controller.validate_project(project)
+        return project
+
+    def _parse_stage(self, value):
+        value = (value or "").strip()
+        if not value:
+            raise ValueError("Stage is required.")
+        stage = self.controller.stage_by_name(value)
+        if stage is None and value.isdigit():
+            stage = self.controller.get_stage(int(value))
+        if stage is None:
+            raise ValueError(f"Unknown stage {value!r}.")
+        return stage.id
+
+    def _parse_contact(self, row) -> Contact:
+        first_name = (row.get("first_name") or "").strip()
+        last_name = (row.get("last_name") or "").strip()
+        if not first_name or not last_name:
+            raise ValueError("First and last name are required.")
+        return Contact(_parse_id(row.get("id")), first_name, last_name,
+                       row.get("phone") or "", row.get("email") or "", row.get("address") or "")
+
+    def _parse_role(self, row) -> ProjectRole:
+        role = (row.get("role") or "").strip()
+        if role not in ROLES:
+            raise ValueError(f"Unknown role {role!r}.")
+        return ProjectRole(None, int(row["project_id"]), int(row["contact_id"]), role)
+
+def _parse_id(value):
+    value = (value or "").strip()
+    return int(value) if value else None
+
+def _parse_bool(value):
+    value = (value or "").strip().lower()
+    if value in ("1", "true", "yes", "y"):
+        return True
+    if value in ("0", "false", "no", "n", ""):
+        return False
+    raise ValueError(f"Not a yes/no value: {value!r}.")
+
+if __name__ == "__main__":
+    from controller import Controller
+    from models import Database
+
+    parser = argparse.ArgumentParser(description="Bulk CSV import/export of projects, contacts and roles.")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("directory", help="folder holding projects.csv, contacts.csv and project_roles.csv")
+    parser.add_argument("--db", default="projects.db")
+    args = parser.parse_args()
+    with Database(args.db) as db:
+        transfer = CsvTransfer(Controller(db))
+        if args.action == "export":
+            transfer.export_all(args.directory)
+        else:
+            for table, result in transfer.import_all(args.directory).items():
+                print(f"{table}: {result.imported} imported, {len(result.errors)} skipped")
+                for line, message in result.errors:
+                    print(f"  line {line}: {message}")
@@ -0,0 +1,197 @@
+import hashlib
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Tuple
+
+from search import fts5_available
+
+# --- Document Catalog ---
+# The files under each project's document folder are recorded in the documents
+# table (path relative to the folder, size, mtime, SHA-256), so they can be
+# searched across all projects without touching the file server. A rescan stats
+# every file but only reads the new and changed ones: a file whose size and
+# mtime match the catalog keeps its recorded hash. Folders are listed and files
+# hashed on a thread pool, since both mostly wait on the disk or the network;
+# catalog writes stay on the thread that called scan().
+
+DEFAULT_WORKERS = 8
+# Files at least this large are hashed through a memory map instead of read()
+MMAP_THRESHOLD = 1 << 20
+
+DOCUMENT_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS documents (
+        id INTEGER PRIMARY KEY,
+        project_id INTEGER NOT NULL,
+        path TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        sha256 TEXT,
+        FOREIGN KEY (project_id) REFERENCES projects(id)
+    )""",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_documents_project_path ON documents(project_id, path)",
+    "CREATE INDEX IF NOT EXISTS idx_documents_sha256 ON documents(sha256)",
+    # The folder each project was last scanned from; a different folder starts the catalog over
+    """CREATE TABLE IF NOT EXISTS document_scans (
+        project_id INTEGER PRIMARY KEY,
+        root TEXT NOT NULL,
+        scanned_at TEXT NOT NULL,
+        files INTEGER NOT NULL,
+        error TEXT,
+        FOREIGN KEY (project_id) REFERENCES projects(id)
+    )""",
+]
+
+DOCUMENT_SEARCH_COLUMNS = ["path"]
+
+DOCUMENT_SEARCH_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS document_search USING fts5(path, tokenize='trigram')",
+    """CREATE TRIGGER IF NOT EXISTS document_search_ai AFTER INSERT ON documents BEGIN
+        INSERT INTO document_search (rowid, path) VALUES (new.id, new.path);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS document_search_au AFTER UPDATE OF path ON documents BEGIN
+        DELETE FROM document_search WHERE rowid = old.id;
+        INSERT INTO document_search (rowid, path) VALUES (new.id, new.path);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS document_search_ad AFTER DELETE ON documents BEGIN
+        DELETE FROM document_search WHERE rowid = old.id;
+    END""",
+]
+
+def create_document_catalog(connection):
+    """Migration step: the catalog tables, and their search index when FTS5 is available."""
+    for statement in DOCUMENT_SCHEMA:
+        connection.execute(statement)
+    if fts5_available():
+        for statement in DOCUMENT_SEARCH_SCHEMA:
+            connection.execute(statement)
+
+# --- Scanning ---
+def walk(root, errors):
+    """Yield (path relative to root, size, mtime_ns) for every file under root.
+
+    Directories that cannot be read are noted in errors and skipped.
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError as e:
+            errors.append((directory, str(e)))
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        # On Windows the stat comes with the directory listing
+                        stat = entry.stat()
+                        yield os.path.relpath(entry.path, root), stat.st_size, stat.st_mtime_ns
+                except OSError as e:
+                    errors.append((entry.path, str(e)))
+
+def file_hash(path, size):
+    """SHA-256 of the file's content, as hex."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        if size >= MMAP_THRESHOLD:
+            # Hashed straight from the page cache: no copy into a Python buffer,
+            # and the GIL is released while the digest runs
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+        else:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def _unchanged(known, size, mtime_ns):
+    # known: the catalogued (size, mtime_ns, sha256), or None; files that failed to hash are read again
+    return known is not None and known[0] == size and known[1] == mtime_ns and known[2] is not None
+
+@dataclass
+class ScanResult:
+    projects: int = 0
+    files: int = 0
+    hashed: int = 0  # new or changed files read and hashed
+    removed: int = 0  # catalogued files no longer found
+    errors: List[Tuple[str, str]] = field(default_factory=list)  # (path, message)
+
+class DocumentScanner:
+    def __init__(self, controller, workers=DEFAULT_WORKERS):
+        self.controller = controller
+        self.workers = workers
+
+    def scan(self, project_ids=None) -> ScanResult:
+        """Bring the catalog up to date with the document folders of the given projects (default all)."""
+        model = self.controller.document_model
+        wanted = set(project_ids) if project_ids is not None else None
+        roots = model.scan_roots()
+        projects, cleared = [], []
+        for project in self.controller.iter_projects():
+            if wanted is not None and project.id not in wanted:
+                continue
+            if project.document_path:
+                projects.append(project)
+            elif project.id in roots:
+                # The folder was cleared since the last scan; its files are no longer the project's
+                cleared.append(project.id)
+        result = ScanResult()
+        if cleared:
+            result.removed += model.forget(cleared)
+        unchanged, failed = [], []
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="document-scan") as pool:
+            listings = pool.map(self._list, projects)
+            for project, (files, errors) in zip(projects, listings):
+                result.projects += 1
+                result.errors.extend(errors)
+                scanned_at = datetime.now().isoformat(timespec="seconds")
+                if files is None:
+                    # An unreachable file server is no reason to forget what was catalogued
+                    failed.append((project.id, project.document_path, scanned_at, 0, errors[0][1]))
+                    continue
+                error = "; ".join(message for _, message in errors[:3]) or None
+                if not self._update(pool, project, roots.get(project.id), files, scanned_at, error, result):
+                    unchanged.append((project.id, project.document_path, scanned_at, len(files), error))
+        # Projects without changes only need their scan recorded, all in one transaction
+        model.record_scans(unchanged)
+        model.record_scans(failed, failed=True)
+        return result
+
+    def _list(self, project):
+        # (files, errors) under the project's folder; files is None when the folder is unavailable
+        errors = []
+        if not os.path.isdir(project.document_path):
+            return None, [(project.document_path, "Folder not found.")]
+        return list(walk(project.document_path, errors)), errors
+
+    def _update(self, pool, project, scanned_root, files, scanned_at, error, result):
+        # Hash the new and changed files and write them; False when the catalog was already current
+        model = self.controller.document_model
+        root = project.document_path
+        # A project moved to another folder starts over
+        moved = scanned_root != root
+        known = {} if moved else model.files(project.id)
+        changed = [f for f in files if not _unchanged(known.get(f[0]), f[1], f[2])]
+        present = {path for path, _, _ in files}
+        removed = [path for path in known if path not in present]
+        result.files += len(files)
+        if not (moved or changed or removed):
+            return False
+        hashes = pool.map(lambda f: self._hash(os.path.join(root, f[0]), f[1], result.errors), changed)
+        upserts = [(path, size, mtime_ns, sha) for (path, size, mtime_ns), sha in zip(changed, hashes)]
+        model.apply_scan(project.id, root, scanned_at, upserts, removed, len(files), error, replace=moved)
+        result.hashed += len(upserts)
+        result.removed += len(removed)
+        return True
+
+    @staticmethod
+    def _hash(path, size, errors):
+        try:
+            return file_hash(path, size)
+        except (OSError, ValueError) as e:
+            # Locked or vanished since the listing; catalogued without a hash and read again next scan
+            errors.append((path, str(e)))
+            return None
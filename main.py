@@ -1,9 +1,117 @@
+import time
+STARTED = time.perf_counter()  # before the application's imports, for --startup-time
+
+import argparse
+import sys
+
+from concurrency import Concurrency, JournalModeError
 from models import Database
 from controller import Controller
-from views import AppView
+
+IMPORTED = time.perf_counter()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Architecture Project Manager")
+    parser.add_argument("--db", default="projects.db", help="database file")
+    parser.add_argument("--profile-queries", action="store_true",
+                        help="record every SQL statement; see Data > Query Report")
+    parser.add_argument("--slow-query-ms", type=float,
+                        help="log statements slower than this, with their query plan (implies --profile-queries)")
+    parser.add_argument("--query-report", metavar="PATH",
+                        help="write the query report here on exit, as JSON or .txt (implies --profile-queries)")
+    parser.add_argument("--journal-mode", choices=["wal", "delete"],
+                        help="switch the database file to this mode (default: keep its mode). wal lets readers "
+                             "work while another program writes, but only if every program using the file runs "
+                             "on the machine holding it; never use it for a database on a network share")
+    parser.add_argument("--busy-timeout-ms", type=int, default=5000,
+                        help="how long to wait for another program's write lock")
+    parser.add_argument("--backup-dir", help="where snapshots are kept (default: backups next to the database)")
+    # Defaults for these two are backup.DEFAULT_INTERVAL_HOURS and DEFAULT_KEEP, not
+    # imported here since the backup module is only loaded once the window is up
+    parser.add_argument("--backup-hours", type=float,
+                        help="take a snapshot when the newest is older than this (default: daily); "
+                             "0 turns scheduled snapshots off")
+    parser.add_argument("--backup-keep", type=int, help="snapshots to keep (default: 14); 0 keeps them all")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="print how long startup took, from imports to the first rows on screen, and exit")
+    return parser.parse_args(argv)
+
+def show_startup_error(message):
+    # Also in a dialog, since the app is usually started without a console
+    print(message, file=sys.stderr)
+    import tkinter
+    from tkinter import messagebox
+    root = tkinter.Tk()
+    root.withdraw()
+    messagebox.showerror("Architecture Project Manager", message)
+    root.destroy()
+
+def build_window(controller):
+    # Tk and the views are imported only now, after the database is open
+    from views import AppView
+    return AppView(controller)
+
+def start_backups(controller, hours):
+    # Scheduled once the window is up, so building the backup service does not delay first paint
+    if hours is None:
+        controller.backups.start()
+    else:
+        controller.backups.start(hours)
+
+def backup_options(args):
+    options = {"directory": args.backup_dir}
+    if args.backup_keep is not None:
+        options["keep"] = args.backup_keep or None
+    return options
+
+# --- Startup Timing ---
+def report_startup(app, marks):
+    """Once the window is painted and the home list has its rows, print the marks and close the app."""
+    app.wait_visibility()
+    app.update_idletasks()
+    marks.append(("first paint", time.perf_counter()))
+    def wait_for_rows():
+        if not app.worker.idle:
+            app.after(5, wait_for_rows)
+            return
+        app.update_idletasks()
+        marks.append(("home rows", time.perf_counter()))
+        previous = STARTED
+        for name, at in marks:
+            print(f"{name:<12} {(at - STARTED) * 1000:8.1f} ms  (+{(at - previous) * 1000:.1f} ms)", file=sys.stderr)
+            previous = at
+        app.destroy()
+    app.after(0, wait_for_rows)
 
 if __name__ == "__main__":
-    db = Database()
-    controller = Controller(db)
-    app = AppView(controller)
-    app.mainloop()
+    args = parse_args()
+    marks = [("imports", IMPORTED)]
+    query_log = None
+    if args.profile_queries or args.slow_query_ms is not None or args.query_report:
+        # Imported here so ordinary launches do not pay for logging
+        import logging
+        from query_log import QueryLog
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s: %(message)s")
+        query_log = QueryLog(slow_ms=args.slow_query_ms)
+    concurrency = Concurrency(args.journal_mode, busy_timeout_ms=args.busy_timeout_ms)
+    try:
+        db = Database(args.db, query_log=query_log, concurrency=concurrency)
+    except JournalModeError as e:
+        show_startup_error(f"Cannot open {args.db}: {e}")
+        sys.exit(1)
+    with db:
+        marks.append(("database", time.perf_counter()))
+        controller = Controller(db, backup_options(args))
+        app = build_window(controller)
+        marks.append(("window", time.perf_counter()))
+        if args.startup_time:
+            report_startup(app, marks)
+        elif args.backup_hours != 0:
+            app.after_idle(start_backups, controller, args.backup_hours)
+        try:
+            app.mainloop()
+        finally:
+            # A snapshot in progress is finished before the database closes
+            controller.stop_backups()
+    if args.query_report:
+        query_log.export(args.query_report)
@@ -1,9 +1,21 @@
+import re
 import sqlite3
-from dataclasses import dataclass
-from typing import List, Optional
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from changes import CHANGE_TRACKING_SCHEMA, CONTACT, TASK_STATUS_TRACKING
+from concurrency import Checkpointer, Concurrency
+from documents import DOCUMENT_SEARCH_COLUMNS, create_document_catalog
+from progress import STAGE_PROGRESS_SCHEMA
+from search import CONTACT_SEARCH_COLUMNS, PROJECT_SEARCH_COLUMNS, create_search_index, search_clause
 
 # --- Data Models ---
-@dataclass
+# Slotted: no per-instance __dict__, which adds up when a list holds tens of
+# thousands of rows. Models build them straight from cursor rows via rows_as().
+@dataclass(slots=True)
 class Project:
     id: Optional[int]
     location: str
@@ -13,7 +25,7 @@ class Project:
     stage_id: int
     document_path: str
 
-@dataclass
+@dataclass(slots=True)
 class Contact:
     id: Optional[int]
     first_name: str
@@ -22,42 +34,295 @@ class Contact:
     email: str
     address: str
 
-@dataclass
+@dataclass(slots=True)
 class Stage:
     id: Optional[int]
     name: str
 
-@dataclass
+@dataclass(slots=True)
 class Task:
     id: Optional[int]
     stage_id: int
     description: str
 
-@dataclass
+@dataclass(slots=True)
 class ProjectRole:
     id: Optional[int]
     project_id: int
     contact_id: int
     role: str
 
-@dataclass
+@dataclass(slots=True)
 class ProjectStageTask:
     id: Optional[int]
     project_id: int
     task_id: int
     is_done: bool
 
+@dataclass(slots=True)
+class ProjectProgress:
+    project: Project
+    customer: Optional[str]  # first customer's full name
+    done_by_stage: Dict[int, int]  # stage_id -> tasks done; stages with none done are absent
+
+@dataclass(slots=True)
+class Document:
+    id: Optional[int]
+    project_id: int
+    path: str  # relative to the project's document folder
+    size: int
+    mtime_ns: int
+    sha256: Optional[str]  # None when the file could not be read
+
+def rows_as(cls):
+    """sqlite3 row factory building cls(*row) for each fetched row."""
+    factory = _ROW_FACTORIES.get(cls)
+    if factory is None:
+        factory = _ROW_FACTORIES[cls] = lambda cursor, row: cls(*row)
+    return factory
+
+_ROW_FACTORIES = {}
+
+# --- Schema Migrations ---
+# Each entry upgrades the schema by one version, either as a list of statements
+# or as a callable taking the connection. PRAGMA user_version records how many
+# have been applied, so existing projects.db files are upgraded in place.
+MIGRATIONS = [
+    # 1: indexes for hot lookup columns, one task-status row per project/task
+    [
+        # Keep only the newest row of any duplicated (project_id, task_id) pair
+        """DELETE FROM project_stage_tasks WHERE id NOT IN (
+               SELECT MAX(id) FROM project_stage_tasks GROUP BY project_id, task_id)""",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_project_stage_tasks_project_task ON project_stage_tasks(project_id, task_id)",
+        "CREATE INDEX IF NOT EXISTS idx_project_roles_project ON project_roles(project_id)",
+        "CREATE INDEX IF NOT EXISTS idx_project_roles_contact ON project_roles(contact_id)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_stage ON tasks(stage_id)",
+        "CREATE INDEX IF NOT EXISTS idx_projects_active ON projects(active)",
+    ],
+    # 2: FTS5 search tables for projects and contacts, kept in sync by triggers
+    create_search_index,
+    # 3: indexes backing the sortable list columns
+    [
+        "CREATE INDEX IF NOT EXISTS idx_projects_location ON projects(location COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_projects_start_date ON projects(start_date)",
+        "CREATE INDEX IF NOT EXISTS idx_projects_end_date ON projects(end_date)",
+        "CREATE INDEX IF NOT EXISTS idx_projects_stage ON projects(stage_id)",
+        "CREATE INDEX IF NOT EXISTS idx_contacts_name ON contacts(last_name COLLATE NOCASE, first_name COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_contacts_first_name ON contacts(first_name COLLATE NOCASE)",
+    ],
+    # 4: per-row change versions for refreshing lists incrementally
+    CHANGE_TRACKING_SCHEMA,
+    # 5: per-project, per-stage done counts; task statuses count as project changes
+    STAGE_PROGRESS_SCHEMA + TASK_STATUS_TRACKING,
+    # 6: catalog of the files in each project's document folder
+    create_document_catalog,
+    # 7: full-name lookups, for telling apart contacts who share a name in SQL
+    ["CREATE INDEX IF NOT EXISTS idx_contacts_full_name ON contacts(first_name || ' ' || last_name)"],
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# Sortable columns of the list queries: sort key -> SQL expression
+PROJECT_SORT_KEYS = {
+    "id": "p.id",
+    "location": "p.location COLLATE NOCASE",
+    "start_date": "p.start_date",
+    "end_date": "p.end_date",
+    "active": "p.active",
+    "document_path": "p.document_path COLLATE NOCASE",
+    # Stage ids follow the workflow order, which is more useful than alphabetical
+    "stage_name": "p.stage_id",
+    # First customer's name, as shown in the generated project name
+    # (the collation goes on the subquery: one inside it would not carry to the ORDER BY)
+    "customer": """(SELECT c.first_name || ' ' || c.last_name
+                     FROM project_roles pr JOIN contacts c ON c.id = pr.contact_id
+                     WHERE pr.project_id = p.id AND pr.role = 'Customer' ORDER BY pr.id LIMIT 1) COLLATE NOCASE""",
+}
+# ContactDirectory.display_name for a contact aliased c: the full name, with the
+# id appended when another contact has the same one (idx_contacts_full_name)
+CONTACT_DISPLAY_NAME = """c.first_name || ' ' || c.last_name || CASE WHEN EXISTS (
+    SELECT 1 FROM contacts d
+    WHERE d.first_name || ' ' || d.last_name = c.first_name || ' ' || c.last_name AND d.id <> c.id
+) THEN ' (#' || c.id || ')' ELSE '' END"""
+
+CONTACT_SORT_KEYS = {
+    "id": "c.id",
+    "first_name": "c.first_name COLLATE NOCASE",
+    "last_name": "c.last_name COLLATE NOCASE",
+    "phone": "c.phone",
+    "email": "c.email COLLATE NOCASE",
+    "address": "c.address COLLATE NOCASE",
+}
+
+def _order_clause(sort_keys, order_by):
+    # order_by: sequence of (sort key, descending) pairs, most significant first
+    terms = []
+    for key, descending in order_by:
+        if key not in sort_keys:
+            raise ValueError(f"Cannot sort by {key!r}.")
+        terms.append(sort_keys[key] + (" DESC" if descending else " ASC"))
+    return ", ".join(terms)
+
+def _ids_condition(column, ids, conditions, params):
+    # Restrict column to ids when given; appends to conditions and params
+    if ids is None:
+        return
+    ids = list(ids)
+    conditions.append(f"{column} IN ({', '.join('?' * len(ids))})" if ids else "0")
+    params.extend(ids)
+
+def _page_clause(limit, offset, params):
+    # LIMIT/OFFSET for one page of a list query; appends its values to params
+    if limit is None:
+        return ""
+    params.extend([limit, offset])
+    return " LIMIT ? OFFSET ?"
+
 # --- Database and Model Layer ---
 class Database:
-    def __init__(self, db_name="projects.db"):
+    def __init__(self, db_name="projects.db", persistent=True, query_log=None, concurrency=None):
+        # persistent=True keeps one long-lived connection per thread for the
+        # lifetime of the Database; persistent=False opens and closes a
+        # connection around every statement (the original behaviour).
+        # query_log: optional query_log.QueryLog recording every statement run.
+        # concurrency: concurrency.Concurrency settings; by default the file keeps its
+        # journal mode and busy statements are retried.
         self.db_name = db_name
+        self.persistent = persistent
+        self.query_log = query_log
+        self.concurrency = concurrency or Concurrency.DEFAULT
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._closed = False
+        self._checkpointer = None
+        self.journal_mode = None  # the mode the file is in, set by initialize_database()
         self.initialize_database()
+        if self.journal_mode == "wal" and self.concurrency.checkpoint_interval:
+            self._checkpointer = Checkpointer(self.connect, self.concurrency.checkpoint_interval)
+
+    def connect(self):
+        """Open a new connection with the Database's settings; the caller closes it."""
+        # Autocommit mode: single statements commit on their own and
+        # transaction() issues BEGIN/COMMIT explicitly for grouped writes.
+        connection = sqlite3.connect(self.db_name, check_same_thread=False, isolation_level=None,
+                                     timeout=self.concurrency.busy_timeout_ms / 1000)
+        connection.execute("PRAGMA foreign_keys = ON;")
+        self.concurrency.configure(connection)
+        return connection
+
+    def get_connection(self):
+        """Return the calling thread's connection, opening it on first use."""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._register(self.connect())
+        return connection
+
+    def _register(self, connection):
+        # Make connection the calling thread's persistent one, closed by close()
+        self._local.connection = connection
+        with self._connections_lock:
+            self._connections.append(connection)
+        return connection
+
+    def close(self):
+        """Close every connection opened by this Database."""
+        # SQLite checkpoints and removes the WAL when the last connection to the file closes
+        if self._checkpointer is not None:
+            self._checkpointer.stop()
+            self._checkpointer = None
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+        self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @contextmanager
+    def transaction(self):
+        """Run every execute_query issued inside the block as one atomic commit.
+
+        Nested blocks join the outermost transaction; an exception rolls the
+        whole transaction back and is re-raised. The write lock is taken up
+        front (BEGIN IMMEDIATE), waiting and retrying while another connection
+        holds it, so statements inside the block never fail as busy halfway.
+        """
+        with self._transaction("BEGIN IMMEDIATE") as connection:
+            yield connection
+
+    @contextmanager
+    def snapshot(self):
+        """Run the reads issued inside the block, iterators included, against one snapshot.
+
+        No write lock is taken, so in WAL mode other connections keep writing
+        meanwhile. For reads only; inside a transaction() block it joins it.
+        """
+        with self._transaction("BEGIN") as connection:
+            yield connection
+
+    @contextmanager
+    def _transaction(self, begin):
+        connection = getattr(self._local, "tx_connection", None)
+        if connection is not None:
+            yield connection
+            return
+        connection = self.get_connection() if self.persistent else self.connect()
+        self._local.tx_connection = connection
+        try:
+            self.concurrency.retry(connection.execute, begin)
+            try:
+                yield connection
+            except BaseException:
+                connection.rollback()
+                raise
+            connection.commit()
+        finally:
+            self._local.tx_connection = None
+            if not self.persistent:
+                connection.close()
 
     def initialize_database(self):
-        connection = sqlite3.connect(self.db_name)
+        connection = self.connect()
+        try:
+            self.journal_mode = self.concurrency.set_journal_mode(connection, self.db_name)
+        except BaseException:
+            connection.close()
+            raise
+        # synchronous and the autocheckpoint depend on the mode, which may have just changed
+        self.concurrency.configure(connection)
+        self.upgrade(connection)
+        self.full_text_search = connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE name='project_search'"
+        ).fetchone() is not None
+        if self.persistent:
+            # Kept as this thread's connection instead of opening a second one
+            self._register(connection)
+        else:
+            connection.close()
+
+    def upgrade(self, connection):
+        """Bring the database on connection up to SCHEMA_VERSION, e.g. after opening or restoring it.
+
+        Only the schema is touched, so it serves for other files (a snapshot being
+        restored) as well as for this Database's own.
+        """
+        # A database stamped with the current schema version has every table,
+        # seed row and migration already, so opening it runs no DDL at all
+        if connection.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            self.create_schema(connection)
+            self.migrate(connection)
+
+    def create_schema(self, connection):
+        """Create the base tables and seed the stages and tasks, where missing."""
         cursor = connection.cursor()
-        # Enable foreign keys
-        cursor.execute("PRAGMA foreign_keys = ON;")
+        self.concurrency.retry(cursor.execute, "BEGIN IMMEDIATE")
         # Create tables
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS projects (
@@ -148,20 +413,128 @@ class Database:
                     for desc in tasks:
                         cursor.execute("INSERT INTO tasks (stage_id, description) VALUES (?, ?)", (stage_id, desc))
         connection.commit()
-        connection.close()
 
-    def execute_query(self, query, params=(), fetchone=False, fetchall=False):
-        connection = sqlite3.connect(self.db_name)
+    def migrate(self, connection):
+        """Apply pending MIGRATIONS, each in its own transaction."""
+        while connection.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            self.concurrency.retry(connection.execute, "BEGIN IMMEDIATE")
+            try:
+                # Read under the write lock: another process may have migrated meanwhile
+                version = connection.execute("PRAGMA user_version").fetchone()[0]
+                if version < SCHEMA_VERSION:
+                    step = MIGRATIONS[version]
+                    if callable(step):
+                        step(connection)
+                    else:
+                        for statement in step:
+                            connection.execute(statement)
+                    connection.execute(f"PRAGMA user_version = {version + 1}")
+            except BaseException:
+                connection.rollback()
+                raise
+            connection.commit()
+
+    @contextmanager
+    def _connection(self):
+        # The open transaction's connection, else this thread's persistent one,
+        # else a temporary connection closed afterwards
+        connection = getattr(self._local, "tx_connection", None)
+        if connection is not None:
+            yield connection
+        elif self.persistent:
+            yield self.get_connection()
+        else:
+            connection = self.connect()
+            try:
+                yield connection
+            finally:
+                connection.close()
+
+    def execute_query(self, query, params=(), fetchone=False, fetchall=False, lastrowid=False, row_factory=None):
+        # row_factory: builds each fetched row, e.g. rows_as(Project)
+        with self._connection() as connection:
+            if self.query_log is None:
+                return self._retry(connection, self._run, connection, query, params, fetchone, fetchall, lastrowid, row_factory)
+            with self.query_log.measure(connection, query, params) as entry:
+                return self._retry(connection, self._run, connection, query, params, fetchone, fetchall, lastrowid, row_factory, entry)
+
+    def _retry(self, connection, fn, *args):
+        # A statement failing as busy outside a transaction changed nothing and
+        # can run again; inside one, transaction() already holds the write lock
+        if connection.in_transaction:
+            return fn(*args)
+        return self.concurrency.retry(fn, *args)
+
+    def checkpoint(self, mode="PASSIVE"):
+        """Copy the WAL back into the database file; returns (busy, wal pages, pages copied).
+
+        PASSIVE never waits; FULL, RESTART and TRUNCATE wait for the writer and,
+        the latter two, for readers, up to the busy timeout.
+        """
+        if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+            raise ValueError(f"Unknown checkpoint mode {mode!r}.")
+        with self._connection() as connection:
+            return tuple(connection.execute(f"PRAGMA wal_checkpoint({mode})").fetchone())
+
+    def execute_many(self, query, seq_of_params) -> int:
+        # Not retried: in autocommit mode the rows before a busy failure are
+        # already committed. Wrap in transaction() to wait for the lock first.
+        with self._connection() as connection:
+            if self.query_log is None:
+                return connection.executemany(query, seq_of_params).rowcount
+            # Parameters are consumed by executemany, so the batch is logged without them
+            with self.query_log.measure(None, query, ()) as entry:
+                entry.rows = connection.executemany(query, seq_of_params).rowcount
+            return entry.rows
+
+    def iter_query(self, query, params=(), arraysize=500, row_factory=None):
+        """Yield the rows of query, fetched from the cursor arraysize rows at a time.
+
+        The cursor stays open, holding a read snapshot, until the iterator is
+        exhausted or closed; use contextlib.closing() when a loop may stop
+        early. Consume it on the thread that created it.
+        """
+        with self._connection() as connection:
+            cursor = connection.cursor()
+            cursor.arraysize = arraysize
+            cursor.row_factory = row_factory
+            # Only time spent in SQLite counts, not the consumer's work between batches
+            seconds, count = 0.0, 0
+            try:
+                start = time.perf_counter()
+                self._retry(connection, cursor.execute, query, params)
+                while True:
+                    rows = cursor.fetchmany()
+                    seconds += time.perf_counter() - start
+                    if not rows:
+                        break
+                    count += len(rows)
+                    yield from rows
+                    start = time.perf_counter()
+            finally:
+                cursor.close()
+                if self.query_log is not None:
+                    self.query_log.record(connection, query, params, seconds, count)
+
+    def _run(self, connection, query, params, fetchone, fetchall, lastrowid, row_factory=None, entry=None):
         cursor = connection.cursor()
-        cursor.execute("PRAGMA foreign_keys = ON;")
+        cursor.row_factory = row_factory
         cursor.execute(query, params)
         result = None
         if fetchone:
             result = cursor.fetchone()
         elif fetchall:
             result = cursor.fetchall()
-        connection.commit()
-        connection.close()
+        elif lastrowid:
+            result = cursor.lastrowid
+        if entry is not None:
+            # Rows returned, or rows changed by a write
+            if fetchall:
+                entry.rows = len(result)
+            elif fetchone:
+                entry.rows = int(result is not None)
+            else:
+                entry.rows = max(cursor.rowcount, 0)
         return result
 
 # Add model classes for CRUD and queries as needed (ProjectModel, ContactModel, etc.)
@@ -175,8 +548,20 @@ class ProjectModel:
             VALUES (?, ?, ?, ?, ?, ?)
         """
         params = (project.location, project.start_date, project.end_date, int(project.active), project.stage_id, project.document_path)
-        self.db.execute_query(query, params)
-        return self.db.execute_query("SELECT last_insert_rowid()", fetchone=True)[0]
+        return self.db.execute_query(query, params, lastrowid=True)
+
+    def create_many(self, projects: Iterable[Project]) -> int:
+        # Projects with an id keep it; the rest are numbered by SQLite
+        query = """
+            INSERT INTO projects (id, location, start_date, end_date, active, stage_id, document_path)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """
+        return self.db.execute_many(query, (
+            (p.id, p.location, p.start_date, p.end_date, int(p.active), p.stage_id, p.document_path) for p in projects
+        ))
+
+    def iter_all(self, arraysize: int = 500) -> Iterator[Project]:
+        return self.db.iter_query("SELECT * FROM projects ORDER BY id", arraysize=arraysize, row_factory=rows_as(Project))
 
     def update(self, project: Project):
         query = """
@@ -187,26 +572,87 @@ class ProjectModel:
 
     def delete(self, project_id: int):
         # Delete dependent rows first to avoid foreign key constraint errors
-        self.db.execute_query("DELETE FROM project_roles WHERE project_id=?", (project_id,))
-        self.db.execute_query("DELETE FROM project_stage_tasks WHERE project_id=?", (project_id,))
-        self.db.execute_query("DELETE FROM projects WHERE id=?", (project_id,))
+        with self.db.transaction():
+            self.db.execute_query("DELETE FROM project_roles WHERE project_id=?", (project_id,))
+            self.db.execute_query("DELETE FROM project_stage_tasks WHERE project_id=?", (project_id,))
+            self.db.execute_query("DELETE FROM documents WHERE project_id=?", (project_id,))
+            self.db.execute_query("DELETE FROM document_scans WHERE project_id=?", (project_id,))
+            self.db.execute_query("DELETE FROM projects WHERE id=?", (project_id,))
 
     def get(self, project_id: int) -> Optional[Project]:
-        row = self.db.execute_query("SELECT * FROM projects WHERE id=?", (project_id,), fetchone=True)
-        if row:
-            return Project(*row)
-        return None
-
-    def list(self, search: str = "", active_only: bool = False) -> List[Project]:
-        query = "SELECT * FROM projects"
-        params = []
-        if search:
-            query += " WHERE location LIKE ?"
-            params.append(f"%{search}%")
+        return self.db.execute_query("SELECT * FROM projects WHERE id=?", (project_id,), fetchone=True, row_factory=rows_as(Project))
+
+    def _search(self, search: str, active_only: bool, order_by=None, ids=None):
+        # Returns (join, where, params, order) filtering projects aliased as p,
+        # optionally only among the given ids.
+        # order is order_by when given, else search rank; it always ends with
+        # p.id so sorts are stable and pages do not overlap.
+        if self.db.full_text_search:
+            join, conditions, params, order = search_clause("project_search", PROJECT_SEARCH_COLUMNS, "p.id", search)
+        else:
+            join, conditions, params, order = "", [], [], ""
+            if search:
+                conditions.append("p.location LIKE ?")
+                params.append(f"%{search}%")
         if active_only:
-            query += (" AND" if search else " WHERE") + " active=1"
-        rows = self.db.execute_query(query, params, fetchall=True)
-        return [Project(*row) for row in rows]
+            conditions.append("p.active=1")
+        _ids_condition("p.id", ids, conditions, params)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        if order_by:
+            order = _order_clause(PROJECT_SORT_KEYS, order_by)
+        return join, where, params, (order + ", " if order else "") + "p.id"
+
+    def _list_query(self, search, active_only, limit, offset, order_by, ids=None):
+        join, where, params, order = self._search(search, active_only, order_by, ids)
+        query = "SELECT p.* FROM projects p" + join + where + " ORDER BY " + order
+        return query + _page_clause(limit, offset, params), params
+
+    def list(self, search: str = "", active_only: bool = False,
+             limit: Optional[int] = None, offset: int = 0, order_by=None, ids=None) -> List[Project]:
+        query, params = self._list_query(search, active_only, limit, offset, order_by, ids)
+        return self.db.execute_query(query, params, fetchall=True, row_factory=rows_as(Project))
+
+    def iter(self, search: str = "", active_only: bool = False, order_by=None, ids=None,
+             arraysize: int = 500) -> Iterator[Project]:
+        # list() as a stream, fetched arraysize rows at a time
+        query, params = self._list_query(search, active_only, None, 0, order_by, ids)
+        return self.db.iter_query(query, params, arraysize=arraysize, row_factory=rows_as(Project))
+
+    def list_with_roles(self, search: str = "", active_only: bool = False,
+                        limit: Optional[int] = None, offset: int = 0, order_by=None, ids=None,
+                        arraysize: int = 500) -> Iterator[tuple]:
+        # One row per (project, role) joined with the stage name and the display name of
+        # the role's contact, so a whole project list is built in a single round trip.
+        # Projects without roles appear once with NULL role/contact columns.
+        # limit/offset page over projects, not over the joined rows.
+        # Rows are streamed from the cursor rather than fetched into one list.
+        join, where, params, order = self._search(search, active_only, order_by, ids)
+        query = f"""
+            WITH page AS (
+                SELECT p.id, ROW_NUMBER() OVER (ORDER BY {order}) AS position
+                FROM projects p{join}{where}
+                ORDER BY position{_page_clause(limit, offset, params)}
+            )
+            SELECT p.id, p.location, p.start_date, p.end_date, p.active, p.stage_id, p.document_path,
+                   s.name, pr.role, {CONTACT_DISPLAY_NAME}
+            FROM page
+            JOIN projects p ON p.id = page.id
+            LEFT JOIN stages s ON s.id = p.stage_id
+            LEFT JOIN project_roles pr ON pr.project_id = p.id
+            LEFT JOIN contacts c ON c.id = pr.contact_id
+            ORDER BY page.position, pr.id
+        """
+        return self.db.iter_query(query, params, arraysize=arraysize)
+
+    def list_for_contact(self, contact_id: int) -> List[Tuple[Project, str]]:
+        # Reverse lookup through the project_roles(contact_id) index
+        rows = self.db.execute_query("""
+            SELECT p.*, pr.role FROM project_roles pr
+            JOIN projects p ON p.id = pr.project_id
+            WHERE pr.contact_id=?
+            ORDER BY p.id, pr.id
+        """, (contact_id,), fetchall=True)
+        return [(Project(*row[:-1]), row[-1]) for row in rows]
 
 class ContactModel:
     def __init__(self, db: Database):
@@ -218,8 +664,19 @@ class ContactModel:
             VALUES (?, ?, ?, ?, ?)
         """
         params = (contact.first_name, contact.last_name, contact.phone, contact.email, contact.address)
-        self.db.execute_query(query, params)
-        return self.db.execute_query("SELECT last_insert_rowid()", fetchone=True)[0]
+        return self.db.execute_query(query, params, lastrowid=True)
+
+    def create_many(self, contacts: Iterable[Contact]) -> int:
+        query = """
+            INSERT INTO contacts (id, first_name, last_name, phone, email, address)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """
+        return self.db.execute_many(query, (
+            (c.id, c.first_name, c.last_name, c.phone, c.email, c.address) for c in contacts
+        ))
+
+    def iter_all(self, arraysize: int = 500) -> Iterator[Contact]:
+        return self.db.iter_query("SELECT * FROM contacts ORDER BY id", arraysize=arraysize, row_factory=rows_as(Contact))
 
     def update(self, contact: Contact):
         query = """
@@ -230,59 +687,244 @@ class ContactModel:
 
     def delete(self, contact_id: int):
         # Delete dependent rows in project_roles before deleting the contact
-        self.db.execute_query("DELETE FROM project_roles WHERE contact_id=?", (contact_id,))
-        self.db.execute_query("DELETE FROM contacts WHERE id=?", (contact_id,))
+        with self.db.transaction():
+            self.db.execute_query("DELETE FROM project_roles WHERE contact_id=?", (contact_id,))
+            self.db.execute_query("DELETE FROM contacts WHERE id=?", (contact_id,))
 
     def get(self, contact_id: int) -> Optional[Contact]:
-        row = self.db.execute_query("SELECT * FROM contacts WHERE id=?", (contact_id,), fetchone=True)
-        if row:
-            return Contact(*row)
-        return None
-
-    def list(self, search: str = "") -> List[Contact]:
-        query = "SELECT * FROM contacts"
-        params = []
-        if search:
-            query += " WHERE first_name LIKE ? OR last_name LIKE ?"
+        return self.db.execute_query("SELECT * FROM contacts WHERE id=?", (contact_id,), fetchone=True, row_factory=rows_as(Contact))
+
+    def list(self, search: str = "", limit: Optional[int] = None, offset: int = 0, order_by=None,
+             ids=None) -> List[Contact]:
+        query, params = self._list_query(search, limit, offset, order_by, ids)
+        return self.db.execute_query(query, params, fetchall=True, row_factory=rows_as(Contact))
+
+    def iter(self, search: str = "", order_by=None, ids=None, arraysize: int = 500) -> Iterator[Contact]:
+        # list() as a stream, fetched arraysize rows at a time
+        query, params = self._list_query(search, None, 0, order_by, ids)
+        return self.db.iter_query(query, params, arraysize=arraysize, row_factory=rows_as(Contact))
+
+    def _list_query(self, search, limit, offset, order_by, ids):
+        query = "SELECT c.* FROM contacts c"
+        conditions, params = [], []
+        order = ""
+        if self.db.full_text_search:
+            join, conditions, params, order = search_clause("contact_search", CONTACT_SEARCH_COLUMNS, "c.id", search)
+            query += join
+        elif search:
+            conditions.append("(first_name LIKE ? OR last_name LIKE ?)")
             params.extend([f"%{search}%", f"%{search}%"])
-        rows = self.db.execute_query(query, params, fetchall=True)
-        return [Contact(*row) for row in rows]
+        _ids_condition("c.id", ids, conditions, params)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        if order_by:
+            order = _order_clause(CONTACT_SORT_KEYS, order_by)
+        query += " ORDER BY " + (order + ", " if order else "") + "c.id"
+        return query + _page_clause(limit, offset, params), params
+
+class ContactDirectory:
+    """id -> Contact and display-name -> Contact indexes over the address book.
+
+    Loaded once from ContactModel, then kept current with put()/remove() as
+    this process creates, updates and deletes contacts, and with sync() for
+    the changes other processes (another workstation, the API server, a CSV
+    import) recorded in row_versions. Contacts sharing a full name are told
+    apart by their id, e.g. "Dana Levi (#12)".
+    """
+    _ID_SUFFIX = re.compile(r"^(.*) \(#(\d+)\)$")
+    # More changed contacts than this are read by reloading the whole directory
+    SYNC_RELOAD = 1000
+
+    def __init__(self, contact_model: ContactModel, change_model: Optional["ChangeModel"] = None):
+        self.contact_model = contact_model
+        self.change_model = change_model
+        self._lock = threading.RLock()
+        self._by_id = None
+        self._version = None  # data version the directory was last brought up to
+
+    @staticmethod
+    def full_name(contact: Contact) -> str:
+        return f"{contact.first_name} {contact.last_name}"
+
+    def _load(self):
+        with self._lock:
+            if self._by_id is None:
+                # Read before the contacts: changes committed meanwhile are applied again by sync()
+                self._version = self.change_model.version() if self.change_model else None
+                self._by_id = {}
+                self._ids_by_name = {}
+                # id -> display name, so every row showing a contact shares one string
+                self._display_names = {}
+                for contact in self.contact_model.list():
+                    self._index(contact)
+        return self._by_id
+
+    def _index(self, contact: Contact):
+        # A new or renamed contact can make another's full name ambiguous
+        self._display_names.clear()
+        self._by_id[contact.id] = contact
+        self._ids_by_name.setdefault(self.full_name(contact), []).append(contact.id)
+
+    def _unindex(self, contact_id: int):
+        contact = self._by_id.pop(contact_id, None)
+        if contact:
+            self._display_names.clear()
+            name = self.full_name(contact)
+            self._ids_by_name[name].remove(contact_id)
+            if not self._ids_by_name[name]:
+                del self._ids_by_name[name]
+
+    def invalidate(self):
+        with self._lock:
+            self._by_id = None
+
+    def sync(self):
+        """Apply the contact changes recorded since the directory was loaded or last synced."""
+        with self._lock:
+            if self._by_id is None or self.change_model is None:
+                return
+            version, changed, deleted = self.change_model.changed_since(CONTACT, self._version)
+            if len(changed) + len(deleted) > self.SYNC_RELOAD:
+                self._by_id = None
+                return
+            for contact_id in deleted:
+                self._unindex(contact_id)
+            for contact in self.contact_model.list(ids=changed) if changed else ():
+                self._unindex(contact.id)
+                self._index(contact)
+            self._version = version
+
+    def put(self, contact: Contact):
+        # Add or refresh one contact after it was created or updated
+        with self._lock:
+            if self._by_id is not None:
+                self._unindex(contact.id)
+                self._index(replace(contact))
+
+    def remove(self, contact_id: int):
+        with self._lock:
+            if self._by_id is not None:
+                self._unindex(contact_id)
+
+    def get(self, contact_id: int) -> Optional[Contact]:
+        with self._lock:
+            contact = self._load().get(contact_id)
+            if contact is None:
+                # Possibly written by another process since the last sync()
+                contact = self.contact_model.get(contact_id)
+                if contact is not None:
+                    self._index(contact)
+            return contact
+
+    def display_name(self, contact: Contact) -> str:
+        with self._lock:
+            self._load()
+            cached = self._by_id.get(contact.id) is contact
+            if cached and contact.id in self._display_names:
+                return self._display_names[contact.id]
+            name = self.full_name(contact)
+            if len(self._ids_by_name.get(name, ())) > 1:
+                name = f"{name} (#{contact.id})"
+            if cached:
+                self._display_names[contact.id] = name
+            return name
+
+    def display_names(self) -> List[str]:
+        with self._lock:
+            return [self.display_name(c) for c in self._load().values()]
+
+    def by_display_name(self, name: str) -> Optional[Contact]:
+        with self._lock:
+            self._load()
+            ids = self._ids_by_name.get(name, ())
+            if len(ids) == 1:
+                return self._by_id[ids[0]]
+            match = self._ID_SUFFIX.match(name)
+            if match:
+                contact = self._by_id.get(int(match.group(2)))
+                if contact and self.full_name(contact) == match.group(1):
+                    return contact
+            return None
 
 class StageModel:
     def __init__(self, db: Database):
         self.db = db
 
     def list(self) -> List[Stage]:
-        rows = self.db.execute_query("SELECT * FROM stages", fetchall=True)
-        return [Stage(*row) for row in rows]
+        return self.db.execute_query("SELECT * FROM stages", fetchall=True, row_factory=rows_as(Stage))
 
     def get(self, stage_id: int) -> Optional[Stage]:
-        row = self.db.execute_query("SELECT * FROM stages WHERE id=?", (stage_id,), fetchone=True)
-        if row:
-            return Stage(*row)
-        return None
+        return self.db.execute_query("SELECT * FROM stages WHERE id=?", (stage_id,), fetchone=True, row_factory=rows_as(Stage))
 
 class TaskModel:
     def __init__(self, db: Database):
         self.db = db
 
+    def list(self) -> List[Task]:
+        return self.db.execute_query("SELECT * FROM tasks", fetchall=True, row_factory=rows_as(Task))
+
     def list_by_stage(self, stage_id: int) -> List[Task]:
-        rows = self.db.execute_query("SELECT * FROM tasks WHERE stage_id=?", (stage_id,), fetchall=True)
-        return [Task(*row) for row in rows]
+        return self.db.execute_query("SELECT * FROM tasks WHERE stage_id=?", (stage_id,), fetchall=True, row_factory=rows_as(Task))
 
     def get(self, task_id: int) -> Optional[Task]:
-        row = self.db.execute_query("SELECT * FROM tasks WHERE id=?", (task_id,), fetchone=True)
-        if row:
-            return Task(*row)
-        return None
+        return self.db.execute_query("SELECT * FROM tasks WHERE id=?", (task_id,), fetchone=True, row_factory=rows_as(Task))
+
+class ReferenceData:
+    """In-memory cache of stages and tasks.
+
+    Both are seeded by Database.initialize_database and never edited from the
+    GUI, so they are loaded once on first use. Call invalidate() after changing
+    the seed data to have the next lookup reload them.
+    """
+    def __init__(self, stage_model: StageModel, task_model: TaskModel):
+        self.stage_model = stage_model
+        self.task_model = task_model
+        self._lock = threading.Lock()
+        self._stages = None
+
+    def _load(self):
+        with self._lock:
+            if self._stages is None:
+                stages = self.stage_model.list()
+                tasks = self.task_model.list()
+                self._stages_by_id = {s.id: s for s in stages}
+                self._stages_by_name = {s.name: s for s in stages}
+                self._tasks_by_id = {t.id: t for t in tasks}
+                self._tasks_by_stage = {s.id: [] for s in stages}
+                for t in tasks:
+                    self._tasks_by_stage.setdefault(t.stage_id, []).append(t)
+                self._stages = stages
+        return self._stages
+
+    def invalidate(self):
+        with self._lock:
+            self._stages = None
+
+    def stages(self) -> List[Stage]:
+        return list(self._load())
+
+    def stage_by_id(self, stage_id: int) -> Optional[Stage]:
+        self._load()
+        return self._stages_by_id.get(stage_id)
+
+    def stage_by_name(self, name: str) -> Optional[Stage]:
+        self._load()
+        return self._stages_by_name.get(name)
+
+    def tasks_by_stage(self, stage_id: int) -> List[Task]:
+        self._load()
+        return list(self._tasks_by_stage.get(stage_id, []))
+
+    def task_by_id(self, task_id: int) -> Optional[Task]:
+        self._load()
+        return self._tasks_by_id.get(task_id)
 
 class ProjectRoleModel:
     def __init__(self, db: Database):
         self.db = db
 
     def list_by_project(self, project_id: int) -> List[ProjectRole]:
-        rows = self.db.execute_query("SELECT * FROM project_roles WHERE project_id=?", (project_id,), fetchall=True)
-        return [ProjectRole(*row) for row in rows]
+        return self.db.execute_query("SELECT * FROM project_roles WHERE project_id=?", (project_id,), fetchall=True, row_factory=rows_as(ProjectRole))
 
     def add(self, project_id: int, contact_id: int, role: str):
         self.db.execute_query(
@@ -290,16 +932,34 @@ class ProjectRoleModel:
             (project_id, contact_id, role)
         )
 
+    def add_many(self, roles: Iterable[ProjectRole]) -> int:
+        return self.db.execute_many(
+            "INSERT INTO project_roles (project_id, contact_id, role) VALUES (?, ?, ?)",
+            ((r.project_id, r.contact_id, r.role) for r in roles)
+        )
+
+    def iter_all(self, arraysize: int = 500) -> Iterator[ProjectRole]:
+        return self.db.iter_query("SELECT * FROM project_roles ORDER BY id", arraysize=arraysize, row_factory=rows_as(ProjectRole))
+
     def remove(self, project_role_id: int):
         self.db.execute_query("DELETE FROM project_roles WHERE id=?", (project_role_id,))
 
+    def remove_by_project(self, project_id: int):
+        self.db.execute_query("DELETE FROM project_roles WHERE project_id=?", (project_id,))
+
 class ProjectStageTaskModel:
     def __init__(self, db: Database):
         self.db = db
 
     def list_by_project(self, project_id: int) -> List[ProjectStageTask]:
-        rows = self.db.execute_query("SELECT * FROM project_stage_tasks WHERE project_id=?", (project_id,), fetchall=True)
-        return [ProjectStageTask(*row) for row in rows]
+        return self.db.execute_query("SELECT * FROM project_stage_tasks WHERE project_id=?", (project_id,), fetchall=True, row_factory=rows_as(ProjectStageTask))
+
+    def set_many(self, project_id: int, statuses: Dict[int, bool]) -> int:
+        # statuses: task_id -> is_done; one row per (project, task) thanks to the unique index
+        return self.db.execute_many("""
+            INSERT INTO project_stage_tasks (project_id, task_id, is_done) VALUES (?, ?, ?)
+            ON CONFLICT(project_id, task_id) DO UPDATE SET is_done = excluded.is_done
+        """, ((project_id, task_id, int(is_done)) for task_id, is_done in statuses.items()))
 
     def set_done(self, project_stage_task_id: int, is_done: bool):
         self.db.execute_query(
@@ -307,9 +967,134 @@ class ProjectStageTaskModel:
             (int(is_done), project_stage_task_id)
         )
 
+class StageProgressModel:
+    def __init__(self, db: Database):
+        self.db = db
+
+    def list(self, active_only: bool = True, limit: Optional[int] = None, offset: int = 0,
+             ids=None) -> List[ProjectProgress]:
+        return list(self.iter(active_only, ids, limit=limit, offset=offset))
+
+    def iter(self, active_only: bool = True, ids=None, arraysize: int = 500,
+             limit: Optional[int] = None, offset: int = 0) -> Iterator[ProjectProgress]:
+        # Projects with their first customer and per-stage done counts, in one query
+        conditions, params = [], []
+        if active_only:
+            conditions.append("p.active=1")
+        _ids_condition("p.id", ids, conditions, params)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        query = f"""
+            SELECT p.*, {PROJECT_SORT_KEYS["customer"]},
+                   (SELECT group_concat(sp.stage_id || ':' || sp.done) FROM stage_progress sp WHERE sp.project_id = p.id)
+            FROM projects p{where}
+            ORDER BY p.id{_page_clause(limit, offset, params)}
+        """
+        for *project, customer, done in self.db.iter_query(query, params, arraysize=arraysize):
+            done_by_stage = dict(map(int, item.split(":")) for item in done.split(",")) if done else {}
+            yield ProjectProgress(Project(*project), customer, done_by_stage)
+
+class DocumentModel:
+    """The document catalog written by documents.DocumentScanner."""
+    def __init__(self, db: Database):
+        self.db = db
+
+    def scan_roots(self) -> Dict[int, str]:
+        # project_id -> folder the project was last scanned from
+        return dict(self.db.execute_query("SELECT project_id, root FROM document_scans", fetchall=True))
+
+    def files(self, project_id: int) -> Dict[str, Tuple[int, int, Optional[str]]]:
+        # path -> (size, mtime_ns, sha256) of the project's catalogued files
+        rows = self.db.execute_query(
+            "SELECT path, size, mtime_ns, sha256 FROM documents WHERE project_id=?", (project_id,), fetchall=True)
+        return {path: (size, mtime_ns, sha256) for path, size, mtime_ns, sha256 in rows}
+
+    def apply_scan(self, project_id: int, root: str, scanned_at: str, upserts, removed, files: int,
+                   error: Optional[str] = None, replace: bool = False):
+        # upserts: (path, size, mtime_ns, sha256) of new and changed files; removed: paths no longer found.
+        # replace drops every catalogued file of the project first.
+        with self.db.transaction():
+            if replace:
+                self.db.execute_query("DELETE FROM documents WHERE project_id=?", (project_id,))
+            self.db.execute_many("DELETE FROM documents WHERE project_id=? AND path=?",
+                                 [(project_id, path) for path in removed])
+            self.db.execute_many("""
+                INSERT INTO documents (project_id, path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(project_id, path) DO UPDATE SET
+                    size = excluded.size, mtime_ns = excluded.mtime_ns, sha256 = excluded.sha256
+            """, [(project_id, *row) for row in upserts])
+            self.record_scans([(project_id, root, scanned_at, files, error)])
+
+    def record_scans(self, scans, failed: bool = False):
+        # scans: (project_id, root, scanned_at, files, error) rows. A failed scan
+        # only notes its time and error; the folder and file count of the last
+        # successful one are kept.
+        update = ("scanned_at = excluded.scanned_at, error = excluded.error" if failed else
+                  "root = excluded.root, scanned_at = excluded.scanned_at, files = excluded.files, error = excluded.error")
+        with self.db.transaction():
+            self.db.execute_many(f"""
+                INSERT INTO document_scans (project_id, root, scanned_at, files, error) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(project_id) DO UPDATE SET {update}
+            """, scans)
+
+    def forget(self, project_ids: Iterable[int]) -> int:
+        # Drop the catalog of projects that no longer have a document folder; returns the files dropped
+        params = [(project_id,) for project_id in project_ids]
+        with self.db.transaction():
+            removed = self.db.execute_many("DELETE FROM documents WHERE project_id=?", params)
+            self.db.execute_many("DELETE FROM document_scans WHERE project_id=?", params)
+        return removed
+
+    def search(self, search: str = "", project_id: Optional[int] = None, limit: Optional[int] = None,
+               offset: int = 0) -> List[Tuple[Document, str]]:
+        # (Document, project location) pairs whose path matches every term, best matches first
+        if self.db.full_text_search:
+            join, conditions, params, order = search_clause("document_search", DOCUMENT_SEARCH_COLUMNS, "d.id", search)
+        else:
+            join, conditions, params, order = "", [], [], ""
+            if search:
+                conditions.append("d.path LIKE ?")
+                params.append(f"%{search}%")
+        if project_id is not None:
+            conditions.append("d.project_id=?")
+            params.append(project_id)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        query = f"""
+            SELECT d.*, p.location FROM documents d{join}
+            JOIN projects p ON p.id = d.project_id{where}
+            ORDER BY {order + ", " if order else ""}d.project_id, d.path
+        """ + _page_clause(limit, offset, params)
+        return [(Document(*row[:-1]), row[-1]) for row in self.db.execute_query(query, params, fetchall=True)]
+
+class ChangeModel:
+    """Reads the change versions maintained by the triggers in changes.py."""
+    def __init__(self, db: Database):
+        self.db = db
+
+    def version(self) -> int:
+        return self.db.execute_query("SELECT version FROM data_version", fetchone=True)[0]
+
+    def changed_since(self, entity: str, version: int) -> Tuple[int, List[int], List[int]]:
+        # (current version, changed ids, deleted ids), read from one snapshot
+        with self.db.snapshot():
+            current = self.version()
+            rows = self.db.execute_query(
+                "SELECT entity_id, deleted FROM row_versions WHERE entity=? AND version>?",
+                (entity, version), fetchall=True)
+        return current, [i for i, deleted in rows if not deleted], [i for i, deleted in rows if deleted]
+
 # --- Schema Abstractions for GUI/View Layer ---
+from operator import attrgetter
 from typing import Dict, Any
 
+def _delegate(target, names):
+    # Class decorator: read-only properties forwarding each name to self.<target>.<name>
+    def decorate(cls):
+        for name in names:
+            setattr(cls, name, property(attrgetter(f"{target}.{name}")))
+        return cls
+    return decorate
+
+@_delegate("project", ["id", "location", "start_date", "end_date", "active", "stage_id", "document_path"])
 class ProjectSchema:
     # Centralized field definitions for Project
     FIELDS = [
@@ -322,15 +1107,12 @@ class ProjectSchema:
     ]
     ROLE_LABELS = ["Customer 1", "Customer 2", "Constructor", "Inspector", "Consultant"]
 
+    # Wraps the Project row; its fields are read through to it rather than copied
+    __slots__ = ("project", "stage_name", "roles")
+
     def __init__(self, project: Project, stage_name: str, roles: Dict[str, str]):
-        self.id = project.id
-        self.location = project.location
-        self.start_date = project.start_date
-        self.end_date = project.end_date
-        self.active = project.active
-        self.stage_id = project.stage_id
+        self.project = project
         self.stage_name = stage_name
-        self.document_path = project.document_path
         self.roles = roles  # Dict[label, contact_name]
 
     @classmethod
@@ -347,6 +1129,7 @@ class ProjectSchema:
         d["roles"] = self.roles
         return d
 
+@_delegate("contact", ["id", "first_name", "last_name", "phone", "email", "address"])
 class ContactSchema:
     FIELDS = [
         ("First Name", "first_name"),
@@ -356,13 +1139,10 @@ class ContactSchema:
         ("Address", "address"),
     ]
 
+    __slots__ = ("contact",)
+
     def __init__(self, contact: Contact):
-        self.id = contact.id
-        self.first_name = contact.first_name
-        self.last_name = contact.last_name
-        self.phone = contact.phone
-        self.email = contact.email
-        self.address = contact.address
+        self.contact = contact
 
     def as_dict(self) -> Dict[str, Any]:
         d = {label: getattr(self, attr) for label, attr in self.FIELDS}
@@ -374,6 +1154,7 @@ class TaskSchema:
         ("Description", "description"),
         ("Is Done", "is_done"),
     ]
+    __slots__ = ("id", "description", "is_done")
 
     def __init__(self, task_id: int, description: str, is_done: bool):
         self.id = task_id
@@ -0,0 +1,48 @@
+# --- Stage Progress ---
+# stage_progress keeps, per project and stage, how many of the stage's tasks are
+# done. Triggers on project_stage_tasks adjust the count by one on every change,
+# so progress for all projects is read without counting task rows. A stage's
+# task total is the same for every project and comes from the tasks table.
+
+def _add(project_id, task_id, delta):
+    # Add delta to the done count of the stage task_id belongs to
+    return f"""INSERT INTO stage_progress (project_id, stage_id, done)
+        SELECT {project_id}, stage_id, {delta} FROM tasks WHERE id = {task_id}
+        ON CONFLICT(project_id, stage_id) DO UPDATE SET done = done + excluded.done;
+        DELETE FROM stage_progress WHERE project_id = {project_id} AND done <= 0;"""
+
+_RECOUNT = [
+    "DELETE FROM stage_progress",
+    """INSERT INTO stage_progress (project_id, stage_id, done)
+       SELECT pst.project_id, t.stage_id, SUM(pst.is_done != 0)
+       FROM project_stage_tasks pst JOIN tasks t ON t.id = pst.task_id
+       GROUP BY pst.project_id, t.stage_id
+       HAVING SUM(pst.is_done != 0) > 0""",
+]
+
+STAGE_PROGRESS_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS stage_progress (
+        project_id INTEGER NOT NULL,
+        stage_id INTEGER NOT NULL,
+        done INTEGER NOT NULL,
+        PRIMARY KEY (project_id, stage_id)
+    ) WITHOUT ROWID""",
+    f"""CREATE TRIGGER IF NOT EXISTS stage_progress_ai AFTER INSERT ON project_stage_tasks
+        WHEN new.is_done BEGIN
+        {_add('new.project_id', 'new.task_id', 1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stage_progress_au AFTER UPDATE OF project_id, task_id, is_done ON project_stage_tasks
+        BEGIN
+        {_add('old.project_id', 'old.task_id', '-(old.is_done != 0)')}
+        {_add('new.project_id', 'new.task_id', '(new.is_done != 0)')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stage_progress_ad AFTER DELETE ON project_stage_tasks
+        WHEN old.is_done BEGIN
+        {_add('old.project_id', 'old.task_id', -1)}
+    END""",
+    # Moving a task to another stage is rare enough to recount everything
+    f"""CREATE TRIGGER IF NOT EXISTS stage_progress_tasks_au AFTER UPDATE OF stage_id ON tasks BEGIN
+        {'; '.join(_RECOUNT)};
+    END""",
+    *_RECOUNT,
+]
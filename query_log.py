@@ -0,0 +1,255 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# --- Query Instrumentation ---
+# A QueryLog attached to a Database (db.query_log) records every statement run
+# through execute_query, execute_many and iter_query: time, row count and the
+# application method that issued it. Statements run inside action(name), which
+# the background worker opens around each UI request, are also counted per
+# action, so an N+1 pattern shows up as one statement repeated many times in a
+# single action. Slow statements are logged with their EXPLAIN QUERY PLAN.
+
+# Frames in these files are plumbing; the call site is the first frame outside them
+_INTERNAL_FILES = {"models.py", "query_log.py", "contextlib.py", "search.py"}
+
+def normalize(query):
+    return re.sub(r"\s+", " ", query).strip()
+
+class StatementStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.sites = Counter()
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": self.seconds * 1000,
+            "mean_ms": self.seconds * 1000 / self.count if self.count else 0.0,
+            "max_ms": self.max_seconds * 1000,
+            "rows": self.rows,
+            "sites": dict(self.sites.most_common()),
+        }
+
+class ActionStats:
+    def __init__(self):
+        self.runs = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.seconds = 0.0
+        # statement -> most executions in a single run
+        self.max_repeats = Counter()
+        # statement -> most executions with identical parameters in a single run
+        self.max_identical = Counter()
+
+    def add(self, run):
+        self.runs += 1
+        self.queries += run.queries
+        self.max_queries = max(self.max_queries, run.queries)
+        self.seconds += run.seconds
+        for statement, count in run.statements.items():
+            self.max_repeats[statement] = max(self.max_repeats[statement], count)
+        for (statement, _), count in run.identical.items():
+            if count > 1:
+                self.max_identical[statement] = max(self.max_identical[statement], count)
+
+    def as_dict(self, repeat_threshold):
+        return {
+            "runs": self.runs,
+            "queries": self.queries,
+            "max_queries_per_run": self.max_queries,
+            "total_ms": self.seconds * 1000,
+            "repeated": {s: n for s, n in self.max_repeats.most_common() if n >= repeat_threshold},
+            "identical": dict(self.max_identical.most_common()),
+        }
+
+class _ActionRun:
+    def __init__(self, name):
+        self.name = name
+        self.queries = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+        self.identical = Counter()
+
+class QueryLog:
+    """Collects per-statement and per-action query statistics.
+
+    slow_ms: statements slower than this are logged (with their query plan when
+    explain is set); None disables the slow-query log.
+    repeat_threshold: how often a statement must run within one action before
+    the report lists it as repeated.
+    """
+    def __init__(self, slow_ms=None, explain=True, repeat_threshold=5, max_slow=200):
+        self.slow_ms = slow_ms
+        self.explain = explain
+        self.repeat_threshold = repeat_threshold
+        self.max_slow = max_slow
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.statements = {}
+            self.actions = {}
+            self.slow = []  # most recent slow statements, newest last
+            self._plans = {}
+
+    @contextmanager
+    def action(self, name):
+        """Attribute the statements run by this thread inside the block to action `name`."""
+        if getattr(self._local, "run", None) is not None:
+            # Nested actions count toward the outer one
+            yield
+            return
+        run = self._local.run = _ActionRun(name)
+        try:
+            yield
+        finally:
+            self._local.run = None
+            if run.queries:
+                with self._lock:
+                    self.actions.setdefault(name, ActionStats()).add(run)
+
+    @contextmanager
+    def measure(self, connection, query, params):
+        """Time the statement run inside the block; the block sets .rows on the yielded entry."""
+        entry = _Entry()
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            self.record(connection, query, params, time.perf_counter() - start, entry.rows)
+
+    def record(self, connection, query, params, seconds, rows):
+        if not self.enabled:
+            return
+        statement = normalize(query)
+        site = call_site()
+        run = getattr(self._local, "run", None)
+        if run is not None:
+            run.queries += 1
+            run.seconds += seconds
+            run.statements[statement] += 1
+            run.identical[(statement, _freeze(params))] += 1
+        with self._lock:
+            stats = self.statements.get(statement)
+            if stats is None:
+                stats = self.statements[statement] = StatementStats()
+            stats.count += 1
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.rows += rows or 0
+            stats.sites[site] += 1
+        if self.slow_ms is not None and seconds * 1000 >= self.slow_ms:
+            self._log_slow(connection, statement, query, params, seconds, site, run)
+
+    def _log_slow(self, connection, statement, query, params, seconds, site, run):
+        plan = None
+        if self.explain and connection is not None:
+            plan = self._plans.get(statement)
+            if plan is None:
+                plan = self._plans[statement] = explain(connection, query, params)
+        entry = {
+            "statement": statement,
+            "ms": seconds * 1000,
+            "site": site,
+            "action": run.name if run is not None else None,
+            "plan": plan,
+        }
+        with self._lock:
+            self.slow.append(entry)
+            del self.slow[:-self.max_slow]
+        logger.warning("Slow query (%.1f ms) from %s: %s%s", entry["ms"], site, statement,
+                       "".join("\n    " + line for line in plan or ()))
+
+    # Reporting
+    def report(self):
+        with self._lock:
+            return {
+                "statements": {s: st.as_dict() for s, st in
+                               sorted(self.statements.items(), key=lambda item: -item[1].seconds)},
+                "actions": {a: st.as_dict(self.repeat_threshold) for a, st in
+                            sorted(self.actions.items(), key=lambda item: -item[1].seconds)},
+                "slow": list(self.slow),
+            }
+
+    def format_report(self, limit=20):
+        """Plain-text summary: the costliest statements, then per-action query counts."""
+        report = self.report()
+        lines = ["Statements by total time:"]
+        for statement, st in list(report["statements"].items())[:limit]:
+            lines.append(f"  {st['count']:6d}x {st['total_ms']:9.1f} ms total {st['max_ms']:8.1f} ms max "
+                         f"{st['rows']:8d} rows  {_shorten(statement)}")
+            for site, count in list(st["sites"].items())[:3]:
+                lines.append(f"{'':10}{count:6d}x from {site}")
+        lines.append("")
+        lines.append("Actions:")
+        for name, st in list(report["actions"].items())[:limit]:
+            lines.append(f"  {name}: {st['runs']} runs, {st['queries']} queries "
+                         f"(max {st['max_queries_per_run']} per run), {st['total_ms']:.1f} ms")
+            for statement, count in st["repeated"].items():
+                lines.append(f"      repeated {count}x in one run: {_shorten(statement)}")
+            for statement, count in st["identical"].items():
+                lines.append(f"      identical {count}x in one run: {_shorten(statement)}")
+        if report["slow"]:
+            lines.append("")
+            lines.append(f"Slow queries (>= {self.slow_ms} ms):")
+            for entry in report["slow"][-limit:]:
+                lines.append(f"  {entry['ms']:8.1f} ms from {entry['site']}: {_shorten(entry['statement'])}")
+                lines.extend(f"      {line}" for line in entry["plan"] or ())
+        return "\n".join(lines)
+
+    def export(self, path):
+        """Write the report as JSON, or as text when path ends in .txt."""
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".txt"):
+                f.write(self.format_report(limit=None) + "\n")
+            else:
+                json.dump(self.report(), f, indent=2, ensure_ascii=False)
+
+class _Entry:
+    rows = 0
+
+def call_site():
+    """'file:Qualified.name -> Model.method' of the code that issued the current statement."""
+    frame = sys._getframe(1)
+    model = None
+    while frame is not None:
+        code = frame.f_code
+        name = os.path.basename(code.co_filename)
+        if name not in _INTERNAL_FILES:
+            site = f"{name}:{code.co_qualname}"
+            return f"{site} -> {model}" if model else site
+        if name == "models.py" and model is None and not code.co_qualname.startswith("Database."):
+            model = code.co_qualname
+        frame = frame.f_back
+    return model or "?"
+
+def explain(connection, query, params):
+    try:
+        rows = connection.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()
+    except sqlite3.Error:
+        return None
+    return [row[-1] for row in rows]
+
+def _freeze(params):
+    if isinstance(params, dict):
+        return tuple(sorted(params.items()))
+    return tuple(params)
+
+def _shorten(statement, width=120):
+    return statement if len(statement) <= width else statement[:width - 3] + "..."
@@ -0,0 +1,139 @@
+import sqlite3
+
+# --- Full-Text Search ---
+# Projects and contacts are mirrored into FTS5 tables (rowid = entity id) that
+# triggers keep in sync. The trigram tokenizer matches any substring of three or
+# more characters, which keeps the old LIKE '%term%' behaviour but from an index,
+# and finds Hebrew words with attached prefix letters (ה, ו, ב, ל, מ, ש, כ):
+# searching "בית" matches "והבית", which a word-prefix tokenizer would miss.
+
+PROJECT_SEARCH_COLUMNS = ["location", "document_path", "contact_names"]
+CONTACT_SEARCH_COLUMNS = ["first_name", "last_name", "phone", "email", "address"]
+
+# Terms shorter than this cannot use the trigram index and fall back to LIKE
+MIN_INDEXED_TERM = 3
+
+# Space-separated names of every contact holding a role in project {pid}
+_PROJECT_CONTACT_NAMES = """
+    (SELECT group_concat(c.first_name || ' ' || c.last_name, ' ')
+     FROM project_roles pr JOIN contacts c ON c.id = pr.contact_id
+     WHERE pr.project_id = {pid})
+"""
+
+def _index_projects(where):
+    return f"""
+        INSERT INTO project_search (rowid, location, document_path, contact_names)
+        SELECT id, location, document_path, {_PROJECT_CONTACT_NAMES.format(pid='projects.id')}
+        FROM projects {where};
+    """
+
+def _project_names(pid):
+    return f"UPDATE project_search SET contact_names = {_PROJECT_CONTACT_NAMES.format(pid=pid)} WHERE rowid = {pid};"
+
+SEARCH_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS project_search USING fts5(location, document_path, contact_names, tokenize='trigram')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS contact_search USING fts5(first_name, last_name, phone, email, address, tokenize='trigram')",
+    # projects
+    f"""CREATE TRIGGER IF NOT EXISTS project_search_ai AFTER INSERT ON projects BEGIN
+        {_index_projects('WHERE id = new.id')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS project_search_au AFTER UPDATE OF location, document_path ON projects BEGIN
+        DELETE FROM project_search WHERE rowid = old.id;
+        {_index_projects('WHERE id = new.id')}
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS project_search_ad AFTER DELETE ON projects BEGIN
+        DELETE FROM project_search WHERE rowid = old.id;
+    END""",
+    # project roles change which contact names a project is found by
+    f"""CREATE TRIGGER IF NOT EXISTS project_roles_search_ai AFTER INSERT ON project_roles BEGIN
+        {_project_names('new.project_id')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS project_roles_search_au AFTER UPDATE ON project_roles BEGIN
+        {_project_names('old.project_id')}
+        {_project_names('new.project_id')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS project_roles_search_ad AFTER DELETE ON project_roles BEGIN
+        {_project_names('old.project_id')}
+    END""",
+    # contacts
+    """CREATE TRIGGER IF NOT EXISTS contact_search_ai AFTER INSERT ON contacts BEGIN
+        INSERT INTO contact_search (rowid, first_name, last_name, phone, email, address)
+        VALUES (new.id, new.first_name, new.last_name, new.phone, new.email, new.address);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS contact_search_au AFTER UPDATE ON contacts BEGIN
+        DELETE FROM contact_search WHERE rowid = old.id;
+        INSERT INTO contact_search (rowid, first_name, last_name, phone, email, address)
+        VALUES (new.id, new.first_name, new.last_name, new.phone, new.email, new.address);
+        UPDATE project_search SET contact_names = {_PROJECT_CONTACT_NAMES.format(pid='project_search.rowid')}
+        WHERE rowid IN (SELECT project_id FROM project_roles WHERE contact_id = new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS contact_search_ad AFTER DELETE ON contacts BEGIN
+        DELETE FROM contact_search WHERE rowid = old.id;
+    END""",
+    # Index rows that existed before the search tables were created
+    "DELETE FROM project_search",
+    _index_projects(""),
+    "DELETE FROM contact_search",
+    """INSERT INTO contact_search (rowid, first_name, last_name, phone, email, address)
+       SELECT id, first_name, last_name, phone, email, address FROM contacts""",
+]
+
+def fts5_available() -> bool:
+    # The trigram tokenizer was added in SQLite 3.34
+    if sqlite3.sqlite_version_info < (3, 34, 0):
+        return False
+    connection = sqlite3.connect(":memory:")
+    try:
+        connection.execute("CREATE VIRTUAL TABLE probe USING fts5(x, tokenize='trigram')")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        connection.close()
+
+def create_search_index(connection):
+    """Migration step: create and populate the FTS tables when this SQLite supports them.
+
+    Without FTS5 the tables are skipped and searches fall back to LIKE scans.
+    """
+    if not fts5_available():
+        return
+    for statement in SEARCH_SCHEMA:
+        connection.execute(statement)
+
+def search_clause(fts_table, columns, id_column, search):
+    """Build the pieces of a query restricting id_column to rows matching search.
+
+    Returns (join, conditions, params, order). Every whitespace-separated term
+    must match; terms long enough for the trigram index go into one ranked MATCH,
+    shorter ones are LIKE-scanned over the FTS columns.
+    """
+    terms = search.split()
+    if not terms:
+        return "", [], [], ""
+    join = f" JOIN {fts_table} ON {fts_table}.rowid = {id_column}"
+    conditions, params = [], []
+    indexed = [t for t in terms if len(t) >= MIN_INDEXED_TERM]
+    if indexed:
+        conditions.append(f"{fts_table} MATCH ?")
+        params.append(" ".join('"' + t.replace('"', '""') + '"' for t in indexed))
+    for term in terms:
+        if len(term) < MIN_INDEXED_TERM:
+            conditions.append("(" + " OR ".join(f"{fts_table}.{c} LIKE ?" for c in columns) + ")")
+            params.extend([f"%{term}%"] * len(columns))
+    order = f"{fts_table}.rank" if indexed else ""
+    return join, conditions, params, order
+
+def matches(fields, search, full_text=True):
+    """In-memory equivalent of the search filters, used to refine rows already loaded.
+
+    With full-text search every term must occur in one of the fields, as with the
+    FTS MATCH; otherwise the whole string must occur in a field, as with the LIKE
+    fallback. Both compare case-insensitively.
+    """
+    if full_text:
+        # A newline never occurs in a term, so no term can match across two fields
+        text = "\n".join(f or "" for f in fields).casefold()
+        return all(term.casefold() in text for term in search.split())
+    needle = search.casefold()
+    return any(needle in (f or "").casefold() for f in fields)
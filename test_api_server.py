@@ -0,0 +1,93 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from http.client import HTTPConnection
+
+from api_server import ApiServer
+from controller import Controller
+from models import Database
+
+# --- API Tests ---
+# A server on an ephemeral port over a fresh database, driven through HTTP.
+
+class ApiServerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directory.name, "api.db"))
+        self.controller = Controller(self.db)
+        self.server = ApiServer(("127.0.0.1", 0), self.controller, workers=2)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.db.close()
+        self.directory.cleanup()
+
+    def request(self, method, path, body=None, headers=None):
+        connection = HTTPConnection("127.0.0.1", self.server.server_port, timeout=10)
+        try:
+            connection.request(method, path, None if body is None else json.dumps(body), headers or {})
+            response = connection.getresponse()
+            data = response.read()
+            return response.status, response.getheader("ETag"), json.loads(data) if data else None
+        finally:
+            connection.close()
+
+    def create_contact(self):
+        status, _, contact = self.request("POST", "/contacts", {"first_name": "Dana", "last_name": "Levi"})
+        self.assertEqual(status, 201)
+        return contact
+
+    def test_get_honours_if_none_match(self):
+        contact = self.create_contact()
+        status, etag, _ = self.request("GET", f"/contacts/{contact['id']}")
+        self.assertEqual(status, 200)
+        status, _, data = self.request("GET", f"/contacts/{contact['id']}", headers={"If-None-Match": etag})
+        self.assertEqual(status, 304)
+        self.assertIsNone(data)
+
+    def test_put_with_a_stale_etag_is_refused(self):
+        contact = self.create_contact()
+        _, etag, _ = self.request("GET", f"/contacts/{contact['id']}")
+        status, _, _ = self.request("PUT", f"/contacts/{contact['id']}", {"first_name": "Dana", "last_name": "Cohen"},
+                                    {"If-Match": etag})
+        self.assertEqual(status, 200)
+        # The same ETag is now out of date
+        status, _, data = self.request("PUT", f"/contacts/{contact['id']}", {"first_name": "Dana", "last_name": "Mor"},
+                                       {"If-Match": etag})
+        self.assertEqual(status, 412)
+        self.assertEqual(self.controller.get_contact(contact["id"]).last_name, "Cohen")
+
+    def test_client_errors(self):
+        self.assertEqual(self.request("GET", "/contacts/999")[0], 404)
+        self.assertEqual(self.request("GET", "/nowhere")[0], 404)
+        self.assertEqual(self.request("POST", "/stages", {})[0], 405)
+        self.assertEqual(self.request("POST", "/contacts", {"first_name": "Dana"})[0], 400)
+        self.assertEqual(self.request("GET", "/contacts?limit=x")[0], 400)
+
+    def test_busy_database_is_reported_as_unavailable(self):
+        self.controller.list_stages = _raising(sqlite3.OperationalError("database is locked"))
+        status, _, data = self.request("GET", "/stages")
+        self.assertEqual(status, 503)
+        self.assertIn("busy", data["error"])
+
+    def test_other_database_errors_still_get_a_response(self):
+        self.server.RequestHandlerClass.log_error = lambda *args: None
+        self.addCleanup(delattr, self.server.RequestHandlerClass, "log_error")
+        for error in (sqlite3.OperationalError("disk I/O error"), RuntimeError("boom")):
+            self.controller.list_stages = _raising(error)
+            status, _, data = self.request("GET", "/stages")
+            self.assertEqual(status, 500)
+            self.assertEqual(data, {"error": "Internal server error."})
+
+def _raising(error):
+    def fail(*args, **kwargs):
+        raise error
+    return fail
+
+if __name__ == "__main__":
+    unittest.main()
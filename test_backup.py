@@ -0,0 +1,78 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from dataclasses import replace
+
+from backup import BackupService
+from changes import CONTACT, PROJECT
+from controller import Controller
+from models import Database
+
+# --- Backup and Restore Tests ---
+
+class RestoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directory.name, "live.db"))
+        self.controller = Controller(self.db)
+        self.backups = BackupService(self.db, os.path.join(self.directory.name, "backups"))
+        self.kept = self.controller.create_contact("Dana", "Levi", "", "", "")
+        self.project = self.controller.create_project("Herzl 1", "2024-01-01", None, True, 1, "", [(self.kept, "Customer")])
+        self.snapshot = self.backups.create()
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def triggers(self):
+        return self.db.execute_query("SELECT name, sql FROM sqlite_master WHERE type='trigger' ORDER BY name",
+                                     fetchall=True)
+
+    def test_restore_moves_the_change_counter_forward(self):
+        added = self.controller.create_contact("Omer", "Cohen", "", "", "")
+        self.controller.update_contact(replace(self.controller.get_contact(self.kept), phone="050"))
+        before = self.controller.change_model.version()
+        self.backups.restore(self.snapshot.path, keep_current=False)
+        # Every row is marked at one version past the old counter: kept rows as
+        # changed, rows missing from the snapshot as deleted
+        self.assertEqual(self.controller.change_model.changed_since(CONTACT, before),
+                         (before + 1, [self.kept], [added]))
+        self.assertEqual(self.controller.change_model.changed_since(PROJECT, before), (before + 1, [self.project], []))
+        self.assertEqual(self.controller.get_contact(self.kept).phone, "")
+
+    def test_restore_rebuilds_the_triggers(self):
+        triggers = self.triggers()
+        self.backups.restore(self.snapshot.path, keep_current=False)
+        self.assertEqual(self.triggers(), triggers)
+        # And they fire again: tracking, search and stage progress
+        version = self.controller.change_model.version()
+        contact_id = self.controller.create_contact("Yael", "Mizrahi", "", "", "")
+        self.assertEqual(self.controller.change_model.changed_since(CONTACT, version)[1], [contact_id])
+        if self.db.full_text_search:
+            self.assertEqual([c.id for c in self.controller.contact_model.list("Mizrahi")], [contact_id])
+        task = self.controller.list_tasks_by_stage(1)[0]
+        self.controller.set_project_task_done(self.project, task.id, True)
+        self.assertEqual(self.controller.list_project_progress()[0].done_by_stage, {1: 1})
+
+    def test_restore_keeps_the_search_flag(self):
+        # The flag describes the live file; the snapshot's upgrade must not overwrite it
+        self.db.full_text_search = False
+        self.backups.restore(self.snapshot.path, keep_current=False)
+        self.assertFalse(self.db.full_text_search)
+
+    def test_restore_upgrades_an_older_snapshot(self):
+        old = os.path.join(self.directory.name, "old.db")
+        connection = sqlite3.connect(old)
+        connection.executescript("""
+            CREATE TABLE projects (id INTEGER PRIMARY KEY, location TEXT, start_date DATE, end_date DATE,
+                                   active BOOLEAN, stage_id INTEGER, document_path TEXT);
+            INSERT INTO projects VALUES (7, 'Old 7', '2020-01-01', NULL, 1, 1, '');
+        """)
+        connection.close()
+        self.backups.restore(old, keep_current=False)
+        self.assertEqual([p.id for p in self.controller.project_model.list()], [7])
+        self.assertEqual(self.db.execute_query("PRAGMA foreign_key_check", fetchall=True), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+
+from changes import CONTACT, PROJECT
+from controller import Controller
+from models import Contact, Database, Project
+
+# --- Change Tracking Tests ---
+# The triggers in changes.py, observed through ChangeModel.changed_since.
+
+class ChangeTrackingTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directory.name, "changes.db"))
+        self.controller = Controller(self.db)
+        self.changes = self.controller.change_model
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_statements_with_a_conflict_policy_are_tracked(self):
+        # OR ABORT on the firing statement would override an OR REPLACE inside the triggers
+        contact_id = self.controller.create_contact("Dana", "Levi", "", "", "")
+        version = self.changes.version()
+        self.db.execute_query("UPDATE OR ABORT contacts SET phone='050' WHERE id=?", (contact_id,))
+        self.assertEqual(self.changes.changed_since(CONTACT, version), (version + 1, [contact_id], []))
+
+    def test_project_writes_are_tracked(self):
+        version = self.changes.version()
+        project_id = self.controller.create_project("Herzl 1", "2024-01-01", None, True, 1, "")
+        self.assertEqual(self.changes.changed_since(PROJECT, version)[1:], ([project_id], []))
+        version = self.changes.version()
+        self.controller.update_project(Project(project_id, "Herzl 2", "2024-01-01", None, True, 1, ""))
+        self.assertEqual(self.changes.changed_since(PROJECT, version)[1:], ([project_id], []))
+        version = self.changes.version()
+        self.controller.delete_project(project_id)
+        self.assertEqual(self.changes.changed_since(PROJECT, version)[1:], ([], [project_id]))
+
+    def test_nothing_changed_since_the_current_version(self):
+        self.controller.create_contact("Dana", "Levi", "", "", "")
+        version = self.changes.version()
+        self.assertEqual(self.changes.changed_since(CONTACT, version), (version, [], []))
+        self.assertEqual(self.changes.changed_since(PROJECT, version), (version, [], []))
+
+    def test_role_and_task_changes_mark_the_project(self):
+        contact_id = self.controller.create_contact("Dana", "Levi", "", "", "")
+        project_id = self.controller.create_project("Herzl 1", "2024-01-01", None, True, 1, "")
+        task_id = self.controller.list_tasks_by_stage(1)[0].id
+        for change in (lambda: self.controller.set_project_roles(project_id, [(contact_id, "Customer")]),
+                       lambda: self.controller.set_project_task_done(project_id, task_id, True),
+                       # The second write of a status takes the upsert's UPDATE branch
+                       lambda: self.controller.set_project_task_done(project_id, task_id, False)):
+            version = self.changes.version()
+            change()
+            self.assertEqual(self.changes.changed_since(PROJECT, version)[1:], ([project_id], []))
+            self.assertEqual(self.changes.changed_since(CONTACT, version)[1:], ([], []))
+
+    def test_renaming_a_contact_marks_the_projects_showing_it(self):
+        contact_id = self.controller.create_contact("Dana", "Levi", "", "", "")
+        project_id = self.controller.create_project("Herzl 1", "2024-01-01", None, True, 1, "", [(contact_id, "Customer")])
+        self.controller.create_project("Herzl 2", "2024-01-01", None, True, 1, "")
+        version = self.changes.version()
+        self.controller.update_contact(Contact(contact_id, "Dana", "Cohen", "", "", ""))
+        self.assertEqual(self.changes.changed_since(CONTACT, version)[1:], ([contact_id], []))
+        self.assertEqual(self.changes.changed_since(PROJECT, version)[1:], ([project_id], []))
+
+    def test_rolled_back_writes_leave_the_version_alone(self):
+        version = self.changes.version()
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.controller.create_contact("Dana", "Levi", "", "", "")
+                raise RuntimeError
+        self.assertEqual(self.changes.changed_since(CONTACT, version), (version, [], []))
+
+class TaskStatusTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directory.name, "tasks.db"))
+        self.controller = Controller(self.db)
+        # The seeded stage with the most tasks
+        self.stage_id = max((s.id for s in self.controller.list_stages()),
+                            key=lambda stage_id: len(self.controller.list_tasks_by_stage(stage_id)))
+        self.tasks = [t.id for t in self.controller.list_tasks_by_stage(self.stage_id)]
+        self.project_id = self.controller.create_project("Herzl 1", "2024-01-01", None, True, self.stage_id, "")
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def done(self):
+        return self.controller.list_project_progress()[0].done_by_stage
+
+    def test_statuses_are_upserted_one_row_per_task(self):
+        first, second = self.tasks[:2]
+        self.controller.set_tasks_done({self.project_id: {first: True, second: True}})
+        self.controller.set_tasks_done({self.project_id: {first: False, second: True}})
+        rows = self.db.execute_query("SELECT task_id, is_done FROM project_stage_tasks WHERE project_id=? ORDER BY task_id",
+                                     (self.project_id,), fetchall=True)
+        self.assertEqual([tuple(row) for row in rows], [(first, 0), (second, 1)])
+
+    def test_stage_progress_follows_the_statuses(self):
+        self.assertEqual(self.done(), {})
+        self.controller.set_tasks_done({self.project_id: {task_id: True for task_id in self.tasks}})
+        self.assertEqual(self.done(), {self.stage_id: len(self.tasks)})
+        self.controller.set_project_task_done(self.project_id, self.tasks[0], False)
+        self.assertEqual(self.done(), {self.stage_id: len(self.tasks) - 1})
+        # Setting a status to what it already is changes no count
+        self.controller.set_project_task_done(self.project_id, self.tasks[1], True)
+        self.assertEqual(self.done(), {self.stage_id: len(self.tasks) - 1})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+from benchmark import SCALES, generate, stress
+from concurrency import Concurrency, JournalModeError
+from models import Database
+
+# --- Concurrent Access Tests ---
+# Reader and writer processes share one database file, as two workstations do.
+
+class StressTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "stress.db")
+        generate(self.path, SCALES["1k"])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_wal_readers_never_wait_for_the_writer(self):
+        report = stress(self.path, "wal", readers=2, writers=1, seconds=1.0, hold_ms=100)
+        self.assertEqual(report["reader"]["busy_errors"], 0)
+        # Both sides got work done, so the zero means something
+        self.assertGreater(report["reader"]["ops"], 0)
+        self.assertGreater(report["writer"]["ops"], 0)
+
+    def test_rollback_journal_readers_are_locked_out(self):
+        # The contrast that makes the WAL test meaningful: the same load does block readers here
+        report = stress(self.path, "delete", readers=2, writers=1, seconds=1.0, hold_ms=100)
+        self.assertGreater(report["reader"]["busy_errors"], 0)
+
+class JournalModeTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "mode.db")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_default_keeps_the_file_mode(self):
+        with Database(self.path) as db:
+            self.assertEqual(db.journal_mode, "delete")
+        with Database(self.path, concurrency=Concurrency.WAL):
+            with Database(self.path) as db:
+                self.assertEqual(db.journal_mode, "wal")
+
+    def test_switch_refused_while_others_have_the_file_open(self):
+        with Database(self.path, concurrency=Concurrency.WAL):
+            with self.assertRaises(JournalModeError):
+                Database(self.path, concurrency=Concurrency("delete", busy_timeout_ms=100, retries=1))
+
+if __name__ == "__main__":
+    unittest.main()
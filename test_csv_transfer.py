@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+from controller import Controller
+from csv_transfer import CsvTransfer
+from models import Database
+
+# --- CSV Import/Export Tests ---
+
+class CsvTransferTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.export = os.path.join(self.directory.name, "export")
+        self.db = self.open("source.db")
+        self.controller = Controller(self.db)
+        customer = self.controller.create_contact("Dana", "Levi", "050", "dana@example.com", "Haifa")
+        inspector = self.controller.create_contact("Omer", "Cohen", "", "", "")
+        self.controller.create_project("Herzl 1", "2024-01-01", None, True, 1, "",
+                                       [(customer, "Customer"), (inspector, "Inspector")])
+        self.controller.create_project("Herzl 2", "2024-02-01", "2024-06-01", False, 2, "", [(customer, "Customer")])
+        CsvTransfer(self.controller).export_all(self.export)
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def open(self, name):
+        db = Database(os.path.join(self.directory.name, name))
+        self.addCleanup(db.close)
+        return db
+
+    def counts(self, db):
+        return [db.execute_query(f"SELECT count(*) FROM {table}", fetchone=True)[0]
+                for table in ("projects", "contacts", "project_roles")]
+
+    def test_round_trip_into_an_empty_database(self):
+        target = self.open("target.db")
+        results = CsvTransfer(Controller(target)).import_all(self.export)
+        self.assertEqual({table: (r.imported, r.errors) for table, r in results.items()},
+                         {"contacts": (2, []), "projects": (2, []), "project_roles": (3, [])})
+        self.assertEqual(self.counts(target), self.counts(self.db))
+        self.assertEqual(target.execute_query("SELECT * FROM contacts ORDER BY id", fetchall=True),
+                         self.db.execute_query("SELECT * FROM contacts ORDER BY id", fetchall=True))
+
+    def test_reimport_into_the_same_database_adds_nothing(self):
+        before = self.counts(self.db)
+        results = CsvTransfer(self.controller).import_all(self.export)
+        self.assertEqual({table: (r.imported, len(r.errors)) for table, r in results.items()},
+                         {"contacts": (0, 2), "projects": (0, 2), "project_roles": (0, 3)})
+        self.assertEqual(results["project_roles"].errors[0], (2, "Contact 1 is already Customer of project 1."))
+        self.assertEqual(self.counts(self.db), before)
+
+    def test_duplicate_rows_within_a_file_are_reported(self):
+        path = os.path.join(self.directory.name, "roles.csv")
+        with open(path, "w", encoding="utf-8-sig") as f:
+            f.write("project_id,contact_id,role\n2,2,Inspector\n2,2,Inspector\n")
+        result = CsvTransfer(self.controller).import_project_roles(path)
+        self.assertEqual((result.imported, [line for line, _ in result.errors]), (1, [3]))
+
+if __name__ == "__main__":
+    unittest.main()
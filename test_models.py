@@ -0,0 +1,138 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from controller import Controller
+from models import SCHEMA_VERSION, Contact, Database, Project
+
+# --- Model Tests ---
+# Each test gets a fresh database file with the seeded stages and tasks.
+
+class ModelTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directory.name, "models.db"))
+        self.controller = Controller(self.db)
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def create_project(self, location, customer=None):
+        roles = []
+        if customer:
+            roles.append((self.controller.create_contact(customer, "Levi", "", "", ""), "Customer"))
+        return self.controller.create_project(location, "2024-01-01", None, True, 1, "", roles)
+
+class SortTest(ModelTestCase):
+    def test_customer_sorts_case_insensitively(self):
+        for location, customer in (("1", "bob"), ("2", "Alice"), ("3", "carol"), ("4", "Dave")):
+            self.create_project(location, customer)
+        projects = self.controller.project_model.list(order_by=[("customer", False)])
+        self.assertEqual([p.location for p in projects], ["2", "1", "3", "4"])
+
+    def test_projects_without_a_customer_sort_first(self):
+        self.create_project("1", "bob")
+        self.create_project("2")
+        projects = self.controller.project_model.list(order_by=[("customer", False)])
+        self.assertEqual([p.location for p in projects], ["2", "1"])
+
+class ProjectListTest(ModelTestCase):
+    def roles(self, project_id):
+        return self.controller.list_project_schemas(ids=[project_id])[0].roles
+
+    def test_role_holders_are_named_like_the_contact_directory(self):
+        # Contacts sharing a full name, however it splits into first and last, get their id appended
+        first = self.controller.create_contact("Mary Ann", "Smith", "", "", "")
+        second = self.controller.create_contact("Mary", "Ann Smith", "", "", "")
+        other = self.controller.create_contact("Dana", "Levi", "", "", "")
+        project_id = self.controller.create_project("1", "2024-01-01", None, True, 1, "",
+                                                    [(first, "Customer"), (second, "Customer"), (other, "Inspector")])
+        roles = self.roles(project_id)
+        self.assertEqual((roles["Customer 1"], roles["Customer 2"], roles["Inspector"]),
+                         (f"Mary Ann Smith (#{first})", f"Mary Ann Smith (#{second})", "Dana Levi"))
+        self.assertEqual(roles, self.controller.get_project_schema(project_id).roles)
+
+    def test_role_holders_renamed_elsewhere_show_their_new_name(self):
+        contact_id = self.controller.create_contact("Dana", "Levi", "", "", "")
+        project_id = self.create_project("1")
+        self.controller.set_project_roles(project_id, [(contact_id, "Customer")])
+        # As another process would, bypassing this process's contact directory
+        self.db.execute_query("UPDATE contacts SET last_name='Cohen' WHERE id=?", (contact_id,))
+        self.assertEqual(self.roles(project_id)["Customer 1"], "Dana Cohen")
+
+class SearchIndexTest(ModelTestCase):
+    # The search tables are kept in step with their rows by triggers
+    def contacts(self, search):
+        return [c.id for c in self.controller.list_contacts(search)]
+
+    def projects(self, search):
+        return [p.id for p in self.controller.list_projects(search)]
+
+    def test_contacts_follow_inserts_updates_and_deletes(self):
+        contact_id = self.controller.create_contact("Dana", "Mizrahi", "050", "dana@example.com", "")
+        self.assertEqual(self.contacts("Mizrahi"), [contact_id])
+        self.controller.update_contact(Contact(contact_id, "Dana", "Cohen", "050", "dana@example.com", ""))
+        self.assertEqual((self.contacts("Mizrahi"), self.contacts("Cohen")), ([], [contact_id]))
+        self.controller.delete_contact(contact_id)
+        self.assertEqual(self.contacts("Cohen"), [])
+
+    def test_projects_follow_inserts_updates_and_deletes(self):
+        project_id = self.create_project("Herzl 12, Haifa")
+        self.assertEqual(self.projects("Herzl"), [project_id])
+        self.controller.update_project(Project(project_id, "Balfour 3, Haifa", "2024-01-01", None, True, 1, ""))
+        self.assertEqual((self.projects("Herzl"), self.projects("Balfour")), ([], [project_id]))
+        self.controller.delete_project(project_id)
+        self.assertEqual(self.projects("Haifa"), [])
+
+class MigrationTest(unittest.TestCase):
+    # Upgrades a copy of the database shipped with the application, which predates every migration
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "projects.db")
+        shutil.copy(os.path.join(os.path.dirname(os.path.abspath(__file__)), "projects.db"), self.path)
+        connection = sqlite3.connect(self.path)
+        with connection:
+            # A duplicated task status, which migration 1 removes before adding its unique index
+            connection.execute("""INSERT INTO project_stage_tasks (project_id, task_id, is_done)
+                                  SELECT project_id, task_id, 1 - is_done FROM project_stage_tasks LIMIT 1""")
+        self.original = connection.execute("SELECT * FROM projects ORDER BY id").fetchall()
+        connection.close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_upgrade_keeps_the_data_and_builds_the_derived_tables(self):
+        with Database(self.path) as db:
+            query = lambda sql: [tuple(row) for row in db.execute_query(sql, fetchall=True)]
+            self.assertEqual(query("PRAGMA user_version"), [(SCHEMA_VERSION,)])
+            self.assertEqual(query("PRAGMA integrity_check"), [("ok",)])
+            self.assertEqual(query("PRAGMA foreign_key_check"), [])
+            self.assertEqual(query("SELECT * FROM projects ORDER BY id"), self.original)
+            self.assertEqual(query("""SELECT project_id, task_id FROM project_stage_tasks
+                                      GROUP BY project_id, task_id HAVING count(*) > 1"""), [])
+            # Stage progress counted from the task statuses that were kept
+            self.assertEqual(query("SELECT project_id, stage_id, done FROM stage_progress ORDER BY 1, 2"),
+                             query("""SELECT pst.project_id, t.stage_id, SUM(pst.is_done != 0)
+                                      FROM project_stage_tasks pst JOIN tasks t ON t.id = pst.task_id
+                                      GROUP BY 1, 2 HAVING SUM(pst.is_done != 0) > 0 ORDER BY 1, 2"""))
+            if db.full_text_search:
+                self.assertEqual(query("SELECT count(*) FROM project_search"), [(len(self.original),)])
+            controller = Controller(db)
+            for project in self.original:
+                self.assertIn(project[0], [p.id for p in controller.list_projects(project[1])])
+
+    def test_a_current_database_is_opened_as_is(self):
+        Database(self.path).close()
+        connection = sqlite3.connect(self.path)
+        schema = connection.execute("SELECT * FROM sqlite_master ORDER BY name").fetchall()
+        connection.close()
+        Database(self.path).close()
+        connection = sqlite3.connect(self.path)
+        self.assertEqual(connection.execute("SELECT * FROM sqlite_master ORDER BY name").fetchall(), schema)
+        connection.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,13 @@
+import os
+import pathlib
 import tkinter as tk
+import webbrowser
+from contextlib import nullcontext
+from datetime import datetime
 from tkinter import ttk, messagebox, simpledialog, filedialog
-from models import ProjectSchema
+from concurrency import is_busy
+from models import Contact, Project, ProjectSchema
+from workers import DbWorker
 
 # Central place to control GUI directionality (LTR or RTL)
 GUI_DIRECTION = 'rtl'  # Change to 'rtl' for right-to-left
@@ -11,43 +18,496 @@ GUI_JUSTIFY = 'left' if GUI_DIRECTION == 'ltr' else 'right'
 GUI_STICKY = 'w' if GUI_DIRECTION == 'ltr' else 'e'
 GUI_SIDE = 'left' if GUI_DIRECTION == 'ltr' else 'right'
 
+class PagedTreeview(ttk.Treeview):
+    """Treeview that fetches its rows one page at a time as the user scrolls.
+
+    reload(fetch_page, query) clears the tree and loads the first page; fetch_page(offset, limit)
+    returns a list of (iid, values) or (iid, values, search_fields) rows. Further pages
+    are requested whenever the view is scrolled near the end of what has been loaded
+    so far. With a worker, pages are fetched on the worker thread and a reload drops
+    any page still in flight. Once every row of a query is loaded, refine() can
+    narrow it in memory using the search_fields kept for each row.
+
+    With changes_since(version) -> (version, changed ids, deleted ids) and a
+    fetch_rows(ids) passed to reload(), sync() brings the loaded rows up to date
+    by re-reading only the rows changed since they were loaded.
+    """
+    PAGE_SIZE = 200
+
+    def __init__(self, master, page_size=PAGE_SIZE, worker=None, on_error=None, changes_since=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.page_size = page_size
+        self.worker = worker
+        self.on_error = on_error
+        self.changes_since = changes_since
+        self.version = None
+        self._fetch_page = None
+        self._fetch_rows = None
+        self.query = None
+        self._search_fields = {}
+        self._generation = 0
+        self._loaded = 0
+        self._exhausted = True
+        self._loading = False
+        self.scrollbar = ttk.Scrollbar(master, orient='vertical', command=self.yview)
+        self.configure(yscrollcommand=self._on_scroll)
+
+    def reload(self, fetch_page=None, query=None, fetch_rows=None):
+        if fetch_page is not None:
+            self._fetch_page = fetch_page
+            self._fetch_rows = fetch_rows
+        self.query = query
+        self.version = None
+        self._search_fields = {}
+        self.delete(*self.get_children())
+        self._generation += 1
+        self._loaded = 0
+        self._exhausted = False
+        self._loading = False
+        self.load_more()
+
+    def load_more(self):
+        if self._exhausted or self._loading or self._fetch_page is None:
+            return
+        self._loading = True
+        generation = self._generation
+        if self.worker is None:
+            self._add_page(generation, self._load_page(self._loaded, self.page_size))
+        else:
+            self.worker.submit(self._load_page, self._loaded, self.page_size, key=self,
+                               on_done=lambda page: self._add_page(generation, page),
+                               on_error=self._page_failed)
+
+    def _load_page(self, offset, limit):
+        # Note the version before the first page is read, so sync() re-reads
+        # anything written while the pages load rather than missing it
+        version = None
+        if offset == 0 and self.changes_since is not None:
+            version = self.changes_since(None)[0]
+        return version, self._fetch_page(offset, limit)
+
+    def _add_page(self, generation, page):
+        if generation != self._generation or not self.winfo_exists():
+            return
+        version, rows = page
+        if version is not None:
+            self.version = version
+        for iid, values, *search_fields in rows:
+            # Rows shifted across a page boundary by concurrent edits may repeat
+            if not self.exists(iid):
+                self.insert('', 'end', iid=iid, values=values)
+                if search_fields:
+                    self._search_fields[str(iid)] = search_fields[0]
+        self._loaded += len(rows)
+        self._exhausted = len(rows) < self.page_size
+        self._loading = False
+
+    def is_complete(self):
+        # True when every row of the current query has been loaded
+        return self._exhausted and not self._loading and self._fetch_page is not None
+
+    def refine(self, query, predicate, fetch_rows=None):
+        """Drop loaded rows whose search fields fail predicate, without querying again.
+
+        fetch_rows reads rows of the narrowed query for sync(); without it sync() reloads.
+        """
+        self.query = query
+        self._fetch_rows = fetch_rows
+        rejected = [iid for iid in self.get_children() if not predicate(self._search_fields.get(iid, ()))]
+        self.delete(*rejected)
+        for iid in rejected:
+            del self._search_fields[iid]
+
+    def sync(self):
+        """Apply the rows changed since the loaded version; reload when that is not possible."""
+        if self.version is None or self._fetch_rows is None or self._loading:
+            self.reload(query=self.query)
+            return
+        generation = self._generation
+        if self.worker is None:
+            self._apply_changes(generation, self._load_changes(self.version))
+            return
+        self.worker.submit(self._load_changes, self.version, key=self,
+                           on_done=lambda changes: self._apply_changes(generation, changes),
+                           on_error=self._page_failed)
+
+    def _load_changes(self, version):
+        version, changed, deleted = self.changes_since(version)
+        if len(changed) + len(deleted) > self.page_size:
+            # Cheaper to start over than to patch this many rows
+            return None
+        return version, changed, deleted, self._fetch_rows(changed) if changed else []
+
+    def _apply_changes(self, generation, changes):
+        if generation != self._generation or not self.winfo_exists():
+            return
+        if changes is None:
+            self.reload(query=self.query)
+            return
+        version, changed, deleted, rows = changes
+        current = {str(iid) for iid, *_ in rows}
+        # Deleted rows, and changed rows that no longer match the query
+        gone = [str(iid) for iid in list(deleted) + list(changed) if str(iid) not in current]
+        for iid in gone:
+            if self.exists(iid):
+                self.delete(iid)
+                self._loaded -= 1
+            self._search_fields.pop(iid, None)
+        for iid, values, *search_fields in rows:
+            if self.exists(iid):
+                # Changed rows keep their place; a reload re-sorts them
+                self.item(iid, values=values)
+            elif self._exhausted:
+                # New rows go at the end; with more pages to come, paging picks them up
+                self.insert('', 'end', iid=iid, values=values)
+                self._loaded += 1
+            else:
+                continue
+            if search_fields:
+                self._search_fields[str(iid)] = search_fields[0]
+        self.version = version
+
+    def _page_failed(self, error):
+        self._loading = False
+        self._exhausted = True
+        if self.on_error:
+            self.on_error(error)
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # Keep one screen of rows ahead of the visible window
+        if float(last) >= 0.9 and not self._exhausted:
+            self.after_idle(self.load_more)
+
 class AppView(tk.Tk):
+    # Pause after the last keystroke before a typed search runs
+    SEARCH_DELAY_MS = 300
+    # Task checkbox toggles within this window are written together
+    TASK_FLUSH_MS = 500
+
     def __init__(self, controller):
         super().__init__()
         self.title("Architecture Project Manager")
         self.geometry("1100x700")
         self.controller = controller
+        self._debounce_ids = {}
+        self._pending_task_status = {}  # project_id -> {task_id: is_done} not yet written
+        self._task_flush_id = None
+        # Document scans read the file server for minutes at a time, so they get their own worker
+        self._scan_worker = None
+        # Snapshots copy the whole database, so they get one too
+        self._backup_worker = None
+        # List frames are hidden rather than destroyed, so returning to one only applies what changed
+        self._list_frames = {}  # name -> (frame, PagedTreeview)
+        # Status bar doubles as the loading indicator for background work
+        self.status_var = tk.StringVar()
+        tk.Label(self, textvariable=self.status_var, anchor=GUI_ANCHOR, justify=GUI_JUSTIFY).pack(side='bottom', fill='x', padx=10)
+        self.worker = DbWorker(self, on_busy=self._on_busy, context=self._query_action)
         self._setup_nav()
         self._show_home()
 
+    def destroy(self):
+        self._flush_task_status()
+        self.worker.shutdown()
+        if self._scan_worker is not None:
+            self._scan_worker.shutdown()
+        if self._backup_worker is not None:
+            self._backup_worker.shutdown()
+        super().destroy()
+
+    def _query_action(self, request):
+        # With query logging on, attribute each background request's queries to it
+        query_log = self.controller.query_log
+        if query_log is None:
+            return nullcontext()
+        return query_log.action(getattr(request.fn, '__qualname__', repr(request.fn)))
+
+    def _on_busy(self, busy):
+        self.status_var.set("Loading..." if busy else "")
+        self.config(cursor='watch' if busy else '')
+
+    def _run_async(self, fn, *args, on_done=None, key=None):
+        # Run a controller call on the worker thread; errors are shown in a message box
+        return self.worker.submit(fn, *args, on_done=on_done, on_error=self._show_error, key=key)
+
+    def _show_error(self, error):
+        if is_busy(error):
+            messagebox.showerror("Database Busy", "Another program is writing to the database. Please try again in a moment.")
+            return
+        messagebox.showerror("Error", str(error))
+
+    def _debounce(self, name, callback):
+        # Run callback once no further call with the same name arrives within SEARCH_DELAY_MS
+        self._cancel_debounce(name)
+        def fire():
+            del self._debounce_ids[name]
+            callback()
+        self._debounce_ids[name] = self.after(self.SEARCH_DELAY_MS, fire)
+
+    def _cancel_debounce(self, name):
+        pending = self._debounce_ids.pop(name, None)
+        if pending:
+            self.after_cancel(pending)
+
     def _setup_nav(self):
         menubar = tk.Menu(self)
         self.config(menu=menubar)
         menubar.add_command(label="Home", command=self._show_home)
         menubar.add_command(label="Projects", command=self._show_projects)
         menubar.add_command(label="Contacts", command=self._show_contacts)
+        menubar.add_command(label="Documents", command=self._show_documents)
+        data_menu = tk.Menu(menubar, tearoff=0)
+        data_menu.add_command(label="Import CSV...", command=self._import_csv)
+        data_menu.add_command(label="Export CSV...", command=self._export_csv)
+        data_menu.add_separator()
+        data_menu.add_command(label="Backups...", command=self._show_backups)
+        if self.controller.query_log is not None:
+            data_menu.add_separator()
+            data_menu.add_command(label="Query Report...", command=self._show_query_report)
+        menubar.add_cascade(label="Data", menu=data_menu)
+
+    # --- CSV Import/Export ---
+    def _import_csv(self):
+        directory = filedialog.askdirectory(title="Folder with projects.csv, contacts.csv, project_roles.csv")
+        if not directory:
+            return
+        def done(results):
+            lines = []
+            for table, result in results.items():
+                lines.append(f"{table}: {result.imported} imported, {len(result.errors)} skipped")
+                lines.extend(f"  line {line}: {message}" for line, message in result.errors[:5])
+            messagebox.showinfo("Import CSV", "\n".join(lines) or "No CSV files found.")
+            self._show_home()
+        from csv_transfer import CsvTransfer  # only needed once the menu is used
+        self._run_async(CsvTransfer(self.controller).import_all, directory, on_done=done)
+
+    def _export_csv(self):
+        directory = filedialog.askdirectory(title="Export to folder")
+        if not directory:
+            return
+        from csv_transfer import CsvTransfer
+        self._run_async(CsvTransfer(self.controller).export_all, directory,
+                        on_done=lambda _: messagebox.showinfo("Export CSV", f"Exported to {directory}."))
+
+    # --- Backups ---
+    def _show_backups(self):
+        if self._backup_worker is None:
+            self._backup_worker = DbWorker(self, context=self._query_action)
+        window = tk.Toplevel(self)
+        window.title("Backups")
+        window.geometry("700x400")
+        buttons = tk.Frame(window)
+        buttons.pack(side='bottom', fill='x', pady=5)
+        status_var = tk.StringVar()
+        tk.Label(window, textvariable=status_var, anchor=GUI_ANCHOR, justify=GUI_JUSTIFY).pack(side='bottom', fill='x', padx=10)
+        columns = ["Snapshot", "Created", "Size"]
+        tree = ttk.Treeview(window, columns=columns, show='headings', selectmode='browse')
+        for col in columns:
+            tree.heading(col, text=col, anchor=GUI_ANCHOR)
+            tree.column(col, width=300 if col == "Snapshot" else 150, anchor=GUI_ANCHOR)
+        tree.pack(fill='both', expand=True, padx=10, pady=10)
+        snapshots = {}  # tree item -> backup.Snapshot
+        # (pages copied, total pages), written by the backup worker's thread and shown by poll()
+        progress = [0, 0]
+
+        def submit(fn, *args, on_done):
+            # Results may arrive after the window was closed
+            def deliver(result):
+                if window.winfo_exists():
+                    on_done(result)
+            self._backup_worker.submit(fn, *args, on_done=deliver, on_error=self._show_error)
+        def fill(result):
+            tree.delete(*tree.get_children())
+            snapshots.clear()
+            for snapshot in result:
+                item = tree.insert('', 'end', values=(snapshot.name, f"{snapshot.created:%Y-%m-%d %H:%M:%S}",
+                                                      self._format_size(snapshot.size)))
+                snapshots[item] = snapshot
+            error = self.controller.backups.last_error
+            status_var.set(f"The last scheduled backup failed: {error}" if error else
+                           f"{len(result)} snapshots in {self.controller.backups.directory}")
+        def refresh():
+            submit(self.controller.list_backups, on_done=fill)
+        def selected():
+            item = tree.selection()
+            if not item:
+                messagebox.showinfo("Backups", "Select a snapshot first.", parent=window)
+                return None
+            return snapshots[item[0]]
+        def poll():
+            if self._backup_worker.idle or not window.winfo_exists():
+                return
+            copied, total = progress
+            if total:
+                status_var.set(f"Backing up... {copied * 100 // total}%")
+            window.after(200, poll)
+        def on_progress(copied, total):
+            progress[:] = [copied, total]
+        def back_up():
+            progress[:] = [0, 0]
+            submit(self.controller.create_backup, on_progress, on_done=lambda _: refresh())
+            poll()
+        def verify():
+            snapshot = selected()
+            if snapshot is None:
+                return
+            def done(problems):
+                if problems:
+                    messagebox.showerror("Verify", f"{snapshot.name} is damaged:\n" + "\n".join(problems[:10]), parent=window)
+                else:
+                    messagebox.showinfo("Verify", f"{snapshot.name} passed the integrity check.", parent=window)
+            status_var.set(f"Checking {snapshot.name}...")
+            submit(self.controller.verify_backup, snapshot.path, on_done=done)
+        def restore():
+            snapshot = selected()
+            if snapshot is None or not messagebox.askyesno(
+                    "Restore", f"Replace all data with the snapshot of {snapshot.created:%Y-%m-%d %H:%M}?\n"
+                               "The current data is saved as a new snapshot first.", parent=window):
+                return
+            def done(current):
+                self._reset_lists()
+                self._show_home()
+                if window.winfo_exists():
+                    refresh()
+                messagebox.showinfo("Restore", f"Restored {snapshot.name}. The replaced data is in {current.name}.")
+            self._flush_task_status()
+            # On the main worker, so the views' queued reads and writes run before or after it, never during
+            self._run_async(self.controller.restore_backup, snapshot.path, on_done=done)
+        tk.Button(buttons, text="Back Up Now", command=back_up).pack(side=GUI_SIDE, padx=5)
+        tk.Button(buttons, text="Verify", command=verify).pack(side=GUI_SIDE, padx=5)
+        tk.Button(buttons, text="Restore...", command=restore).pack(side=GUI_SIDE, padx=5)
+        refresh()
+
+    def _reset_lists(self):
+        # The cached lists hold rows and change versions of the data a restore replaced
+        self._clear_main()
+        for frame, _ in self._list_frames.values():
+            frame.destroy()
+        self._list_frames = {}
+
+    # --- Query Report ---
+    def _show_query_report(self):
+        query_log = self.controller.query_log
+        window = tk.Toplevel(self)
+        window.title("Query Report")
+        window.geometry("1000x600")
+        buttons = tk.Frame(window)
+        buttons.pack(side='bottom', fill='x', pady=5)
+        text = tk.Text(window, wrap='none', font=("Courier", 10))
+        scrollbar = ttk.Scrollbar(window, orient='vertical', command=text.yview)
+        text.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side='right', fill='y')
+        text.pack(fill='both', expand=True)
+        def refresh():
+            text.configure(state='normal')
+            text.delete('1.0', 'end')
+            text.insert('1.0', query_log.format_report())
+            text.configure(state='disabled')
+        def reset():
+            query_log.reset()
+            refresh()
+        def export():
+            path = filedialog.asksaveasfilename(parent=window, defaultextension=".json",
+                                                filetypes=[("JSON", "*.json"), ("Text", "*.txt")])
+            if path:
+                query_log.export(path)
+        tk.Button(buttons, text="Refresh", command=refresh).pack(side=GUI_SIDE, padx=5)
+        tk.Button(buttons, text="Reset", command=reset).pack(side=GUI_SIDE, padx=5)
+        tk.Button(buttons, text="Export...", command=export).pack(side=GUI_SIDE, padx=5)
+        refresh()
 
     def _clear_main(self):
+        # Any detail view still loading would replace the frame being shown now
+        self.worker.cancel('main')
+        self._flush_task_status()
+        for name in list(self._debounce_ids):
+            self._cancel_debounce(name)
         if hasattr(self, 'main_frame'):
-            self.main_frame.destroy()
+            if any(self.main_frame is frame for frame, _ in self._list_frames.values()):
+                self.main_frame.pack_forget()
+            else:
+                self.main_frame.destroy()
 
     def _show_home(self):
         self._clear_main()
+        if self._show_list_frame('home'):
+            return
         self.main_frame = tk.Frame(self)
         self.main_frame.pack(fill='both', expand=True)
-        tk.Label(self.main_frame, text="Welcome to Architecture Project Manager", font=("Arial", 20, "bold"), anchor=GUI_ANCHOR, justify=GUI_JUSTIFY).pack(pady=40, anchor=GUI_ANCHOR)
-        tk.Label(self.main_frame, text="Use the menu to manage projects and contacts.", font=("Arial", 14), anchor=GUI_ANCHOR, justify=GUI_JUSTIFY).pack(pady=10, anchor=GUI_ANCHOR)
+        tk.Label(self.main_frame, text="Welcome to Architecture Project Manager", font=("Arial", 20, "bold"), anchor=GUI_ANCHOR, justify=GUI_JUSTIFY).pack(pady=(30, 10), anchor=GUI_ANCHOR)
+        tk.Label(self.main_frame, text="Use the menu to manage projects and contacts.", font=("Arial", 14), anchor=GUI_ANCHOR, justify=GUI_JUSTIFY).pack(pady=5, anchor=GUI_ANCHOR)
+        # Dashboard: progress of every active project
+        tk.Label(self.main_frame, text="Active Projects", font=("Arial", 16, "bold"), anchor=GUI_ANCHOR, justify=GUI_JUSTIFY).pack(pady=(20, 5), padx=10, anchor=GUI_ANCHOR)
+        columns = ["id", "Project Name", "Stage", "Stage Progress", "Overall Progress"]
+        ttk.Style().configure("Bold.Treeview.Heading", font=("Arial", 10, "bold"))
+        self.progress_tree = PagedTreeview(self.main_frame, worker=self.worker, on_error=self._show_error,
+                                           changes_since=self.controller.project_changes_since,
+                                           columns=columns, show='headings', style="Bold.Treeview")
+        for col in columns:
+            self.progress_tree.heading(col, text=col, anchor=GUI_ANCHOR)
+            self.progress_tree.column(col, width=60 if col == "id" else 220, anchor=GUI_ANCHOR)
+        self.progress_tree.scrollbar.pack(side='left' if GUI_DIRECTION == 'rtl' else 'right', fill='y', pady=10)
+        self.progress_tree.pack(fill='both', expand=True, pady=10)
+        self.progress_tree.bind('<Double-1>', self._on_progress_double_click)
+        self._list_frames['home'] = (self.main_frame, self.progress_tree)
+        def fetch_page(offset, limit, ids=None):
+            totals = self.controller.stage_task_totals()
+            return [(p.project.id, self._progress_row(p, totals)) for p in
+                    self.controller.list_project_progress(True, limit, offset, ids)]
+        self.progress_tree.reload(fetch_page, None, lambda ids: fetch_page(0, None, ids))
+
+    def _progress_row(self, progress, totals):
+        project = progress.project
+        stage = self.controller.get_stage(project.stage_id)
+        stage_total = totals.get(project.stage_id, 0)
+        stage_done = progress.done_by_stage.get(project.stage_id, 0)
+        name = self._auto_project_name(ProjectSchema(project, "", {"Customer 1": progress.customer or ""}))
+        return (project.id, name, stage.name if stage else "",
+                self._progress_bar(stage_done, stage_total),
+                self._progress_bar(sum(progress.done_by_stage.values()), sum(totals.values())))
+
+    @staticmethod
+    def _progress_bar(done, total, width=10):
+        # Treeview cells hold text only, so the bar is drawn with block characters
+        filled = round(width * done / total) if total else 0
+        return "█" * filled + "░" * (width - filled) + f" {done}/{total}"
+
+    def _on_progress_double_click(self, event):
+        item = self.progress_tree.selection()
+        if item:
+            self._show_project_detail(int(self.progress_tree.item(item[0])['values'][0]))
+
+    def _show_list_frame(self, name):
+        # Show a list built earlier and bring its rows up to date; False if there is none yet
+        if name not in self._list_frames:
+            return False
+        frame, tree = self._list_frames[name]
+        self.main_frame = frame
+        frame.pack(fill='both', expand=True)
+        tree.sync()
+        return True
+
+    def _sync_list(self, name):
+        # Bring a built list up to date after a change made here. Looked up in
+        # _list_frames rather than held, since a restore destroys the lists; an
+        # unbuilt one loads current rows when it is shown.
+        if name in self._list_frames:
+            self._list_frames[name][1].sync()
 
     # --- Project List View ---
     def _show_projects(self):
         self._clear_main()
+        if self._show_list_frame('projects'):
+            return
         self.main_frame = tk.Frame(self)
         self.main_frame.pack(fill='both', expand=True)
         top = tk.Frame(self.main_frame)
         top.pack(fill='x', pady=5)
         tk.Label(top, text="Projects", font=("Arial", 16, "bold"), anchor=GUI_ANCHOR, justify=GUI_JUSTIFY).pack(side=GUI_SIDE, padx=10)
         self.project_search_var = tk.StringVar()
-        tk.Entry(top, textvariable=self.project_search_var, width=30, justify=GUI_JUSTIFY).pack(side=GUI_SIDE, padx=5)
+        search_entry = tk.Entry(top, textvariable=self.project_search_var, width=30, justify=GUI_JUSTIFY)
+        search_entry.pack(side=GUI_SIDE, padx=5)
+        search_entry.bind('<Return>', lambda e: self._refresh_projects())
         tk.Button(top, text="Search", command=self._refresh_projects).pack(side=GUI_SIDE)
         self.active_only_var = tk.BooleanVar()
         tk.Checkbutton(top, text="Active Only", variable=self.active_only_var, command=self._refresh_projects).pack(side=GUI_SIDE, padx=10)
@@ -56,47 +516,109 @@ class AppView(tk.Tk):
         columns = ["id", "Project Name"] + [label for label, _ in ProjectSchema.FIELDS]
         style = ttk.Style()
         style.configure("Bold.Treeview.Heading", font=("Arial", 10, "bold"))
-        self.project_tree = ttk.Treeview(self.main_frame, columns=columns, show='headings', style="Bold.Treeview")
+        self.project_tree = PagedTreeview(self.main_frame, worker=self.worker, on_error=self._show_error,
+                                          changes_since=self.controller.project_changes_since,
+                                          columns=columns, show='headings', style="Bold.Treeview")
+        self._project_sort = []
         for col in columns:
-            self.project_tree.heading(col, text=col, command=lambda c=col: self._sort_project_tree(c, False), anchor=GUI_ANCHOR)
+            self.project_tree.heading(col, text=col, command=lambda c=col: self._sort_project_tree(c), anchor=GUI_ANCHOR)
             self.project_tree.column(col, width=120, anchor=GUI_ANCHOR)
+        self.project_tree.scrollbar.pack(side='left' if GUI_DIRECTION == 'rtl' else 'right', fill='y', pady=10)
         self.project_tree.pack(fill='both', expand=True, pady=10)
         self.project_tree.bind('<Double-1>', self._on_project_double_click)
+        self._list_frames['projects'] = (self.main_frame, self.project_tree)
+        self.project_tree.bind('<ButtonPress-1>', self._remember_shift, add='+')
+        # Search as you type
+        self.project_search_var.trace_add('write', lambda *_: self._debounce('projects', lambda: self._refresh_projects(incremental=True)))
         self._refresh_projects()
 
-    def _sort_project_tree(self, col, reverse):
-        l = [(self.project_tree.set(k, col), k) for k in self.project_tree.get_children('')]
-        l.sort(reverse=reverse)
-        for index, (val, k) in enumerate(l):
-            self.project_tree.move(k, '', index)
-        self.project_tree.heading(col, command=lambda: self._sort_project_tree(col, not reverse))
+    def _browse_file(self, var):
+        # Document paths name a project's folder
+        directory = filedialog.askdirectory(title="Project document folder", initialdir=var.get() or None)
+        if directory:
+            var.set(directory)
+
+    def _remember_shift(self, event):
+        # Heading commands get no event, so note here whether Shift is held for the click
+        self._shift_click = bool(event.state & 0x0001)
+
+    def _toggle_sort(self, sort, col):
+        """Update a [(column, descending)] sort list for a click on a column header.
+
+        A click sorts by that column alone, toggling its direction if it was already
+        the primary key; Shift+click adds it (or flips it) as a further sort key.
+        """
+        current = dict(sort)
+        if getattr(self, '_shift_click', False) and sort:
+            if col in current:
+                return [(c, not d if c == col else d) for c, d in sort]
+            return sort + [(col, False)]
+        descending = not current[col] if sort and sort[0][0] == col else False
+        return [(col, descending)]
 
-    def _refresh_projects(self):
-        for row in self.project_tree.get_children():
-            self.project_tree.delete(row)
+    def _show_sort_headings(self, tree, sort):
+        order = {c: i for i, (c, _) in enumerate(sort)}
+        for col in tree['columns']:
+            text = col
+            if col in order:
+                text += " ▼" if sort[order[col]][1] else " ▲"
+                if len(sort) > 1:
+                    text += str(order[col] + 1)
+            tree.heading(col, text=text)
+
+    def _project_order_by(self):
+        # Tree columns -> model sort keys; "Project Name" sorts like the generated name reads
+        field_keys = dict(ProjectSchema.FIELDS)
+        name_keys = ["location", "customer"] if GUI_DIRECTION == 'rtl' else ["customer", "location"]
+        order_by = []
+        for col, descending in self._project_sort:
+            keys = name_keys if col == "Project Name" else [field_keys.get(col, col)]
+            order_by.extend((key, descending) for key in keys)
+        return order_by
+
+    def _sort_project_tree(self, col):
+        # Sorting is done by the database (ORDER BY), then only the first page is reloaded
+        self._project_sort = self._toggle_sort(self._project_sort, col)
+        self._show_sort_headings(self.project_tree, self._project_sort)
+        self._refresh_projects()
+
+    def _refresh_projects(self, incremental=False):
+        self._cancel_debounce('projects')
         search = self.project_search_var.get()
         active_only = self.active_only_var.get()
-        projects = self.controller.list_projects(search, active_only)
-        for p in projects:
-            schema = self.controller.get_project_schema(p.id)
-            if not schema:
-                continue
-            row = [
-                schema.id,
-                self._auto_project_name(schema)
-            ]
-            for label, attr in ProjectSchema.FIELDS:
-                value = getattr(schema, attr)
-                if label == "Active":
-                    value = 'Yes' if value else 'No'
-                row.append(value if value is not None else "")
-            self.project_tree.insert('', 'end', values=tuple(row))
+        previous = self.project_tree.query
+        order_by = self._project_order_by()
+        def fetch_page(offset, limit, ids=None):
+            schemas = self.controller.list_project_schemas(search, active_only, limit, offset, order_by, ids)
+            return [(schema.id, self._project_row(schema), self.controller.project_search_fields(schema)) for schema in schemas]
+        def fetch_rows(ids):
+            return fetch_page(0, None, ids)
+        if (incremental and previous is not None and previous[1] == active_only
+                and search.startswith(previous[0]) and self.project_tree.is_complete()):
+            # A longer term only narrows the previous results, which are all loaded
+            self.project_tree.refine((search, active_only), lambda fields: self.controller.matches_search(fields, search), fetch_rows)
+            return
+        self.project_tree.reload(fetch_page, (search, active_only), fetch_rows)
+
+    def _project_row(self, schema):
+        row = [
+            schema.id,
+            self._auto_project_name(schema)
+        ]
+        for label, attr in ProjectSchema.FIELDS:
+            value = getattr(schema, attr)
+            if label == "Active":
+                value = 'Yes' if value else 'No'
+            row.append(value if value is not None else "")
+        return tuple(row)
+
     def _auto_project_name(self, project_schema):
         """Generate a direction-aware project name string.
         For RTL: Shows project location, then dash, then customer names
         For LTR: Shows 'Project:' prefix, then customer names, then dash, then location"""
-        # Get customer names from roles
-        customers = [project_schema.roles.get(label, "") for label in ["Customer 1", "Customer 2"] if project_schema.roles.get(label, "")]
+        # Get customer names from roles (a plain Project carries no roles)
+        roles = getattr(project_schema, "roles", {})
+        customers = [roles.get(label, "") for label in ["Customer 1", "Customer 2"] if roles.get(label, "")]
         names = ', '.join(customers) if customers else f"Project {project_schema.id}"
 
         # Format name based on GUI direction
@@ -111,7 +633,13 @@ class AppView(tk.Tk):
             project_id = int(self.project_tree.item(item[0])['values'][0])
             self._show_project_detail(project_id)    # --- Project Detail View ---
     def _show_project_detail(self, project_id):
-        project_schema = self.controller.get_project_schema(project_id)
+        def load():
+            return (self.controller.get_project_schema(project_id),
+                    self.controller.contact_display_names(),
+                    self.controller.list_stages())
+        self._run_async(load, on_done=lambda data: self._build_project_detail(*data), key='main')
+
+    def _build_project_detail(self, project_schema, contact_names, stages):
         if not project_schema:
             messagebox.showerror("Error", "Project not found.")
             return
@@ -125,8 +653,6 @@ class AppView(tk.Tk):
         title.pack(side=GUI_SIDE, pady=10, anchor=GUI_ANCHOR, fill='x')
         form = tk.Frame(self.main_frame)
         form.pack(fill='x', pady=10)
-        contacts = self.controller.list_contacts()
-        contact_names = [f"{c.first_name} {c.last_name}" for c in contacts]
         self.role_vars = {}
         self.project_detail_vars = {}
         row_idx = 0
@@ -159,7 +685,6 @@ class AppView(tk.Tk):
                     cb.grid(row=row_idx, column=1, sticky=GUI_STICKY, padx=(0, 10), pady=5)
                 self.project_detail_vars[label] = var
             elif label == "Stage":
-                stages = self.controller.list_stages()
                 stage_names = [s.name for s in stages]
                 var = tk.StringVar(value=value)
                 om = ttk.Combobox(form, textvariable=var, values=stage_names, state='readonly', justify=GUI_JUSTIFY, width=30)
@@ -238,16 +763,24 @@ class AppView(tk.Tk):
         self._stage_task_frame = tk.Frame(self.main_frame)
         self._stage_task_frame.pack(fill='x', pady=2)
         stage_name = self.project_detail_vars["Stage"].get() if "Stage" in self.project_detail_vars else None
-        stage_id = None
-        for s in self.controller.list_stages():
-            if s.name == stage_name:
-                stage_id = s.id
-                break
-        task_schemas = self.controller.get_task_schemas_for_project_stage(project_schema.id, stage_id) if stage_id else []
+        def load():
+            # The stage is looked up here as well: a cold reference cache reads the database
+            stage = self.controller.stage_by_name(stage_name)
+            return self.controller.get_task_schemas_for_project_stage(project_schema.id, stage.id) if stage else []
+        # Queued before the load, so the tasks read back include pending toggles
+        self._flush_task_status()
+        # The frame is packed now so it keeps its place; tasks fill it once loaded
+        task_frame = self._stage_task_frame
+        self._run_async(load, on_done=lambda task_schemas: self._fill_stage_tasks(task_frame, project_schema, task_schemas),
+                        key='stage_tasks')
+
+    def _fill_stage_tasks(self, task_frame, project_schema, task_schemas):
+        if not task_frame.winfo_exists():
+            return
         for t in task_schemas:
             var = tk.BooleanVar(value=t.is_done)
             # Create a frame for each checkbox + label pair
-            frame = tk.Frame(self._stage_task_frame)
+            frame = tk.Frame(task_frame)
             if GUI_DIRECTION == 'rtl':
                 # Text to the left of checkbox
                 tk.Label(frame, text=t.description).pack(side='left', padx=(0, 6))
@@ -275,67 +808,63 @@ class AppView(tk.Tk):
                 self._end_date_entry.config(state='normal')
 
     def _save_project_detail(self, project_schema):
-        try:
-            # Use schema field keys for mapping
-            field_map = dict(ProjectSchema.FIELDS)
-            location = self.project_detail_vars.get("Location", tk.StringVar()).get()
-            start_date = self.project_detail_vars.get("Start Date", tk.StringVar()).get()
-            active = self.project_detail_vars.get("Active", tk.BooleanVar()).get()
-            stage_name = self.project_detail_vars.get("Stage", tk.StringVar()).get()
-            document_path = self.project_detail_vars.get("Document Path", tk.StringVar()).get()
-            stage_id = next((s.id for s in self.controller.list_stages() if s.name == stage_name), None)
-            end_date = self.project_detail_vars.get("End Date", tk.StringVar()).get() if not active else None
-            updated = self.controller.get_project(project_schema.id)
-            updated.location = location
-            updated.start_date = start_date
-            updated.end_date = end_date
-            updated.active = active
-            updated.stage_id = stage_id
-            updated.document_path = document_path
-            self.controller.update_project(updated)
-            self.controller.project_role_model.db.execute_query("DELETE FROM project_roles WHERE project_id=?", (project_schema.id,))
-            contacts = self.controller.list_contacts()
-            role_map = {label: (label if label not in ["Customer 1", "Customer 2"] else "Customer") for label in ProjectSchema.ROLE_LABELS}
-            for label, var in self.role_vars.items():
-                name = var.get()
-                if name:
-                    contact = next((c for c in contacts if f"{c.first_name} {c.last_name}" == name), None)
-                    if contact:
-                        self.controller.add_project_role(project_schema.id, contact.id, role_map[label])
+        # Use schema field keys for mapping
+        field_map = dict(ProjectSchema.FIELDS)
+        location = self.project_detail_vars.get("Location", tk.StringVar()).get()
+        start_date = self.project_detail_vars.get("Start Date", tk.StringVar()).get()
+        active = self.project_detail_vars.get("Active", tk.BooleanVar()).get()
+        stage_name = self.project_detail_vars.get("Stage", tk.StringVar()).get()
+        document_path = self.project_detail_vars.get("Document Path", tk.StringVar()).get()
+        end_date = self.project_detail_vars.get("End Date", tk.StringVar()).get() if not active else None
+        role_map = {label: (label if label not in ["Customer 1", "Customer 2"] else "Customer") for label in ProjectSchema.ROLE_LABELS}
+        role_names = [(var.get(), role_map[label]) for label, var in self.role_vars.items() if var.get()]
+        def save():
+            # Names are resolved to the stage and contacts on the worker, which may read the database
+            stage = self.controller.stage_by_name(stage_name)
+            updated = Project(project_schema.id, location, start_date, end_date, active, stage.id if stage else None, document_path)
+            roles = []
+            for name, role in role_names:
+                contact = self.controller.contact_by_display_name(name)
+                if contact:
+                    roles.append((contact.id, role))
+            # Project fields and roles are saved in a single transaction
+            self.controller.update_project(updated, roles)
+        def saved(_):
             messagebox.showinfo("Saved", "Project updated successfully.")
             self._show_projects()
-        except Exception as e:
-            import traceback
-            messagebox.showerror("Error", f"{e}\n\n{traceback.format_exc()}")
+        self._run_async(save, on_done=saved)
 
     def _delete_project(self, project_id):
         if messagebox.askyesno("Confirm", "Delete this project?"):
-            self.controller.delete_project(project_id)
-            self._show_projects()
+            self._run_async(self.controller.delete_project, project_id, on_done=lambda _: self._show_projects())
 
     def _reload_stage_tasks(self, project):
         self._show_project_stage_tasks(project)
 
     def _toggle_task_done(self, project_id, task_id, var):
-        # Find or create project_stage_task
-        tasks = self.controller.list_project_stage_tasks(project_id)
-        pst = next((t for t in tasks if t.task_id == task_id), None)
-        if pst:
-            self.controller.set_project_stage_task_done(pst.id, var.get())
-        else:
-            # Create new project_stage_task
-            self.controller.project_stage_task_model.db.execute_query(
-                "INSERT INTO project_stage_tasks (project_id, task_id, is_done) VALUES (?, ?, ?)",
-                (project_id, task_id, int(var.get()))
-            )
-        # Optionally refresh view
+        # Coalesce rapid toggles: only the last state of each task is written, in one transaction
+        self._pending_task_status.setdefault(project_id, {})[task_id] = var.get()
+        if self._task_flush_id is None:
+            self._task_flush_id = self.after(self.TASK_FLUSH_MS, self._flush_task_status)
+
+    def _flush_task_status(self):
+        if self._task_flush_id is not None:
+            self.after_cancel(self._task_flush_id)
+            self._task_flush_id = None
+        pending, self._pending_task_status = self._pending_task_status, {}
+        if pending:
+            self._run_async(self.controller.set_tasks_done, pending)
 
     def _add_project_dialog(self):
+        # The pickers' contents are read on the worker, like the project detail's
+        def load():
+            return self.controller.contact_display_names(), self.controller.list_stages()
+        self._run_async(load, on_done=lambda data: self._build_add_project_dialog(*data))
+
+    def _build_add_project_dialog(self, contact_names, stages):
         dialog = tk.Toplevel(self)
         dialog.title("Add Project")
         dialog.geometry("400x500")
-        contacts = self.controller.list_contacts()
-        contact_names = [f"{c.first_name} {c.last_name}" for c in contacts]
         cust_labels = ProjectSchema.ROLE_LABELS
         customer_vars = {}
         for j, cust_label in enumerate(cust_labels):
@@ -356,7 +885,6 @@ class AppView(tk.Tk):
                 cb.grid(row=row_idx, column=1, sticky=GUI_STICKY)
                 vars[label] = var
             elif label == "Stage":
-                stages = self.controller.list_stages()
                 stage_names = [s.name for s in stages]
                 var = tk.StringVar(value=stage_names[0] if stage_names else "")
                 om = ttk.Combobox(dialog, textvariable=var, values=stage_names, state='readonly', justify=GUI_JUSTIFY)
@@ -406,23 +934,26 @@ class AppView(tk.Tk):
                 active = vars.get("Active", tk.BooleanVar()).get()
                 stage_name = vars.get("Stage", tk.StringVar()).get()
                 document_path = vars.get("Document Path", tk.StringVar()).get()
-                stage_id = next((s.id for s in self.controller.list_stages() if s.name == stage_name), None)
+                stage_id = next((s.id for s in stages if s.name == stage_name), None)
                 end_date = vars.get("End Date", tk.StringVar()).get() if not active else None
-                project_id = self.controller.create_project(location, start_date, end_date, active, stage_id, document_path)
-                if not project_id:
-                    last_row = self.controller.project_model.db.execute_query("SELECT id FROM projects ORDER BY id DESC LIMIT 1", fetchone=True)
-                    if last_row:
-                        project_id = last_row[0]
-                if not project_id:
-                    raise Exception("Failed to create project. Project ID not found.")
-                for cust_label in cust_labels:
-                    name = customer_vars[cust_label].get()
-                    if name:
-                        contact = next((c for c in contacts if f"{c.first_name} {c.last_name}" == name), None)
+                role_names = [(customer_vars[cust_label].get(), cust_label if cust_label not in ["Customer 1", "Customer 2"] else "Customer")
+                              for cust_label in cust_labels if customer_vars[cust_label].get()]
+                def create():
+                    # Names are resolved to contacts on the worker, which may read the database
+                    roles = []
+                    for name, role in role_names:
+                        contact = self.controller.contact_by_display_name(name)
                         if contact:
-                            self.controller.add_project_role(project_id, contact.id, cust_label if cust_label not in ["Customer 1", "Customer 2"] else "Customer")
-                dialog.destroy()
-                self._refresh_projects()
+                            roles.append((contact.id, role))
+                    return self.controller.create_project(location, start_date, end_date, active, stage_id, document_path, roles)
+                def created(project_id):
+                    if not project_id:
+                        messagebox.showerror("Error", "Failed to create project. Project ID not found.")
+                        return
+                    dialog.destroy()
+                    self._sync_list('projects')
+                # The project and its roles are created in a single transaction
+                self.worker.submit(create, on_done=created, on_error=lambda e: messagebox.showerror("Error", str(e), parent=dialog))
             except Exception as e:
                 messagebox.showerror("Error", str(e))
         btn_frame = tk.Frame(dialog)
@@ -432,68 +963,64 @@ class AppView(tk.Tk):
         cancel_btn = tk.Button(btn_frame, text="Cancel", command=dialog.destroy, width=12, anchor=GUI_ANCHOR, justify=GUI_JUSTIFY)
         cancel_btn.pack(side=GUI_SIDE, padx=8)
 
-    def _save_project_role(self, project, label):
-        contacts = self.controller.list_contacts()
-        name = self.role_vars[label].get()
-        if name:
-            contact = next((c for c in contacts if f"{c.first_name} {c.last_name}" == name), None)
-            if contact:
-                # Remove existing role for this label (Customer 1 or 2)
-                project_roles = self.controller.list_project_roles(project.id)
-                idx = 0 if label == "Customer 1" else 1
-                matches = [r for r in project_roles if r.role == "Customer"]
-                if len(matches) > idx:
-                    self.controller.remove_project_role(matches[idx].id)
-                self.controller.add_project_role(project.id, contact.id, "Customer")
-                messagebox.showinfo("Saved", f"{label} updated.")
-
-    def _remove_project_role(self, project, label):
-        project_roles = self.controller.list_project_roles(project.id)
-        idx = 0 if label == "Customer 1" else 1
-        matches = [r for r in project_roles if r.role == "Customer"]
-        if len(matches) > idx:
-            self.controller.remove_project_role(matches[idx].id)
-            self.role_vars[label].set("")
-            messagebox.showinfo("Removed", f"{label} removed.")
-
     # --- Contact List View ---
     def _show_contacts(self):
         self._clear_main()
+        if self._show_list_frame('contacts'):
+            return
         self.main_frame = tk.Frame(self)
         self.main_frame.pack(fill='both', expand=True)
         top = tk.Frame(self.main_frame)
         top.pack(fill='x', pady=5)
         tk.Label(top, text="Contacts", font=("Arial", 16, "bold")).pack(side='left', padx=10)
         self.contact_search_var = tk.StringVar()
-        tk.Entry(top, textvariable=self.contact_search_var, width=30).pack(side='left', padx=5)
+        search_entry = tk.Entry(top, textvariable=self.contact_search_var, width=30)
+        search_entry.pack(side='left', padx=5)
+        search_entry.bind('<Return>', lambda e: self._refresh_contacts())
         tk.Button(top, text="Search", command=self._refresh_contacts).pack(side='left')
         tk.Button(top, text="Add Contact", command=self._add_contact_dialog).pack(side='right', padx=10)
         # Table
         columns = ["id", "first_name", "last_name", "phone", "email", "address"]
         style = ttk.Style()
         style.configure("Bold.Treeview.Heading", font=("Arial", 10, "bold"))
-        self.contact_tree = ttk.Treeview(self.main_frame, columns=columns, show='headings', style="Bold.Treeview")
+        self.contact_tree = PagedTreeview(self.main_frame, worker=self.worker, on_error=self._show_error,
+                                          changes_since=self.controller.contact_changes_since,
+                                          columns=columns, show='headings', style="Bold.Treeview")
+        self._contact_sort = []
         for col in columns:
-            self.contact_tree.heading(col, text=col, command=lambda c=col: self._sort_contact_tree(c, False), anchor='w')
+            self.contact_tree.heading(col, text=col, command=lambda c=col: self._sort_contact_tree(c), anchor='w')
             self.contact_tree.column(col, width=120, anchor='w')
+        self.contact_tree.scrollbar.pack(side='right', fill='y', pady=10)
         self.contact_tree.pack(fill='both', expand=True, pady=10)
         self.contact_tree.bind('<Double-1>', self._on_contact_double_click)
+        self._list_frames['contacts'] = (self.main_frame, self.contact_tree)
+        self.contact_tree.bind('<ButtonPress-1>', self._remember_shift, add='+')
+        # Search as you type
+        self.contact_search_var.trace_add('write', lambda *_: self._debounce('contacts', lambda: self._refresh_contacts(incremental=True)))
         self._refresh_contacts()
 
-    def _sort_contact_tree(self, col, reverse):
-        l = [(self.contact_tree.set(k, col), k) for k in self.contact_tree.get_children('')]
-        l.sort(reverse=reverse)
-        for index, (val, k) in enumerate(l):
-            self.contact_tree.move(k, '', index)
-        self.contact_tree.heading(col, command=lambda: self._sort_contact_tree(col, not reverse))
+    def _sort_contact_tree(self, col):
+        # Contact columns are named after the model's sort keys
+        self._contact_sort = self._toggle_sort(self._contact_sort, col)
+        self._show_sort_headings(self.contact_tree, self._contact_sort)
+        self._refresh_contacts()
 
-    def _refresh_contacts(self):
-        for row in self.contact_tree.get_children():
-            self.contact_tree.delete(row)
+    def _refresh_contacts(self, incremental=False):
+        self._cancel_debounce('contacts')
         search = self.contact_search_var.get()
-        contacts = self.controller.list_contacts(search)
-        for c in contacts:
-            self.contact_tree.insert('', 'end', values=(c.id, c.first_name, c.last_name, c.phone, c.email, c.address))
+        previous = self.contact_tree.query
+        order_by = list(self._contact_sort)
+        def fetch_page(offset, limit, ids=None):
+            contacts = self.controller.list_contacts(search, limit, offset, order_by, ids)
+            return [(c.id, (c.id, c.first_name, c.last_name, c.phone, c.email, c.address), self.controller.contact_search_fields(c))
+                    for c in contacts]
+        def fetch_rows(ids):
+            return fetch_page(0, None, ids)
+        if incremental and previous is not None and search.startswith(previous) and self.contact_tree.is_complete():
+            # A longer term only narrows the previous results, which are all loaded
+            self.contact_tree.refine(search, lambda fields: self.controller.matches_search(fields, search), fetch_rows)
+            return
+        self.contact_tree.reload(fetch_page, search, fetch_rows)
 
     def _on_contact_double_click(self, event):
         item = self.contact_tree.selection()
@@ -501,9 +1028,96 @@ class AppView(tk.Tk):
             contact_id = int(self.contact_tree.item(item[0])['values'][0])
             self._show_contact_detail(contact_id)
 
+    # --- Document Catalog View ---
+    def _show_documents(self):
+        self._clear_main()
+        if self._show_list_frame('documents'):
+            return
+        self.main_frame = tk.Frame(self)
+        self.main_frame.pack(fill='both', expand=True)
+        top = tk.Frame(self.main_frame)
+        top.pack(fill='x', pady=5)
+        tk.Label(top, text="Documents", font=("Arial", 16, "bold"), anchor=GUI_ANCHOR, justify=GUI_JUSTIFY).pack(side=GUI_SIDE, padx=10)
+        self.document_search_var = tk.StringVar()
+        search_entry = tk.Entry(top, textvariable=self.document_search_var, width=30, justify=GUI_JUSTIFY)
+        search_entry.pack(side=GUI_SIDE, padx=5)
+        search_entry.bind('<Return>', lambda e: self._refresh_documents())
+        tk.Button(top, text="Search", command=self._refresh_documents).pack(side=GUI_SIDE)
+        tk.Button(top, text="Rescan Folders", command=self._scan_documents).pack(side='right' if GUI_SIDE == 'left' else 'left', padx=10)
+        columns = ["Project ID", "Project", "Path", "Size", "Modified"]
+        ttk.Style().configure("Bold.Treeview.Heading", font=("Arial", 10, "bold"))
+        self.document_tree = PagedTreeview(self.main_frame, worker=self.worker, on_error=self._show_error,
+                                           columns=columns, show='headings', style="Bold.Treeview")
+        for col in columns:
+            self.document_tree.heading(col, text=col, anchor=GUI_ANCHOR)
+            self.document_tree.column(col, width=80 if col == "Project ID" else 320 if col == "Path" else 150, anchor=GUI_ANCHOR)
+        self.document_tree.scrollbar.pack(side='left' if GUI_DIRECTION == 'rtl' else 'right', fill='y', pady=10)
+        self.document_tree.pack(fill='both', expand=True, pady=10)
+        self.document_tree.bind('<Double-1>', self._on_document_double_click)
+        self._list_frames['documents'] = (self.main_frame, self.document_tree)
+        self.document_search_var.trace_add('write', lambda *_: self._debounce('documents', self._refresh_documents))
+        self._refresh_documents()
+
+    def _refresh_documents(self):
+        self._cancel_debounce('documents')
+        search = self.document_search_var.get()
+        def fetch_page(offset, limit):
+            rows = []
+            for document, location in self.controller.search_documents(search, None, limit, offset):
+                modified = datetime.fromtimestamp(document.mtime_ns / 1e9).strftime("%Y-%m-%d %H:%M")
+                rows.append((document.id, (document.project_id, location, document.path,
+                                           self._format_size(document.size), modified)))
+            return rows
+        self.document_tree.reload(fetch_page, search)
+
+    @staticmethod
+    def _format_size(size):
+        for unit in ("B", "KB", "MB", "GB"):
+            if size < 1024 or unit == "GB":
+                return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+            size /= 1024
+
+    def _on_document_double_click(self, event):
+        item = self.document_tree.selection()
+        if not item:
+            return
+        project_id, _, path = self.document_tree.item(item[0])['values'][:3]
+        path = self.controller.document_file_path(int(project_id), str(path))
+        if path:
+            self._open_path(path)
+
+    @staticmethod
+    def _open_path(path):
+        if not os.path.exists(path):
+            messagebox.showerror("Error", f"{path} is no longer there. Rescan to update the catalog.")
+        elif hasattr(os, 'startfile'):
+            os.startfile(path)
+        else:
+            webbrowser.open(pathlib.Path(path).as_uri())
+
+    def _scan_documents(self):
+        if self._scan_worker is None:
+            self._scan_worker = DbWorker(self, on_busy=lambda busy: self.status_var.set("Scanning documents..." if busy else ""),
+                                         context=self._query_action)
+        def done(result):
+            lines = [f"{result.projects} project folders, {result.files} files: "
+                     f"{result.hashed} new or changed, {result.removed} removed"]
+            if result.errors:
+                lines.append(f"{len(result.errors)} problems, e.g.:")
+                lines.extend(f"  {path}: {message}" for path, message in result.errors[:5])
+            messagebox.showinfo("Rescan Folders", "\n".join(lines))
+            if 'documents' in self._list_frames:
+                self.document_tree.reload(query=self.document_tree.query)
+        self._scan_worker.submit(self.controller.scan_documents, on_done=done, on_error=self._show_error, key='scan')
+
     # --- Contact Detail View ---
     def _show_contact_detail(self, contact_id):
-        contact = self.controller.get_contact(contact_id)
+        def load():
+            return (self.controller.get_contact(contact_id),
+                    self.controller.list_projects_for_contact(contact_id))
+        self._run_async(load, on_done=lambda data: self._build_contact_detail(*data), key='main')
+
+    def _build_contact_detail(self, contact, linked_projects):
         if not contact:
             messagebox.showerror("Error", "Contact not found.")
             return
@@ -544,12 +1158,7 @@ class AppView(tk.Tk):
         for col in columns:
             tree.heading(col, text=col, anchor='w')
             tree.column(col, width=180, anchor='w')
-        projects = []
-        for p in self.controller.list_projects():
-            for r in self.controller.list_project_roles(p.id):
-                if r.contact_id == contact.id:
-                    projects.append((p, r.role))
-        for p, role in projects:
+        for p, role in linked_projects:
             tree.insert('', 'end', values=(self._auto_project_name(p), role), tags=(str(p.id),))
         tree.pack(fill='x', anchor='w', padx=8, pady=4)
         def on_linked_project_double_click(event):
@@ -582,39 +1191,17 @@ class AppView(tk.Tk):
             phone = self.contact_detail_vars["Phone"].get()
             email = self.contact_detail_vars["Email"].get()
             address = self.contact_detail_vars["Address"].get()
-            contact.first_name = first_name
-            contact.last_name = last_name
-            contact.phone = phone
-            contact.email = email
-            contact.address = address
-            self.controller.update_contact(contact)
-            messagebox.showinfo("Saved", "Contact updated successfully.")
-            self._show_contacts()
+            updated = Contact(contact.id, first_name, last_name, phone, email, address)
+            def saved(_):
+                messagebox.showinfo("Saved", "Contact updated successfully.")
+                self._show_contacts()
+            self._run_async(self.controller.update_contact, updated, on_done=saved)
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
     def _delete_contact(self, contact_id):
         if messagebox.askyesno("Confirm", "Delete this contact?"):
-            self.controller.delete_contact(contact_id)
-            self._show_contacts()
-
-    def _show_contact_projects(self, contact):
-        frame = tk.Frame(self.main_frame)
-        frame.pack(fill='x', pady=2)
-        # Find all project_roles for this contact
-        # (This is a simplified version; you may want to optimize with a join)
-        projects = []
-        for p in self.controller.list_projects():
-            for r in self.controller.list_project_roles(p.id):
-                if r.contact_id == contact.id:
-                    projects.append((p, r.role))
-        tree = ttk.Treeview(frame, columns=["project", "role"], show='headings', height=4)
-        for col in ["project", "role"]:
-            tree.heading(col, text=col)
-            tree.column(col, width=180)
-        for p, role in projects:
-            tree.insert('', 'end', values=(self._auto_project_name(p), role))
-        tree.pack(side='left', fill='x', expand=True)
+            self._run_async(self.controller.delete_contact, contact_id, on_done=lambda _: self._show_contacts())
 
     def _add_contact_dialog(self):
         dialog = tk.Toplevel(self)
@@ -628,18 +1215,18 @@ class AppView(tk.Tk):
             tk.Entry(dialog, textvariable=var, width=25).grid(row=i, column=1, sticky='w')
             vars[label] = var
         def add():
-            try:
-                self.controller.create_contact(
-                    vars["First Name"].get(),
-                    vars["Last Name"].get(),
-                    vars["Phone"].get(),
-                    vars["Email"].get(),
-                    vars["Address"].get()
-                )
+            def created(_):
                 dialog.destroy()
-                self._refresh_contacts()
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
+                self._sync_list('contacts')
+            self.worker.submit(
+                self.controller.create_contact,
+                vars["First Name"].get(),
+                vars["Last Name"].get(),
+                vars["Phone"].get(),
+                vars["Email"].get(),
+                vars["Address"].get(),
+                on_done=created, on_error=lambda e: messagebox.showerror("Error", str(e), parent=dialog)
+            )
         # Add Save and Cancel buttons next to each other at the bottom
         btn_frame = tk.Frame(dialog)
         btn_frame.grid(row=len(fields), column=0, columnspan=2, pady=10)
@@ -0,0 +1,113 @@
+import queue
+import threading
+from contextlib import nullcontext
+
+# --- Background Database Worker ---
+class Request:
+    """A queued call; cancel() stops its callbacks from running if it has not been delivered yet."""
+    def __init__(self, fn, args, kwargs, on_done, on_error, key):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.key = key
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class DbWorker:
+    """Runs controller calls on one background thread so the Tk main loop never blocks.
+
+    Results are handed back on the Tk thread by an after() poll of the result queue,
+    since Tk widgets must only be touched from the thread running mainloop.
+    Submitting a request with a key cancels the previous request with the same key,
+    so a burst of refreshes only delivers the newest one.
+    """
+    POLL_MS = 25
+
+    def __init__(self, root, on_busy=None, context=None):
+        self.root = root
+        self.on_busy = on_busy  # called with True/False when work starts/stops
+        # context(request), if given, returns a context manager wrapped around the call
+        self.context = context
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._latest = {}
+        self._pending = 0
+        self._thread = threading.Thread(target=self._run, name="db-worker", daemon=True)
+        self._thread.start()
+        self._poll_id = self.root.after(self.POLL_MS, self._poll)
+
+    def submit(self, fn, *args, on_done=None, on_error=None, key=None, **kwargs) -> Request:
+        request = Request(fn, args, kwargs, on_done, on_error, key)
+        if key is not None:
+            previous = self._latest.get(key)
+            if previous:
+                previous.cancel()
+            self._latest[key] = request
+        self._pending += 1
+        if self._pending == 1 and self.on_busy:
+            self.on_busy(True)
+        self._requests.put(request)
+        return request
+
+    @property
+    def idle(self):
+        """True when every submitted request has been delivered."""
+        return self._pending == 0
+
+    def cancel(self, key):
+        request = self._latest.pop(key, None)
+        if request:
+            request.cancel()
+
+    def shutdown(self, timeout=5.0):
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._requests.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            result = error = None
+            if not request.cancelled:
+                try:
+                    with self.context(request) if self.context else nullcontext():
+                        result = request.fn(*request.args, **request.kwargs)
+                except Exception as e:
+                    error = e
+            self._results.put((request, result, error))
+
+    def _poll(self):
+        try:
+            while True:
+                try:
+                    request, result, error = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                self._deliver(request, result, error)
+        finally:
+            if self._poll_id is not None:
+                self._poll_id = self.root.after(self.POLL_MS, self._poll)
+
+    def _deliver(self, request, result, error):
+        self._pending -= 1
+        if self._pending == 0 and self.on_busy:
+            self.on_busy(False)
+        if request.key is not None and self._latest.get(request.key) is request:
+            del self._latest[request.key]
+        if request.cancelled:
+            return
+        if error is not None:
+            if request.on_error:
+                request.on_error(error)
+            else:
+                raise error
+        elif request.on_done:
+            request.on_done(result)